@@ -42,6 +42,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.static_assets.PrecompressedStaticMiddleware",
+    "core.query_budget.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -63,6 +65,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "core.notifications.live_notifications",
             ],
         },
     },
@@ -118,6 +121,22 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# collectstatic fingerprints every asset and writes gzip/brotli and
+# WebP/AVIF siblings; PrecompressedStaticMiddleware serves them from
+# STATIC_ROOT (see core/static_assets.py)
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "core.static_assets.PrecompressedManifestStaticFilesStorage",
+    },
+}
+STATIC_SERVE_COLLECTED = not DEBUG
+# Cache lifetime for the unfingerprinted copies; fingerprinted files are immutable
+STATIC_UNHASHED_MAX_AGE = 300
 
 # Media files (User uploads)
 MEDIA_URL = "media/"
@@ -141,3 +160,72 @@ STRIPE_PUBLIC_KEY = "pk_test_placeholder"
 STRIPE_SECRET_KEY = "sk_test_placeholder"
 STRIPE_WEBHOOK_SECRET = "whsec_placeholder"
 
+
+# Property view counting (see core/view_counter.py)
+# Buffered views are written at most this many seconds apart...
+VIEW_COUNTER_FLUSH_INTERVAL = 10
+# ...or as soon as this many are pending, which bounds the loss on a crash.
+VIEW_COUNTER_MAX_PENDING = 100
+
+# Screening provider (see core/providers.py). For load tests against the
+# bundled stub (manage.py run_screening_stub) use:
+#   {"BACKEND": "http", "URL": "http://127.0.0.1:8099/v1/screenings"}
+SCREENING_PROVIDER = {
+    "BACKEND": "simulated",
+    "CONNECT_TIMEOUT": 2.0,
+    "READ_TIMEOUT": 10.0,
+    "POOL_SIZE": 10,
+    "CIRCUIT_FAILURE_THRESHOLD": 5,
+    "CIRCUIT_RESET_TIMEOUT": 30.0,
+}
+
+# Reuse a tenant's bureau result for this many seconds across applications
+# (0 disables the cache; see core/screening_cache.py)
+SCREENING_CACHE_TTL = 30 * 24 * 60 * 60
+
+# Radius search (see core/geo.py). The bundled file covers a sample of
+# metro zips; point this at the Census ZCTA Gazetteer file for all of them.
+ZIP_CENTROIDS_FILE = BASE_DIR / "core" / "data" / "zip_centroids.csv"
+# Reload the in-memory property index after this many seconds so listings
+# changed by other processes are picked up
+GEO_INDEX_MAX_AGE = 300
+
+# Rendered listing fragments (see core/listing_cache.py). Local memory is
+# per process; point LISTING_CACHE_ALIAS at a shared backend such as
+# django.core.cache.backends.redis.RedisCache so invalidations reach every
+# worker at once instead of after LISTING_CACHE_TTL.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "tenant-screening",
+    },
+}
+LISTING_CACHE_ALIAS = "default"
+LISTING_CACHE_TTL = 300
+# Past the TTL, keep serving an entry for this long while one request refreshes it
+LISTING_CACHE_STALE_TTL = 300
+# Longest a request waits for another request to fill a missing entry
+LISTING_CACHE_WAIT = 5
+
+# Per-request query count, repeated queries and DB time in response headers
+# and the log (see core/query_budget.py)
+QUERY_BUDGET_ENABLED = DEBUG
+QUERY_BUDGET_WARN_QUERIES = 30
+
+# Bulk listing import (see core/property_import.py): photos listed in an
+# import's image_url column are downloaded this many at a time
+PROPERTY_IMPORT_IMAGE_WORKERS = 8
+PROPERTY_IMPORT_IMAGE_TIMEOUT = 10
+PROPERTY_IMPORT_IMAGE_MAX_BYTES = 5 * 1024 * 1024
+# Let image_url point at loopback/private/link-local addresses; only for tests
+# and trusted local setups, since any landlord can submit these URLs
+PROPERTY_IMPORT_IMAGE_ALLOW_PRIVATE = False
+
+# Resized listing photos and profile pictures (see core/thumbnails.py):
+# processes run_thumbnail_worker and backfill_thumbnails render on
+# (None means one per CPU)
+THUMBNAIL_WORKERS = None
+
+# Under WSGI there is no notification stream (see core/notifications.py);
+# pages refresh the inbox badge this often instead
+NOTIFICATION_POLL_SECONDS = 30
@@ -3,14 +3,24 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import User, Property, RentalApplication, ScreeningReport, LeaseDocument, Message
 
 
+# Changelists skip the unfiltered "(N total)" count: a second COUNT(*) over
+# tables that grow into the millions.
+
+
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
     """Custom user admin"""
-    list_display = ['username', 'email', 'role', 'first_name', 'last_name', 'is_staff']
-    list_filter = ['role', 'is_staff', 'is_superuser', 'is_active']
+    list_display = ['username', 'email', 'role', 'first_name', 'last_name', 'trust_badge', 'is_staff']
+    show_full_result_count = False
+    list_filter = ['role', 'trust_badge', 'is_staff', 'is_superuser', 'is_active']
+    readonly_fields = ['trust_score', 'trust_badge']
     
     fieldsets = BaseUserAdmin.fieldsets + (
         ('Additional Info', {'fields': ('role', 'phone_number', 'profile_picture')}),
+        ('Trust Score', {'fields': (
+            'is_identity_verified', 'has_employment_history', 'has_rental_history',
+            'background_check_clear', 'trust_score', 'trust_badge',
+        )}),
     )
     
     add_fieldsets = BaseUserAdmin.add_fieldsets + (
@@ -21,6 +31,7 @@ class UserAdmin(BaseUserAdmin):
 @admin.register(Property)
 class PropertyAdmin(admin.ModelAdmin):
     list_display = ['title', 'landlord', 'city', 'state', 'monthly_rent', 'status', 'created_at']
+    show_full_result_count = False
     list_filter = ['status', 'city', 'state', 'created_at']
     search_fields = ['title', 'address', 'city', 'landlord__username']
     ordering = ['-created_at']
@@ -29,6 +40,7 @@ class PropertyAdmin(admin.ModelAdmin):
 @admin.register(RentalApplication)
 class RentalApplicationAdmin(admin.ModelAdmin):
     list_display = ['tenant', 'property', 'status', 'annual_income', 'submitted_at']
+    show_full_result_count = False
     list_filter = ['status', 'submitted_at', 'has_pets']
     search_fields = ['tenant__username', 'property__title', 'employer_name']
     ordering = ['-submitted_at']
@@ -38,6 +50,9 @@ class RentalApplicationAdmin(admin.ModelAdmin):
 @admin.register(ScreeningReport)
 class ScreeningReportAdmin(admin.ModelAdmin):
     list_display = ['application', 'credit_score_range', 'risk_level', 'created_at']
+    show_full_result_count = False
+    # str(application) shows the tenant and the property
+    list_select_related = ['application__tenant', 'application__property']
     list_filter = ['credit_score_range', 'risk_level', 'criminal_record_clear']
     search_fields = ['application__tenant__username']
     ordering = ['-created_at']
@@ -46,6 +61,7 @@ class ScreeningReportAdmin(admin.ModelAdmin):
 @admin.register(LeaseDocument)
 class LeaseDocumentAdmin(admin.ModelAdmin):
     list_display = ['property', 'tenant', 'lease_start_date', 'lease_end_date', 'status', 'monthly_rent']
+    show_full_result_count = False
     list_filter = ['status', 'lease_start_date', 'lease_end_date']
     search_fields = ['property__title', 'tenant__username']
     ordering = ['-created_at']
@@ -54,6 +70,7 @@ class LeaseDocumentAdmin(admin.ModelAdmin):
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
     list_display = ['sender', 'recipient', 'subject', 'is_read', 'created_at']
+    show_full_result_count = False
     list_filter = ['is_read', 'created_at']
     search_fields = ['sender__username', 'recipient__username', 'subject', 'body']
     ordering = ['-created_at']
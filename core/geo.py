@@ -0,0 +1,241 @@
+"""Offline geocoding and radius search for listings.
+
+Coordinates come from a zip-centroid file (settings.ZIP_CENTROIDS_FILE):
+either ``zip,latitude,longitude`` CSV like the bundled sample, or the
+Census ZCTA Gazetteer file (tab-separated GEOID/INTPTLAT/INTPTLONG) for
+national coverage. Nothing is looked up over the network.
+
+Radius queries are answered from an in-memory grid of property coordinates
+rather than the database. The grid is loaded lazily, patched by signals as
+listings change in this process, and reloaded after GEO_INDEX_MAX_AGE
+seconds so other processes' edits show up too. Only the very first load
+happens inside a request; later reloads run on a background thread while
+searches keep using the current grid, and edits made in this process
+during a reload are replayed onto the fresh one.
+"""
+import csv
+import math
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+
+from .models import Property, normalize_zip
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LATITUDE = 69.0
+# Grid cell size in degrees (~35 miles north-south)
+GRID_DEGREES = 0.5
+# Largest pk list filter_near() passes to the database as one IN clause
+MAX_PK_FILTER = 5000
+
+
+@lru_cache(maxsize=1)
+def zip_centroids():
+    """Return {zip: (latitude, longitude)} from settings.ZIP_CENTROIDS_FILE"""
+    with open(settings.ZIP_CENTROIDS_FILE, newline='', encoding='utf-8-sig') as fp:
+        header = fp.readline()
+        gazetteer = header.startswith('GEOID')
+        fp.seek(0)
+        reader = csv.DictReader(fp, delimiter='\t' if gazetteer else ',')
+        if gazetteer:
+            reader.fieldnames = [name.strip() for name in reader.fieldnames]
+            columns = ('GEOID', 'INTPTLAT', 'INTPTLONG')
+        else:
+            columns = ('zip', 'latitude', 'longitude')
+        return {
+            row[columns[0]].strip(): (float(row[columns[1]]), float(row[columns[2]]))
+            for row in reader
+        }
+
+
+def zip_centroid(zip_code):
+    """(latitude, longitude) of a zip code's centroid, or None if it isn't in the dataset"""
+    return zip_centroids().get(normalize_zip(zip_code))
+
+
+def distance_miles(lat1, lng1, lat2, lng2):
+    """Great-circle (haversine) distance"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+class SpatialIndex:
+    """Points bucketed on a fixed latitude/longitude grid"""
+
+    def __init__(self, cell_degrees=GRID_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.loaded_at = None
+        self._buckets = defaultdict(dict)
+        self._cells = {}
+        # Edits made while a reload is reading the database, or None
+        self._journal = None
+        self._lock = threading.Lock()
+
+    def _cell(self, lat, lng):
+        return math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees)
+
+    def _discard(self, pk):
+        cell = self._cells.pop(pk, None)
+        if cell is not None:
+            bucket = self._buckets[cell]
+            bucket.pop(pk, None)
+            if not bucket:
+                del self._buckets[cell]
+
+    def _put(self, pk, lat, lng):
+        self._discard(pk)
+        cell = self._cell(lat, lng)
+        self._buckets[cell][pk] = (lat, lng)
+        self._cells[pk] = cell
+
+    def add(self, pk, lat, lng):
+        with self._lock:
+            self._put(pk, lat, lng)
+            if self._journal is not None:
+                self._journal.append((pk, (lat, lng)))
+
+    def remove(self, pk):
+        with self._lock:
+            self._discard(pk)
+            if self._journal is not None:
+                self._journal.append((pk, None))
+
+    def begin_reload(self):
+        """Start journaling edits for a reload; False if another reload is already running"""
+        with self._lock:
+            if self._journal is not None:
+                return False
+            self._journal = []
+            return True
+
+    def load(self, points):
+        """Replace the contents with ``points`` ((pk, lat, lng) triples)"""
+        buckets = defaultdict(dict)
+        cells = {}
+        for pk, lat, lng in points:
+            cell = self._cell(lat, lng)
+            buckets[cell][pk] = (lat, lng)
+            cells[pk] = cell
+        with self._lock:
+            journal = self._journal or []
+            self._buckets, self._cells, self._journal = buckets, cells, None
+            # The query may have missed edits saved while it ran
+            for pk, point in journal:
+                if point is None:
+                    self._discard(pk)
+                else:
+                    self._put(pk, *point)
+            self.loaded_at = time.monotonic()
+
+    def abort_reload(self):
+        with self._lock:
+            self._journal = None
+
+    def invalidate(self):
+        """Force a reload on next use, e.g. after bulk writes that skip signals"""
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self._cells)
+
+    def within(self, lat, lng, miles):
+        """Return {pk: distance in miles} for every point within ``miles`` of (lat, lng)"""
+        lat_span = miles / MILES_PER_DEGREE_LATITUDE
+        lng_span = lat_span / max(math.cos(math.radians(lat)), 0.01)
+        low_row, low_col = self._cell(lat - lat_span, lng - lng_span)
+        high_row, high_col = self._cell(lat + lat_span, lng + lng_span)
+        found = {}
+        with self._lock:
+            for row in range(low_row, high_row + 1):
+                for col in range(low_col, high_col + 1):
+                    for pk, (point_lat, point_lng) in self._buckets.get((row, col), {}).items():
+                        distance = distance_miles(lat, lng, point_lat, point_lng)
+                        if distance <= miles:
+                            found[pk] = distance
+        return found
+
+
+property_index = SpatialIndex()
+
+
+def _points():
+    return Property.objects.filter(latitude__isnull=False).values_list('pk', 'latitude', 'longitude').iterator()
+
+
+def reload_index():
+    """Reload the index from the database; runs on a background thread started by get_index()"""
+    try:
+        property_index.load(_points())
+    except Exception:
+        property_index.abort_reload()
+        raise
+    finally:
+        connections.close_all()
+
+
+def get_index():
+    """The process-wide property index.
+
+    Loaded inline the first time; once older than GEO_INDEX_MAX_AGE it is
+    reloaded in the background and the current contents keep being served.
+    """
+    loaded_at = property_index.loaded_at
+    if loaded_at is None:
+        property_index.load(_points())
+    elif time.monotonic() - loaded_at > settings.GEO_INDEX_MAX_AGE and property_index.begin_reload():
+        threading.Thread(target=reload_index, name='geo-index-reload', daemon=True).start()
+    return property_index
+
+
+def index_property(property_obj):
+    """Keep an already-loaded index in step with one saved property"""
+    if property_index.loaded_at is None:
+        return
+    if property_obj.latitude is None:
+        property_index.remove(property_obj.pk)
+    else:
+        property_index.add(property_obj.pk, property_obj.latitude, property_obj.longitude)
+
+
+def properties_within(zip_code, miles):
+    """Return {property pk: distance} within ``miles`` of a zip's centroid, or None for an unknown zip"""
+    centroid = zip_centroid(zip_code)
+    if centroid is None:
+        return None
+    return get_index().within(*centroid, miles)
+
+
+def filter_near(queryset, zip_code, miles):
+    """Restrict ``queryset`` to listings within ``miles`` of a zip code.
+
+    Returns ``(queryset, {pk: distance})``, or ``(None, None)`` if the zip
+    isn't in the dataset. Very dense areas can match more pks than fit in
+    one IN clause; those fall back to a bounding box plus a flat-earth
+    distance check in SQL, which is within a fraction of a percent at
+    these radii.
+    """
+    distances = properties_within(zip_code, miles)
+    if distances is None:
+        return None, None
+    if len(distances) <= MAX_PK_FILTER:
+        return queryset.filter(pk__in=list(distances)), distances
+
+    lat, lng = zip_centroid(zip_code)
+    lat_span = miles / MILES_PER_DEGREE_LATITUDE
+    lng_scale = max(math.cos(math.radians(lat)), 0.01)
+    lng_span = lat_span / lng_scale
+    flat_distance_sq = (
+        (F('latitude') - lat) * (F('latitude') - lat)
+        + (F('longitude') - lng) * (F('longitude') - lng) * (lng_scale * lng_scale)
+    )
+    queryset = queryset.filter(
+        latitude__range=(lat - lat_span, lat + lat_span),
+        longitude__range=(lng - lng_span, lng + lng_span),
+    ).alias(flat_distance_sq=flat_distance_sq).filter(flat_distance_sq__lte=lat_span * lat_span)
+    return queryset, distances
@@ -0,0 +1,101 @@
+"""Threaded messaging with denormalized inbox state.
+
+Every write goes through ``send_message()`` and ``mark_read()``, which
+keep three counters in step inside one transaction:
+
+* Conversation.last_message / last_message_at, for the thread preview;
+* ConversationMember.unread_count and last_message_at, one row per user
+  per conversation, which is all an inbox page reads;
+* User.unread_messages, the total shown in the navigation bar.
+
+Listing an inbox is then a keyset-paginated scan of one user's member rows
+on ``inbox_order_idx``, so it costs the same for 10 or 10 million messages.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import Conversation, ConversationMember, Message, User
+from .pagination import keyset_paginate
+
+INBOX_ORDERING = ('-last_message_at', '-id')
+THREAD_ORDERING = ('-created_at', '-id')
+PAGE_SIZE = 20
+
+
+def find_conversation(user, other, property_obj=None):
+    """The conversation between ``user`` and ``other`` about ``property_obj``, if any"""
+    return (
+        Conversation.objects.filter(property=property_obj, members__user=user)
+        .filter(members__user=other)
+        .first()
+    )
+
+
+def start_conversation(user, other, subject, property_obj=None):
+    """Return the existing conversation for this pair and property, or create it"""
+    with transaction.atomic():
+        conversation = find_conversation(user, other, property_obj)
+        if conversation is None:
+            conversation = Conversation.objects.create(property=property_obj, subject=subject)
+            ConversationMember.objects.bulk_create([
+                ConversationMember(conversation=conversation, user=user),
+                ConversationMember(conversation=conversation, user=other),
+            ])
+    return conversation
+
+
+def send_message(conversation, sender, body):
+    """Add a message from ``sender`` to the other member of ``conversation``"""
+    with transaction.atomic():
+        recipient_id = (
+            conversation.members.exclude(user=sender).values_list('user_id', flat=True).get()
+        )
+        message = Message.objects.create(
+            conversation=conversation,
+            sender=sender,
+            recipient_id=recipient_id,
+            property=conversation.property,
+            subject=conversation.subject,
+            body=body,
+        )
+        Conversation.objects.filter(pk=conversation.pk).update(
+            last_message=message, last_message_at=message.created_at,
+        )
+        conversation.last_message, conversation.last_message_at = message, message.created_at
+        members = ConversationMember.objects.filter(conversation=conversation)
+        members.filter(user=sender).update(last_message_at=message.created_at)
+        members.filter(user_id=recipient_id).update(
+            last_message_at=message.created_at, unread_count=F('unread_count') + 1,
+        )
+        User.objects.filter(pk=recipient_id).update(unread_messages=F('unread_messages') + 1)
+    return message
+
+
+def mark_read(conversation, user):
+    """Mark everything ``user`` received in ``conversation`` as read; returns how many were unread"""
+    with transaction.atomic():
+        member = ConversationMember.objects.select_for_update().get(conversation=conversation, user=user)
+        unread = member.unread_count
+        if not unread:
+            return 0
+        Message.objects.filter(conversation=conversation, recipient=user, is_read=False).update(is_read=True)
+        ConversationMember.objects.filter(pk=member.pk).update(unread_count=0)
+        User.objects.filter(pk=user.pk).update(unread_messages=Greatest(F('unread_messages') - unread, 0))
+    user.unread_messages = max(user.unread_messages - unread, 0)
+    return unread
+
+
+def inbox_page(user, cursor=None, page_size=PAGE_SIZE):
+    """One KeysetPage of ``user``'s conversation memberships, most recent activity first"""
+    memberships = ConversationMember.objects.filter(user=user).select_related(
+        'conversation__property', 'conversation__last_message__sender',
+    )
+    return keyset_paginate(memberships, INBOX_ORDERING, key='inbox', cursor=cursor, page_size=page_size)
+
+
+def thread_page(conversation, cursor=None, page_size=PAGE_SIZE):
+    """One KeysetPage of a conversation's messages, newest first"""
+    messages = Message.objects.filter(conversation=conversation).select_related('sender')
+    return keyset_paginate(messages, THREAD_ORDERING, key='thread', cursor=cursor, page_size=page_size)
+
@@ -0,0 +1,219 @@
+"""Database-backed queue for screening provider calls.
+
+Web requests only insert a ScreeningJob row; ``run_screening_worker``
+claims due jobs and runs them on a thread pool. A claim stamps the job
+with a random lock token and a ``locked_until`` deadline (the visibility
+timeout). If a worker dies mid-job, the job becomes claimable again
+once the deadline passes. Results are only written by the holder of the
+current token. Failed attempts are retried with exponential backoff
+until ``max_attempts`` is reached.
+
+Batches (one per landlord checkout covering many applicants) are claimed
+whole, with the same lock token and visibility timeout: their provider
+calls fan out over a thread pool and the resulting reports are written
+with a single ``bulk_create`` per flush.
+"""
+import datetime
+import logging
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import screening_cache
+from .models import ScreeningBatch, ScreeningJob, ScreeningReport
+from .providers import get_provider
+from .screening import generate_screening_report, report_fields
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VISIBILITY_TIMEOUT = 300
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 3600
+
+
+def enqueue_screening(application):
+    """Queue a screening for ``application`` unless one is already pending"""
+    with transaction.atomic():
+        job = ScreeningJob.objects.filter(
+            application=application, status__in=ScreeningJob.ACTIVE_STATUSES
+        ).first()
+        if job is None:
+            job = ScreeningJob.objects.create(application=application)
+    return job
+
+
+def latest_job(application):
+    return ScreeningJob.objects.filter(application=application).order_by('-created_at', '-id').first()
+
+
+def backoff_delay(attempts):
+    """Seconds to wait before retry number ``attempts`` (full jitter)"""
+    ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def _claimable(now):
+    return (
+        Q(status='queued', run_after__lte=now) |
+        Q(status='running', locked_until__lte=now)
+    )
+
+
+def claim(model, limit, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT):
+    """Lock up to ``limit`` due rows of a job ``model`` for this worker; returns them as a queryset.
+
+    ``model`` needs ScreeningJob's status/run_after/locked_until/lock_token/
+    attempts fields.
+    """
+    now = timezone.now()
+    candidates = list(
+        model.objects.filter(_claimable(now))
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    if not candidates:
+        return model.objects.none()
+    token = uuid.uuid4().hex
+    # Re-checking the claim condition in the UPDATE means a job grabbed by
+    # another worker between the SELECT and here is skipped.
+    model.objects.filter(_claimable(now), id__in=candidates).update(
+        status='running',
+        lock_token=token,
+        locked_until=now + datetime.timedelta(seconds=visibility_timeout),
+        attempts=F('attempts') + 1,
+    )
+    return model.objects.filter(id__in=candidates, lock_token=token)
+
+
+def claim_jobs(limit, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT):
+    """Lock up to ``limit`` due screening jobs for this worker and return them"""
+    return list(claim(ScreeningJob, limit, visibility_timeout).select_related('application'))
+
+
+def record_failure(job, owned, exc):
+    """Requeue a claimed ``job`` with backoff, or fail it for good; returns the new status.
+
+    ``owned`` is the queryset matching the job only while this worker holds it.
+    """
+    if job.attempts >= job.max_attempts:
+        status, run_after = 'failed', job.run_after
+    else:
+        status = 'queued'
+        run_after = timezone.now() + datetime.timedelta(seconds=backoff_delay(job.attempts))
+    owned.update(status=status, run_after=run_after, locked_until=None, last_error=repr(exc))
+    return status
+
+
+def run_job(job):
+    """Run one claimed job and record the outcome; returns the new status"""
+    owned = ScreeningJob.objects.filter(pk=job.pk, lock_token=job.lock_token, status='running')
+    try:
+        generate_screening_report(job.application)
+    except Exception as exc:
+        logger.exception('Screening job %s failed (attempt %s)', job.pk, job.attempts)
+        return record_failure(job, owned, exc)
+
+    owned.update(status='succeeded', locked_until=None, last_error='')
+    return 'succeeded'
+
+
+class BatchLockLost(Exception):
+    """Another worker claimed the batch after this worker's lock expired"""
+
+
+def claim_batch(visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT):
+    """Lock the oldest runnable batch for this worker, or return None"""
+    now = timezone.now()
+    claimable = Q(status='queued', run_after__lte=now) | Q(status='running', locked_until__lte=now)
+    batch = ScreeningBatch.objects.filter(claimable).order_by('created_at', 'id').first()
+    if batch is None:
+        return None
+    token = uuid.uuid4().hex
+    locked_until = now + datetime.timedelta(seconds=visibility_timeout)
+    claimed = ScreeningBatch.objects.filter(claimable, pk=batch.pk).update(
+        status='running', lock_token=token, locked_until=locked_until, attempts=F('attempts') + 1,
+    )
+    if not claimed:
+        return None
+    batch.refresh_from_db()
+    return batch
+
+
+def run_batch(batch, concurrency=8, flush_every=25, provider=None, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT):
+    """Screen every not-yet-screened application in ``batch`` concurrently.
+
+    Provider calls run on a thread pool and never touch the database; the
+    calling thread collects results and writes them with ``bulk_create``
+    every ``flush_every`` results, together with the progress counters, so a
+    crashed worker only repeats the unflushed tail. Each flush renews the
+    lock and only writes while this worker still holds it; if another
+    worker has taken the batch over, the remaining calls are dropped.
+    Applications that failed are retried by re-queueing the batch with
+    backoff until ``max_attempts``. Returns the number of reports created.
+    """
+    provider = provider or get_provider()
+    owned = ScreeningBatch.objects.filter(pk=batch.pk, lock_token=batch.lock_token, status='running')
+    applications = list(batch.applications.filter(screening__isnull=True))
+    completed, failed = batch.total - len(applications), 0
+    pending, fresh_results = [], {}
+
+    def flush(final=False):
+        fields = {
+            'completed': completed, 'failed': failed,
+            'locked_until': timezone.now() + datetime.timedelta(seconds=visibility_timeout),
+        }
+        if final and failed and batch.attempts < batch.max_attempts:
+            fields.update(
+                status='queued', locked_until=None,
+                run_after=timezone.now() + datetime.timedelta(seconds=backoff_delay(batch.attempts)),
+            )
+        elif final:
+            fields.update(status='completed', locked_until=None, finished_at=timezone.now())
+        with transaction.atomic():
+            if not owned.update(**fields):
+                raise BatchLockLost(batch.pk)
+            # ignore_conflicts: a one-off screening may have landed meanwhile.
+            ScreeningReport.objects.bulk_create(pending, ignore_conflicts=True)
+            screening_cache.store(fresh_results)
+        pending.clear()
+        fresh_results.clear()
+
+    # Tenants with a fresh cached result skip the provider entirely.
+    cached = screening_cache.lookup(a.tenant_id for a in applications)
+    for application in applications:
+        if application.tenant_id in cached:
+            pending.append(ScreeningReport(application=application, **report_fields(cached[application.tenant_id])))
+            completed += 1
+    applications = [a for a in applications if a.tenant_id not in cached]
+
+    created = 0
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        futures = {pool.submit(provider.screen, application): application for application in applications}
+        for future in as_completed(futures):
+            application = futures[future]
+            try:
+                result = future.result()
+            except Exception:
+                logger.exception('Batch %s: screening application %s failed', batch.pk, application.pk)
+                failed += 1
+            else:
+                pending.append(ScreeningReport(application=application, **report_fields(result)))
+                fresh_results[application.tenant_id] = result
+                completed += 1
+            if len(pending) >= flush_every:
+                flushed = len(pending)
+                flush()
+                created += flushed
+        flushed = len(pending)
+        flush(final=True)
+        created += flushed
+    except BatchLockLost:
+        logger.warning('Batch %s was claimed by another worker; dropping its remaining calls', batch.pk)
+    finally:
+        pool.shutdown(cancel_futures=True)
+    return created
@@ -0,0 +1,159 @@
+"""Lease PDF rendering.
+
+The lease generator and portfolio renewals only queue a LeaseRenderJob;
+``run_lease_worker`` claims the jobs (with the same visibility-timeout and
+backoff rules as screening jobs, see core/jobs.py) and renders each lease
+through ``templates/leases/lease_document.txt`` into a PDF.
+
+PDFs are stored content-addressed, under the SHA-256 of their bytes.
+Rendering is deterministic, so re-rendering an unchanged lease, or two
+leases with identical terms, reuses the file already on disk instead of
+writing a new one.
+"""
+import datetime
+import hashlib
+import logging
+from decimal import Decimal
+from functools import lru_cache
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.template.loader import get_template
+
+from . import jobs
+from .models import LeaseDocument, LeaseRenderJob
+from .pdf import render_pdf
+
+logger = logging.getLogger(__name__)
+
+LEASE_TEMPLATE = 'leases/lease_document.txt'
+# Generator fields kept in LeaseDocument.terms
+TERM_FIELDS = (
+    'landlord_name', 'tenant_name', 'address', 'city_state_zip', 'late_fee', 'pets_allowed', 'utilities',
+    'special_conditions',
+)
+
+
+@lru_cache(maxsize=None)
+def lease_template():
+    """The compiled lease template, loaded once per process"""
+    return get_template(LEASE_TEMPLATE)
+
+
+def lease_context(lease):
+    """Template data for ``lease``, with the same keys as the HTML preview's ``data``"""
+    terms = lease.terms or {}
+    property_obj = lease.property
+    data = {
+        'landlord_name': property_obj.landlord.get_full_name() or property_obj.landlord.username,
+        'tenant_name': lease.tenant.get_full_name() or lease.tenant.username,
+        'address': property_obj.address,
+        'city_state_zip': f'{property_obj.city}, {property_obj.state} {property_obj.zip_code}',
+        'special_conditions': lease.special_terms,
+    }
+    data.update({field: terms[field] for field in TERM_FIELDS if terms.get(field)})
+    data.update({
+        'agreement_date': lease.created_at.date(),
+        'start_date': lease.lease_start_date,
+        'end_date': lease.lease_end_date,
+        'rent_amount': lease.monthly_rent,
+        'deposit_amount': lease.security_deposit,
+        'renewal_of': lease.renewal_of.lease_end_date if lease.renewal_of_id else None,
+    })
+    return data
+
+
+def _blocks(text):
+    """Turn the plain-text template output into (style, text) blocks for render_pdf()"""
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('## '):
+            yield 'heading', line[3:]
+        elif line.startswith('# '):
+            yield 'title', line[2:]
+        elif line:
+            yield 'body', line
+
+
+def render_lease_pdf(lease):
+    text = lease_template().render({'data': lease_context(lease)})
+    return render_pdf(_blocks(text), title=f'Residential Lease Agreement - {lease.property.address}')
+
+
+def store_pdf(content):
+    """Save ``content`` under its SHA-256 unless already stored; returns (name, digest)"""
+    digest = hashlib.sha256(content).hexdigest()
+    name = f'leases/{digest[:2]}/{digest}.pdf'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+    return name, digest
+
+
+def render_lease(lease):
+    """Render ``lease`` to PDF and attach it; returns the stored file name"""
+    name, digest = store_pdf(render_lease_pdf(lease))
+    LeaseDocument.objects.filter(pk=lease.pk).update(document_file=name, document_sha256=digest)
+    lease.document_file.name, lease.document_sha256 = name, digest
+    return name
+
+
+def enqueue_render(lease):
+    """Queue a PDF render for ``lease`` unless one is already pending"""
+    with transaction.atomic():
+        job = LeaseRenderJob.objects.filter(lease=lease, status__in=LeaseRenderJob.ACTIVE_STATUSES).first()
+        if job is None:
+            job = LeaseRenderJob.objects.create(lease=lease)
+    return job
+
+
+def claim_render_jobs(limit, visibility_timeout=jobs.DEFAULT_VISIBILITY_TIMEOUT):
+    return list(
+        jobs.claim(LeaseRenderJob, limit, visibility_timeout)
+        .select_related('lease__property__landlord', 'lease__tenant', 'lease__renewal_of')
+    )
+
+
+def run_render_job(job):
+    """Render one claimed job's lease and record the outcome; returns the new status"""
+    owned = LeaseRenderJob.objects.filter(pk=job.pk, lock_token=job.lock_token, status='running')
+    try:
+        render_lease(job.lease)
+    except Exception as exc:
+        logger.exception('Lease render job %s failed (attempt %s)', job.pk, job.attempts)
+        return jobs.record_failure(job, owned, exc)
+
+    owned.update(status='succeeded', locked_until=None, last_error='')
+    return 'succeeded'
+
+
+def renew_portfolio(landlord, rent_increase_percent=0):
+    """Draft a renewal of every fully executed lease on ``landlord``'s properties and queue the PDFs.
+
+    Each renewal starts the day after the current lease ends and runs for
+    the same length. Leases already renewed are skipped, so running this
+    twice is harmless. Returns the renewals created.
+    """
+    multiplier = 1 + Decimal(str(rent_increase_percent)) / 100
+    current = LeaseDocument.objects.filter(property__landlord=landlord, status='signed_both').exclude(
+        Exists(LeaseDocument.objects.filter(renewal_of=OuterRef('pk')))
+    )
+    renewals = []
+    for lease in current:
+        start = lease.lease_end_date + datetime.timedelta(days=1)
+        renewals.append(LeaseDocument(
+            property_id=lease.property_id,
+            tenant_id=lease.tenant_id,
+            renewal_of=lease,
+            lease_start_date=start,
+            lease_end_date=start + (lease.lease_end_date - lease.lease_start_date),
+            monthly_rent=(lease.monthly_rent * multiplier).quantize(Decimal('0.01')),
+            security_deposit=lease.security_deposit,
+            special_terms=lease.special_terms,
+            terms=lease.terms,
+        ))
+    with transaction.atomic():
+        LeaseDocument.objects.bulk_create(renewals, batch_size=500)
+        LeaseRenderJob.objects.bulk_create([LeaseRenderJob(lease=lease) for lease in renewals], batch_size=500)
+    return renewals
@@ -0,0 +1,198 @@
+"""Cached listing fragments for the home page, property search and detail pages.
+
+The listing markup is rendered once per distinct set of (normalized)
+parameters and stored in the cache named by ``settings.LISTING_CACHE_ALIAS``.
+The rest of each page (navigation, messages, forms, apply buttons) is
+still rendered per request, so cached HTML never contains anything
+user-specific.
+
+Every key embeds a version number that Property save/delete signals bump,
+so a listing change orphans all cached fragments at once instead of
+anyone having to track which pages showed it. Orphans simply age out.
+Writes that skip signals (``update()``, ``bulk_create()``) should call
+``invalidate()`` themselves.
+
+Popular pages are protected from stampedes in three ways:
+
+* Single flight: when an entry is missing, one caller computes it while
+  concurrent callers for the same key wait for that result (up to
+  ``LISTING_CACHE_WAIT`` seconds) instead of all hitting the database.
+* Stale-while-revalidate: entries outlive ``LISTING_CACHE_TTL`` by
+  ``LISTING_CACHE_STALE_TTL``. In that window one caller refreshes the
+  entry while everyone else is served the previous copy.
+* Probabilistic early expiry: each read may start that refresh a little
+  before the TTL is up, more likely the closer to expiry and the slower
+  the entry was to compute, so refreshes of a hot key spread out instead
+  of lining up on one instant.
+
+An invalidation is never served stale: the new version has no entry yet,
+so the single-flight path applies.
+
+With the default local-memory backend each process has its own cache and
+version, so another process's edits show up after the TTL. Point the
+alias at a shared backend (Redis, Memcached) to invalidate everywhere at
+once; the refresh lock is taken with ``cache.add()``, so single flight
+then holds across processes too. Counters are per process.
+"""
+import hashlib
+import math
+import random
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .screening_cache import CacheCounters
+
+VERSION_KEY = 'listings:version'
+# Larger values refresh earlier; 1.0 is the usual choice
+EARLY_EXPIRY_BETA = 1.0
+# Seconds before a refresh lock is considered abandoned
+LOCK_TIMEOUT = 30
+# Seconds between checks while waiting on another process's computation
+POLL_INTERVAL = 0.02
+
+counters = CacheCounters(names=(
+    'hits', 'misses', 'invalidations',
+    # Served the previous copy while another caller refreshed it
+    'stale_hits',
+    # Waited for another caller's computation instead of repeating it
+    'coalesced',
+    # Computations run, whether for a miss or a refresh
+    'computes',
+))
+
+# Keys being computed in this process: {key: threading.Event}
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.LISTING_CACHE_ALIAS]
+
+
+def current_version():
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock rather than 1 so an evicted version can never
+        # come back and resurrect fragments cached under it.
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Orphan every cached listing fragment"""
+    cache = _cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+    counters.add('invalidations')
+
+
+def cache_key(name, params):
+    """Key for fragment ``name`` rendered with ``params``; empty values are ignored"""
+    query = urlencode(sorted((key, value) for key, value in params.items() if value not in ('', None)))
+    digest = hashlib.sha1(query.encode()).hexdigest()
+    return f'listings:{current_version()}:{name}:{digest}'
+
+
+def _needs_refresh(refresh_at, compute_seconds, beta=EARLY_EXPIRY_BETA):
+    # XFetch: -log(u) is exponentially distributed, so most reads see a
+    # small head start and a few see a large one.
+    head_start = -compute_seconds * beta * math.log(1.0 - random.random())
+    return time.time() + head_start >= refresh_at
+
+
+def _compute(cache, key, compute):
+    """Run ``compute`` and store the result; callers must hold the key's lock"""
+    event = threading.Event()
+    with _flights_lock:
+        _flights[key] = event
+    try:
+        started = time.monotonic()
+        value = compute()
+        elapsed = time.monotonic() - started
+        ttl = settings.LISTING_CACHE_TTL
+        cache.set(key, (value, time.time() + ttl, elapsed), ttl + settings.LISTING_CACHE_STALE_TTL)
+        counters.add('computes')
+        return value
+    finally:
+        cache.delete(f'{key}:lock')
+        with _flights_lock:
+            _flights.pop(key, None)
+        event.set()
+
+
+def _lock(cache, key):
+    return cache.add(f'{key}:lock', 1, LOCK_TIMEOUT)
+
+
+def _fill(cache, key, compute):
+    """Compute a missing entry once, with concurrent callers waiting for it"""
+    deadline = time.monotonic() + settings.LISTING_CACHE_WAIT
+    while True:
+        if _lock(cache, key):
+            return _compute(cache, key, compute)
+        with _flights_lock:
+            event = _flights.get(key)
+        if event is not None:
+            event.wait(max(deadline - time.monotonic(), 0))
+        else:
+            # Computing in another process
+            time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            counters.add('coalesced')
+            return entry[0]
+        if time.monotonic() >= deadline:
+            # The computation is stuck or failed; don't make this request wait any longer
+            value = compute()
+            counters.add('computes')
+            return value
+
+
+def get_or_compute(name, params, compute):
+    """The cached value for fragment ``name`` with ``params``, calling ``compute()`` to fill or refresh it.
+
+    ``compute`` must return something the cache backend can pickle.
+    """
+    cache = _cache()
+    key = cache_key(name, params)
+    entry = cache.get(key)
+    if entry is None:
+        counters.add('misses')
+        return _fill(cache, key, compute)
+
+    value, refresh_at, compute_seconds = entry
+    if _needs_refresh(refresh_at, compute_seconds) and _lock(cache, key):
+        return _compute(cache, key, compute)
+    if time.time() >= refresh_at:
+        # Someone else is already refreshing it
+        counters.add('stale_hits')
+    else:
+        counters.add('hits')
+    return value
+
+
+def render_cached(name, params, template_name, get_context):
+    """Render ``template_name`` with ``get_context()`` unless it's cached for these params.
+
+    ``get_context`` is only called on a miss or refresh, so it should do
+    all of the fragment's database work.
+    """
+    html = get_or_compute(name, params, lambda: render_to_string(template_name, get_context()))
+    return mark_safe(html)
+
+
+def cache_stats():
+    stats = counters.snapshot()
+    lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+    stats['hit_rate'] = (stats['hits'] + stats['stale_hits']) / lookups if lookups else 0.0
+    return stats
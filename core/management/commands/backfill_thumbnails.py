@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from core import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Renders thumbnails for listing photos and profile pictures that have none yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=list(thumbnails.TARGETS), action='append',
+                            help='Only this kind of image (repeatable; default all)')
+        parser.add_argument('--force', action='store_true', help='Re-render images that already have thumbnails')
+        parser.add_argument('--workers', type=int, help='Rendering processes (default THUMBNAIL_WORKERS)')
+        parser.add_argument('--batch-size', type=int, default=100, help='Images read and submitted per round')
+
+    def handle(self, *args, **options):
+        rendered = failed = 0
+        with thumbnails.process_pool(options['workers']) as pool:
+            for kind in options['kind'] or thumbnails.TARGETS:
+                results = thumbnails.backfill(kind, force=options['force'], batch_size=options['batch_size'],
+                                              executor=pool)
+                for (_, pk, source, _), manifest, error in results:
+                    if error is not None:
+                        failed += 1
+                        self.stderr.write(f'{kind} {pk} ({source}): {error!r}')
+                    elif manifest is not None:
+                        rendered += 1
+        summary = f'Rendered thumbnails for {rendered} images; {failed} failed'
+        if failed:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
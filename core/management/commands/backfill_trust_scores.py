@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db.models import Max, Min
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Recomputes the stored trust score and badge for every user in primary-key batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bounds = User.objects.aggregate(lo=Min('pk'), hi=Max('pk'))
+        if bounds['lo'] is None:
+            self.stdout.write(self.style.WARNING('No users to backfill'))
+            return
+
+        updated = 0
+        start = bounds['lo']
+        while start <= bounds['hi']:
+            # Each batch is one UPDATE ... SET trust_score = <expression> over a pk range,
+            # so nothing is loaded into Python and each transaction stays short.
+            updated += User.objects.filter(
+                pk__gte=start, pk__lt=start + batch_size
+            ).recompute_trust_scores()
+            start += batch_size
+            self.stdout.write(f'Processed users up to id {start - 1} ({updated} updated)')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled trust scores for {updated} users'))
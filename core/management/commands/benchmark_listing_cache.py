@@ -0,0 +1,79 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+from core import listing_cache
+
+
+class Command(BaseCommand):
+    help = ('Measures how many backend computations a burst of concurrent requests for one listing page '
+            'triggers, with and without single-flight protection')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,10,50,100,200',
+                            help='Comma-separated numbers of simultaneous requesters')
+        parser.add_argument('--compute-ms', type=float, default=50,
+                            help='Simulated cost of the queries and template render behind one page')
+
+    def handle(self, *args, **options):
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        compute_seconds = options['compute_ms'] / 1000
+        cache = caches[settings.LISTING_CACHE_ALIAS]
+
+        self.stdout.write(f'{"requesters":>10}  {"scenario":<14}  {"computes":>8}  {"p50 ms":>8}  {"max ms":>8}')
+        for level in levels:
+            for scenario in ('naive miss', 'cold miss', 'expired entry'):
+                name = f'benchmark-{scenario.replace(" ", "-")}-{level}-{time.monotonic_ns()}'
+                calls = []
+
+                def compute():
+                    calls.append(1)
+                    time.sleep(compute_seconds)
+                    return 'x' * 20000
+
+                if scenario == 'naive miss':
+                    key = listing_cache.cache_key(name, {})
+
+                    def request():
+                        # Plain get-or-set, as the cache worked before single flight
+                        if cache.get(key) is None:
+                            cache.set(key, compute(), settings.LISTING_CACHE_TTL)
+                else:
+                    if scenario == 'expired entry':
+                        listing_cache.get_or_compute(name, {}, compute)
+                        key = listing_cache.cache_key(name, {})
+                        value, _, elapsed = cache.get(key)
+                        cache.set(key, (value, time.time() - 1, elapsed))
+                        calls.clear()
+
+                    def request():
+                        listing_cache.get_or_compute(name, {}, compute)
+
+                timings = self.burst(level, request)
+                self.stdout.write(
+                    f'{level:>10}  {scenario:<14}  {len(calls):>8}  '
+                    f'{statistics.median(timings) * 1000:>8.1f}  {max(timings) * 1000:>8.1f}'
+                )
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def burst(self, level, request):
+        """Run ``request`` in ``level`` threads released at the same instant; returns each one's seconds"""
+        barrier = threading.Barrier(level)
+        timings = []
+
+        def run():
+            barrier.wait()
+            started = time.perf_counter()
+            request()
+            timings.append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=run) for _ in range(level)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings
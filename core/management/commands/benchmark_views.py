@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import view_benchmark
+
+
+class Command(BaseCommand):
+    help = ('Requests every page through the test client and reports p50/p95/p99 latency and queries per view; '
+            'run it against data generated by seed_scale')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Measured requests per view')
+        parser.add_argument('--warmup', type=int, default=1, help='Unmeasured requests per view first')
+        parser.add_argument('--cold-cache', action='store_true',
+                            help='Clear the listing cache before every request to measure misses')
+        parser.add_argument('--only', nargs='+', metavar='VIEW', help='Benchmark just these views')
+        parser.add_argument('--output', help='Save the results as JSON here')
+        parser.add_argument('--compare', metavar='JSON', help='Show p95 changes against an earlier --output file')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+        previous = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as fp:
+                    previous = json.load(fp)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read {options["compare"]}: {exc}')
+
+        self.stdout.write(f'{"view":<32} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"queries":>8} {"dupes":>6}')
+
+        def progress(label, result):
+            self.stdout.write(
+                f'{label:<32} {result["p50_ms"]:>8.1f} {result["p95_ms"]:>8.1f} {result["p99_ms"]:>8.1f} '
+                f'{result["queries"]:>8} {result["duplicates"]:>6}'
+            )
+
+        results = view_benchmark.run(
+            iterations=options['iterations'], warmup=options['warmup'], cold_cache=options['cold_cache'],
+            only=options['only'], progress=progress,
+        )
+        for label, reason in results['skipped'].items():
+            self.stdout.write(f'Skipped {label}: {reason}')
+
+        if previous is not None:
+            self.stdout.write(f'\np95 against {options["compare"]} ({previous.get("created_at", "unknown date")}):')
+            for label, before, after, change in view_benchmark.compare(previous, results):
+                change = f'{change:+.0%}' if change is not None else 'n/a'
+                self.stdout.write(f'{label:<32} {before:>8.1f} -> {after:>8.1f}  {change:>6}')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fp:
+                json.dump(results, fp, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Benchmark complete'))
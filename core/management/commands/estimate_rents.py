@@ -0,0 +1,30 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from core import rent_estimator
+
+
+class Command(BaseCommand):
+    help = 'Estimates rent for every unit in a CSV file and writes the results as CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('units', help='Path to a CSV with zip_code, bedrooms, bathrooms[, square_feet, ...]'
+                                          ' columns, or - for stdin')
+        parser.add_argument('--output', help='Write results here instead of stdout')
+        parser.add_argument('--batch-size', type=int, default=rent_estimator.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['units']
+        units = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for block in rent_estimator.estimate_csv(units, batch_size=options['batch_size']):
+                output.write(block)
+        finally:
+            if units is not sys.stdin:
+                units.close()
+            if options['output']:
+                output.close()
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Estimates written to {options['output']}"))
@@ -0,0 +1,61 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import property_import
+from core.models import User
+
+
+class Command(BaseCommand):
+    help = ('Creates listings for a landlord from a CSV or JSON Lines file of PropertyForm fields '
+            '(plus optional image_url), reporting rows that fail validation')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON Lines file, or - for stdin')
+        parser.add_argument('--landlord', required=True, help='Username of the landlord who owns the listings')
+        parser.add_argument('--format', choices=property_import.FORMATS,
+                            help='Input format; by default .jsonl/.ndjson files are JSON Lines and anything else CSV')
+        parser.add_argument('--batch-size', type=int, default=property_import.BATCH_SIZE)
+        parser.add_argument('--no-images', action='store_true', help='Ignore the image_url column')
+        parser.add_argument('--report', help='Write every row\'s outcome (line, id, error) to this CSV file')
+
+    def handle(self, *args, **options):
+        try:
+            landlord = User.objects.get(username=options['landlord'], role='landlord')
+        except User.DoesNotExist:
+            raise CommandError(f'No landlord named {options["landlord"]}')
+
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv')
+        source = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        report = open(options['report'], 'w', newline='', encoding='utf-8') if options['report'] else None
+        try:
+            results = property_import.import_properties(
+                property_import.read_records(source, file_format), landlord,
+                batch_size=options['batch_size'], fetch_images=not options['no_images'],
+            )
+            for block in property_import.report_csv(self.count(results)):
+                if report:
+                    report.write(block)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if report:
+                report.close()
+
+        summary = f'Imported {self.imported} listings; skipped {self.skipped} rows'
+        if self.skipped:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
+
+    def count(self, results):
+        """Tally results and print each skipped row as it goes by"""
+        self.imported = self.skipped = 0
+        for result in results:
+            if result.error:
+                self.skipped += 1
+                self.stderr.write(f'Line {result.line}: {result.error}')
+            else:
+                self.imported += 1
+            yield result
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import stripe_events
+
+
+class Command(BaseCommand):
+    help = 'Processes pending Stripe webhook events from the inbox in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help='Drain the inbox and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            results = stripe_events.process_pending(options['batch_size'])
+            if results:
+                self.stdout.write(', '.join(f'{count} {status}' for status, count in sorted(results.items())))
+            if results.get('processed'):
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS('Stripe inbox drained'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the property full-text search index from the listings table'
+
+    def handle(self, *args, **kwargs):
+        if not search.fts_enabled():
+            self.stdout.write(self.style.WARNING('Full-text index is only available on SQLite; nothing to do'))
+            return
+        indexed = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} properties'))
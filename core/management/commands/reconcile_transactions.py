@@ -0,0 +1,49 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import reconciliation
+
+
+class Command(BaseCommand):
+    help = 'Reconciles pending transactions against a Stripe export (CSV or JSONL), streaming it in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('export', help='Path to the export file, or - for stdin')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Defaults to the file extension')
+        parser.add_argument('--report', help='Write the mismatch report (CSV) here instead of stdout')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--id-field', help='Export column holding the checkout session ID')
+        parser.add_argument('--amount-in-cents', action='store_true',
+                            help='Export amounts are integer cents (Stripe API style)')
+        parser.add_argument('--dry-run', action='store_true', help='Report only; change nothing')
+
+    def handle(self, *args, **options):
+        path = options['export']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+
+        export = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        report = open(options['report'], 'w', newline='', encoding='utf-8') if options['report'] else self.stdout
+        try:
+            summary = reconciliation.reconcile(
+                reconciliation.iter_rows(export, fmt),
+                report_writer=reconciliation.report_writer(report),
+                batch_size=options['batch_size'],
+                id_field=options['id_field'],
+                amount_in_cents=options['amount_in_cents'],
+                dry_run=options['dry_run'],
+            )
+        except (ValueError, KeyError) as e:
+            raise CommandError(f'Could not read export: {e}')
+        finally:
+            if export is not sys.stdin:
+                export.close()
+            if options['report']:
+                report.close()
+
+        verb = 'would update' if options['dry_run'] else 'updated'
+        self.stderr.write(self.style.SUCCESS(
+            f"{summary['rows']} rows, {summary['matched']} matched, "
+            f"{verb} {summary['updated']}, {summary['mismatches']} mismatches"
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core import rent_estimator
+
+
+class Command(BaseCommand):
+    help = 'Refits the rent estimator regression over all listings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='First recompute the per-zip rent statistics from scratch')
+        parser.add_argument('--chunk-size', type=int, default=rent_estimator.FIT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            cells = rent_estimator.rebuild_statistics()
+            self.stdout.write(f'Rebuilt {cells} zip/bedroom statistics')
+
+        model = rent_estimator.fit_model(chunk_size=options['chunk_size'])
+        if model is None:
+            self.stdout.write(self.style.WARNING('Too few listings to fit; estimates keep the default rates'))
+            return
+        self.stdout.write(
+            f'rent = {model.intercept:.0f} + {model.bedrooms_coef:.0f}/bed + {model.bathrooms_coef:.0f}/bath'
+            f' + {model.square_feet_coef:.2f}/sqft (residual std {model.residual_std:.0f})'
+        )
+        self.stdout.write(self.style.SUCCESS(f'Fitted rent model on {model.listings} listings'))
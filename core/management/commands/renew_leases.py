@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import leases
+from core.models import User
+
+
+class Command(BaseCommand):
+    help = "Drafts renewals of every fully executed lease in a landlord's portfolio and queues their PDFs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('landlord', help='Username of the landlord')
+        parser.add_argument('--rent-increase', type=float, default=0, help='Percent added to the monthly rent')
+
+    def handle(self, *args, **options):
+        try:
+            landlord = User.objects.get(username=options['landlord'], role='landlord')
+        except User.DoesNotExist:
+            raise CommandError(f"No landlord named {options['landlord']!r}")
+
+        renewals = leases.renew_portfolio(landlord, rent_increase_percent=options['rent_increase'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Drafted {len(renewals)} renewals; run_lease_worker will render the PDFs'
+        ))
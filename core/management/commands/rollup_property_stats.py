@@ -0,0 +1,34 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import rollups
+
+
+class Command(BaseCommand):
+    help = 'Compacts old daily property activity rollups into weekly and monthly buckets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--daily-retention-days', type=int, default=90,
+                            help='Keep daily buckets this many days before rolling them into weeks')
+        parser.add_argument('--weekly-retention-days', type=int, default=365,
+                            help='Keep weekly buckets this many days before rolling them into months')
+        parser.add_argument('--backfill-applications', action='store_true',
+                            help='First rebuild daily application counts inside the daily retention window')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['backfill_applications']:
+            since = timezone.localdate() - datetime.timedelta(days=options['daily_retention_days'])
+            written = rollups.backfill_applications(since, batch_size=options['batch_size'])
+            self.stdout.write(f'Backfilled application counts for {written} property-days since {since}')
+
+        result = rollups.compact(
+            daily_retention_days=options['daily_retention_days'],
+            weekly_retention_days=options['weekly_retention_days'],
+            batch_size=options['batch_size'],
+        )
+        for period, (merged, deleted) in result.items():
+            self.stdout.write(f'{period}: {deleted} rows folded into {merged} buckets')
+        self.stdout.write(self.style.SUCCESS('Rollup compaction complete'))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import jobs, leases
+
+
+class Command(BaseCommand):
+    help = 'Renders queued lease PDFs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Jobs claimed per round')
+        parser.add_argument('--visibility-timeout', type=int, default=jobs.DEFAULT_VISIBILITY_TIMEOUT,
+                            help='Seconds before a claimed but unfinished job may be claimed again')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help='Drain the due jobs and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            claimed = leases.claim_render_jobs(options['batch_size'], options['visibility_timeout'])
+            # Rendering is CPU-bound pure Python, so jobs run one after another;
+            # run more worker processes to go faster.
+            for job in claimed:
+                status = leases.run_render_job(job)
+                self.stdout.write(f'Job {job.pk} (lease {job.lease_id}): {status}')
+            if claimed:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS('Lease worker stopped'))
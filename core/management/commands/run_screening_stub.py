@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from core.provider_stub import StubConfig, make_server
+
+
+class Command(BaseCommand):
+    help = 'Runs a local stub screening provider with configurable latency and error injection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8099)
+        parser.add_argument('--latency-ms', type=float, default=200)
+        parser.add_argument('--jitter-ms', type=float, default=50)
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls answered with 503')
+        parser.add_argument('--hang-rate', type=float, default=0.0,
+                            help='Fraction of calls that stall for --hang-ms (to exercise client timeouts)')
+        parser.add_argument('--hang-ms', type=float, default=30000)
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--verbose', action='store_true')
+
+    def handle(self, *args, **options):
+        config = StubConfig(
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            hang_rate=options['hang_rate'],
+            hang_ms=options['hang_ms'],
+            seed=options['seed'],
+        )
+        server = make_server(options['host'], options['port'], config, verbose=options['verbose'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Stub provider listening on http://{options["host"]}:{server.server_port}/v1/screenings'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,47 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+def _run_and_release(job):
+    try:
+        return jobs.run_job(job)
+    finally:
+        # Worker threads each hold their own connection; don't leak them.
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Runs queued screening jobs and batches on a thread pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--visibility-timeout', type=int, default=jobs.DEFAULT_VISIBILITY_TIMEOUT,
+                            help='Seconds before a claimed but unfinished job may be claimed again')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help='Drain the due jobs and exit')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while True:
+                batch = jobs.claim_batch(options['visibility_timeout'])
+                if batch is not None:
+                    created = jobs.run_batch(
+                        batch, concurrency=concurrency, visibility_timeout=options['visibility_timeout'],
+                    )
+                    self.stdout.write(f'Batch {batch.pk} (property {batch.property_id}): {created} reports')
+                    continue
+                claimed = jobs.claim_jobs(concurrency, options['visibility_timeout'])
+                if claimed:
+                    for job, status in zip(claimed, pool.map(_run_and_release, claimed)):
+                        self.stdout.write(f'Job {job.pk} (application {job.application_id}): {status}')
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS('Screening worker stopped'))
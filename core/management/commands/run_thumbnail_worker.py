@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import jobs, thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Renders queued thumbnails of listing photos and profile pictures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Jobs claimed per round')
+        parser.add_argument('--workers', type=int, help='Rendering processes (default THUMBNAIL_WORKERS)')
+        parser.add_argument('--visibility-timeout', type=int, default=jobs.DEFAULT_VISIBILITY_TIMEOUT,
+                            help='Seconds before a claimed but unfinished job may be claimed again')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help='Drain the due jobs and exit')
+
+    def handle(self, *args, **options):
+        with thumbnails.process_pool(options['workers']) as pool:
+            while True:
+                claimed = thumbnails.claim_jobs(options['batch_size'], options['visibility_timeout'])
+                for job, status in thumbnails.run_jobs(claimed, executor=pool):
+                    self.stdout.write(f'Job {job.pk} ({job.kind} {job.object_id}): {status}')
+                if claimed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS('Thumbnail worker stopped'))
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import seeding
+
+
+class Command(BaseCommand):
+    help = ('Generates large, reproducible volumes of landlords, tenants, listings, applications and messages '
+            'for performance testing')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--landlords', type=int, default=100)
+        parser.add_argument('--tenants', type=int, default=1000)
+        parser.add_argument('--properties', type=int, default=1000)
+        parser.add_argument('--applications', type=int, default=5000)
+        parser.add_argument('--conversations', type=int, default=1000)
+        parser.add_argument('--messages', type=int, default=5000,
+                            help='Spread over the conversations, at least one each')
+        parser.add_argument('--seed', type=int, default=0, help='The same seed always generates the same data')
+        parser.add_argument('--prefix', default='seed',
+                            help='Username prefix for generated users; must not be in use yet')
+        parser.add_argument('--batch-size', type=int, default=seeding.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            created = seeding.seed(
+                landlords=options['landlords'],
+                tenants=options['tenants'],
+                properties=options['properties'],
+                applications=options['applications'],
+                conversations=options['conversations'],
+                messages=options['messages'],
+                seed=options['seed'],
+                prefix=options['prefix'],
+                batch_size=options['batch_size'],
+                log=lambda message: self.stdout.write(f'{time.monotonic() - started:8.1f}s  {message}'),
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+        rows = sum(created.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {rows} rows in {time.monotonic() - started:.1f}s '
+            f'(log in as {options["prefix"]}-landlord-0000001 / {seeding.SEED_PASSWORD})'
+        ))
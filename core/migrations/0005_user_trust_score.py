@@ -0,0 +1,83 @@
+# Generated by Django 5.0.1 on 2026-10-17 00:43
+
+import core.models
+from django.db import migrations, models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Least
+from django.db.models.lookups import Exact, GreaterThanOrEqual
+
+# Frozen copies of core.models.TRUST_SCORE_WEIGHTS and
+# TRUST_BADGE_THRESHOLDS as of this migration
+TRUST_SCORE_WEIGHTS = {
+    "email": 10,
+    "phone_number": 10,
+    "is_identity_verified": 20,
+    "has_employment_history": 20,
+    "has_rental_history": 20,
+    "background_check_clear": 20,
+}
+TRUST_BADGE_THRESHOLDS = [("gold", 90), ("silver", 70), ("bronze", 50)]
+
+
+def backfill_trust_scores(apps, schema_editor):
+    User = apps.get_model("core", "User")
+    terms = [
+        Case(When(Exact(F(field), ""), then=Value(0)), default=Value(points))
+        if field in ("email", "phone_number")
+        else Case(When(Exact(F(field), True), then=Value(points)), default=Value(0))
+        for field, points in TRUST_SCORE_WEIGHTS.items()
+    ]
+    score = Least(
+        sum(terms[1:], terms[0]),
+        Value(100),
+        output_field=models.PositiveSmallIntegerField(),
+    )
+    badge = Case(
+        *[
+            When(GreaterThanOrEqual(score, threshold), then=Value(badge))
+            for badge, threshold in TRUST_BADGE_THRESHOLDS
+        ],
+        default=Value("unranked"),
+        output_field=models.CharField(),
+    )
+    User.objects.update(trust_score=score, trust_badge=badge)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_transaction"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", core.models.CustomUserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="trust_badge",
+            field=models.CharField(
+                choices=[
+                    ("gold", "Gold"),
+                    ("silver", "Silver"),
+                    ("bronze", "Bronze"),
+                    ("unranked", "Unranked"),
+                ],
+                db_index=True,
+                default="unranked",
+                editable=False,
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="trust_score",
+            field=models.PositiveSmallIntegerField(
+                db_index=True, default=0, editable=False
+            ),
+        ),
+        migrations.RunPython(backfill_trust_scores, migrations.RunPython.noop),
+    ]
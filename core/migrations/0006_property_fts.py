@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-17 00:45
+
+from django.db import migrations
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS core_property_fts USING fts5("
+        "title, description, address, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO core_property_fts (rowid, title, description, address) "
+        "SELECT id, title, description, address FROM core_property"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS core_property_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_user_trust_score"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-17 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_property_fts"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["status", "created_at", "id"],
+                name="property_status_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["status", "monthly_rent", "id"], name="property_status_rent_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["status", "bedrooms", "id"], name="property_status_beds_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["status", "square_feet", "id"], name="property_status_sqft_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.0.1 on 2026-10-17 00:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_property_sort_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PropertyActivityRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("day", "Day"), ("week", "Week"), ("month", "Month")],
+                        default="day",
+                        max_length=5,
+                    ),
+                ),
+                ("period_start", models.DateField()),
+                ("views", models.PositiveIntegerField(default=0)),
+                ("applications", models.PositiveIntegerField(default=0)),
+                (
+                    "property",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="activity_rollups",
+                        to="core.property",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["period", "period_start"],
+                        name="rollup_period_start_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="propertyactivityrollup",
+            constraint=models.UniqueConstraint(
+                fields=("property", "period", "period_start"),
+                name="unique_property_rollup_bucket",
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.1 on 2026-10-17 00:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_screeningbatch"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TenantScreeningResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("credit_score", models.PositiveSmallIntegerField()),
+                ("criminal_record_clear", models.BooleanField(default=True)),
+                ("eviction_history_clear", models.BooleanField(default=True)),
+                ("employment_verified", models.BooleanField(default=False)),
+                ("income_verified", models.BooleanField(default=False)),
+                (
+                    "screened_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                ("hits", models.PositiveIntegerField(default=0)),
+                (
+                    "tenant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="screening_result",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+    ]
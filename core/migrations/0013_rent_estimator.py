@@ -0,0 +1,97 @@
+# Generated by Django 5.0.1 on 2026-10-17 00:58
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, FloatField, Sum
+from django.db.models.functions import Cast, Substr, Trim
+
+
+def backfill_rent_statistics(apps, schema_editor):
+    # A frozen copy of core.rent_estimator.aggregate_statistics() as of this migration
+    Property = apps.get_model("core", "Property")
+    RentStatistic = apps.get_model("core", "RentStatistic")
+    rent = Cast("monthly_rent", FloatField())
+    cells = (
+        Property.objects.order_by()
+        .annotate(zip5=Substr(Trim("zip_code"), 1, 5))
+        .values("zip5", "bedrooms")
+        .annotate(
+            listings=Count("id"),
+            rent_sum=Sum(rent),
+            rent_sq_sum=Sum(rent * rent),
+            bathrooms_sum=Sum(Cast("bathrooms", FloatField())),
+            square_feet_sum=Sum(Cast("square_feet", FloatField())),
+        )
+    )
+    RentStatistic.objects.bulk_create(
+        [RentStatistic(zip_code=row.pop("zip5"), **row) for row in cells],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_stripeevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RentModel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "fitted_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                ("listings", models.PositiveIntegerField()),
+                ("intercept", models.FloatField()),
+                ("bedrooms_coef", models.FloatField()),
+                ("bathrooms_coef", models.FloatField()),
+                ("square_feet_coef", models.FloatField()),
+                ("residual_std", models.FloatField()),
+                ("mean_square_feet", models.FloatField()),
+            ],
+            options={
+                "get_latest_by": "fitted_at",
+            },
+        ),
+        migrations.CreateModel(
+            name="RentStatistic",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("zip_code", models.CharField(max_length=5)),
+                ("bedrooms", models.IntegerField()),
+                ("listings", models.IntegerField(default=0)),
+                ("rent_sum", models.FloatField(default=0)),
+                ("rent_sq_sum", models.FloatField(default=0)),
+                ("bathrooms_sum", models.FloatField(default=0)),
+                ("square_feet_sum", models.FloatField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="rentstatistic",
+            constraint=models.UniqueConstraint(
+                fields=("zip_code", "bedrooms"), name="unique_rent_statistic_cell"
+            ),
+        ),
+        migrations.RunPython(backfill_rent_statistics, migrations.RunPython.noop),
+    ]
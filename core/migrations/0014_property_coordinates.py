@@ -0,0 +1,70 @@
+# Generated by Django 5.0.1 on 2026-10-17 01:02
+
+import csv
+from pathlib import Path
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def load_zip_centroids():
+    # A frozen copy of core.geo.zip_centroids() as of this migration
+    path = getattr(
+        settings,
+        "ZIP_CENTROIDS_FILE",
+        Path(__file__).resolve().parent.parent / "data" / "zip_centroids.csv",
+    )
+    with open(path, newline="", encoding="utf-8-sig") as fp:
+        gazetteer = fp.readline().startswith("GEOID")
+        fp.seek(0)
+        reader = csv.DictReader(fp, delimiter="\t" if gazetteer else ",")
+        if gazetteer:
+            reader.fieldnames = [name.strip() for name in reader.fieldnames]
+            columns = ("GEOID", "INTPTLAT", "INTPTLONG")
+        else:
+            columns = ("zip", "latitude", "longitude")
+        return {
+            row[columns[0]].strip(): (float(row[columns[1]]), float(row[columns[2]]))
+            for row in reader
+        }
+
+
+def backfill_coordinates(apps, schema_editor):
+    Property = apps.get_model("core", "Property")
+    centroids = None
+    batch = []
+    for property_obj in Property.objects.only("zip_code").iterator(chunk_size=1000):
+        if centroids is None:
+            centroids = load_zip_centroids()
+        centroid = centroids.get((property_obj.zip_code or "").strip()[:5])
+        if centroid is not None:
+            property_obj.latitude, property_obj.longitude = centroid
+            batch.append(property_obj)
+    Property.objects.bulk_update(batch, ["latitude", "longitude"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_rent_estimator"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="property",
+            name="latitude",
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="property",
+            name="longitude",
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["latitude", "longitude"], name="property_lat_lng_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_coordinates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,178 @@
+# Generated by Django 5.0.1 on 2026-10-17 01:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def thread_existing_messages(apps, schema_editor):
+    Conversation = apps.get_model("core", "Conversation")
+    ConversationMember = apps.get_model("core", "ConversationMember")
+    Message = apps.get_model("core", "Message")
+    User = apps.get_model("core", "User")
+
+    # One conversation per pair of users per property, oldest message first
+    threads = {}
+    for message in Message.objects.order_by("created_at", "id").iterator():
+        key = (
+            frozenset((message.sender_id, message.recipient_id)),
+            message.property_id,
+        )
+        threads.setdefault(key, []).append(message)
+
+    unread_totals = {}
+    for (users, property_id), thread in threads.items():
+        last = thread[-1]
+        conversation = Conversation.objects.create(
+            property_id=property_id,
+            subject=thread[0].subject,
+            last_message=last,
+            last_message_at=last.created_at,
+        )
+        Message.objects.filter(pk__in=[m.pk for m in thread]).update(
+            conversation=conversation
+        )
+        members = []
+        for user_id in users:
+            unread = sum(
+                1 for m in thread if m.recipient_id == user_id and not m.is_read
+            )
+            unread_totals[user_id] = unread_totals.get(user_id, 0) + unread
+            members.append(
+                ConversationMember(
+                    conversation=conversation,
+                    user_id=user_id,
+                    unread_count=unread,
+                    last_message_at=last.created_at,
+                )
+            )
+        ConversationMember.objects.bulk_create(members)
+
+    for user_id, unread in unread_totals.items():
+        User.objects.filter(pk=user_id).update(unread_messages=unread)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_lease_rendering"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ConversationMember",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("unread_count", models.PositiveIntegerField(default=0)),
+                (
+                    "last_message_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="unread_messages",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name="Conversation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("subject", models.CharField(max_length=200)),
+                ("last_message_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "last_message",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="core.message",
+                    ),
+                ),
+                (
+                    "property",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="conversations",
+                        to="core.property",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="conversation",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="messages",
+                to="core.conversation",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["recipient", "is_read", "created_at"], name="message_unread_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["conversation", "created_at", "id"], name="message_thread_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversationmember",
+            name="conversation",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="members",
+                to="core.conversation",
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversationmember",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="conversation_memberships",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversationmember",
+            index=models.Index(
+                fields=["user", "last_message_at", "id"], name="inbox_order_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="conversationmember",
+            constraint=models.UniqueConstraint(
+                fields=("conversation", "user"), name="unique_conversation_member"
+            ),
+        ),
+        migrations.RunPython(thread_existing_messages, migrations.RunPython.noop),
+    ]
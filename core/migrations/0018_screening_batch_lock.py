@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0017_thumbnails"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="screeningbatch",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="screeningbatch",
+            name="lock_token",
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name="screeningbatch",
+            name="max_attempts",
+            field=models.PositiveSmallIntegerField(default=3),
+        ),
+        migrations.AddField(
+            model_name="screeningbatch",
+            name="run_after",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0018_screening_batch_lock"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="stripeevent",
+            name="stripeevent_pending_idx",
+        ),
+        migrations.AddField(
+            model_name="stripeevent",
+            name="run_after",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name="stripeevent",
+            index=models.Index(
+                fields=["status", "run_after"], name="stripeevent_pending_idx"
+            ),
+        ),
+    ]
@@ -1,6 +1,119 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Least
+from django.db.models.lookups import Exact, GreaterThanOrEqual
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+
+# Fields that feed into User.trust_score, with the points each one is worth.
+TRUST_SCORE_WEIGHTS = {
+    'email': 10,
+    'phone_number': 10,
+    'is_identity_verified': 20,
+    'has_employment_history': 20,
+    'has_rental_history': 20,
+    'background_check_clear': 20,
+}
+TRUST_SCORE_FIELDS = tuple(TRUST_SCORE_WEIGHTS)
+
+# Changing any of these invalidates the tenant's cached screening result.
+VERIFICATION_FIELDS = (
+    'is_identity_verified', 'has_employment_history', 'has_rental_history', 'background_check_clear',
+)
+
+TRUST_BADGE_CHOICES = [
+    ('gold', 'Gold'),
+    ('silver', 'Silver'),
+    ('bronze', 'Bronze'),
+    ('unranked', 'Unranked'),
+]
+TRUST_BADGE_THRESHOLDS = [('gold', 90), ('silver', 70), ('bronze', 50)]
+
+
+def trust_badge_for_score(score):
+    for badge, threshold in TRUST_BADGE_THRESHOLDS:
+        if score >= threshold:
+            return badge
+    return 'unranked'
+
+
+def _as_expression(value):
+    return value if hasattr(value, 'resolve_expression') else Value(value)
+
+
+def trust_score_expression(values=None):
+    """SQL equivalent of User.calculate_trust_score().
+
+    ``values`` maps trust fields to the new values being written (as in
+    ``QuerySet.update()``) so the score reflects them instead of the old row.
+    """
+    values = values or {}
+    total = None
+    for field, points in TRUST_SCORE_WEIGHTS.items():
+        source = _as_expression(values[field]) if field in values else F(field)
+        if field in ('email', 'phone_number'):
+            term = Case(When(Exact(source, ''), then=Value(0)), default=Value(points))
+        else:
+            term = Case(When(Exact(source, True), then=Value(points)), default=Value(0))
+        total = term if total is None else total + term
+    return Least(total, Value(100), output_field=models.PositiveSmallIntegerField())
+
+
+def trust_badge_expression(score):
+    """SQL equivalent of trust_badge_for_score()"""
+    return Case(
+        *[When(GreaterThanOrEqual(score, threshold), then=Value(badge))
+          for badge, threshold in TRUST_BADGE_THRESHOLDS],
+        default=Value('unranked'),
+        output_field=models.CharField(),
+    )
+
+
+class UserQuerySet(models.QuerySet):
+    """Keeps the stored trust score current on bulk write paths"""
+
+    def update(self, **kwargs):
+        if set(kwargs) & set(VERIFICATION_FIELDS):
+            from .screening_cache import invalidate_tenants
+            invalidate_tenants(self.values('pk'))
+        if set(kwargs) & set(TRUST_SCORE_FIELDS) and 'trust_score' not in kwargs:
+            score = trust_score_expression(kwargs)
+            kwargs['trust_score'] = score
+            kwargs['trust_badge'] = trust_badge_expression(score)
+        return super().update(**kwargs)
+
+    update.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        fields = list(fields)
+        if set(fields) & set(TRUST_SCORE_FIELDS):
+            for obj in objs:
+                obj.refresh_trust_score()
+            fields += [f for f in ('trust_score', 'trust_badge') if f not in fields]
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+    bulk_update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.refresh_trust_score()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    bulk_create.alters_data = True
+
+    def recompute_trust_scores(self):
+        """Recompute stored scores for every row in a single UPDATE"""
+        score = trust_score_expression()
+        return super().update(trust_score=score, trust_badge=trust_badge_expression(score))
+
+    recompute_trust_scores.alters_data = True
+
+
+class CustomUserManager(UserManager.from_queryset(UserQuerySet)):
+    """Auth user manager backed by UserQuerySet"""
 
 
 class User(AbstractUser):
@@ -19,36 +132,70 @@ class User(AbstractUser):
     has_rental_history = models.BooleanField(default=False)
     background_check_clear = models.BooleanField(default=False)
 
+    # Denormalized from the fields above; see refresh_trust_score()
+    trust_score = models.PositiveSmallIntegerField(default=0, db_index=True, editable=False)
+    trust_badge = models.CharField(
+        max_length=10, choices=TRUST_BADGE_CHOICES, default='unranked', db_index=True, editable=False
+    )
+
+    objects = CustomUserManager()
+
     def calculate_trust_score(self):
-        score = 0
-        if self.email:
-            score += 10
-        if self.phone_number:
-            score += 10
-        if self.is_identity_verified:
-            score += 20
-        if self.has_employment_history:
-            score += 20
-        if self.has_rental_history:
-            score += 20
-        if self.background_check_clear:
-            score += 20
+        score = sum(
+            points for field, points in TRUST_SCORE_WEIGHTS.items() if getattr(self, field)
+        )
         return min(score, 100)
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_verification = instance._verification_state()
+        return instance
+
+    def _verification_state(self):
+        return tuple(self.__dict__.get(field) for field in VERIFICATION_FIELDS)
+
     @property
-    def trust_badge(self):
-        score = self.calculate_trust_score()
-        if score >= 90: return 'gold'
-        if score >= 70: return 'silver'
-        if score >= 50: return 'bronze'
-        return 'unranked'
+    def verification_changed(self):
+        """True if a verification flag differs from the value loaded from the database"""
+        loaded = getattr(self, '_loaded_verification', None)
+        return loaded is not None and loaded != self._verification_state()
+
+    def refresh_trust_score(self):
+        self.trust_score = self.calculate_trust_score()
+        self.trust_badge = trust_badge_for_score(self.trust_score)
+
+    def save(self, *args, **kwargs):
+        self.refresh_trust_score()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(TRUST_SCORE_FIELDS):
+            kwargs['update_fields'] = set(update_fields) | {'trust_score', 'trust_badge'}
+        if self.verification_changed:
+            from .screening_cache import invalidate_tenants
+            invalidate_tenants([self.pk])
+        super().save(*args, **kwargs)
+        self._loaded_verification = self._verification_state()
+
+    # Unread messages across all conversations, kept by core/inbox.py
+    unread_messages = models.PositiveIntegerField(default=0, editable=False)
+
     profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    # Manifest of the resized copies of profile_picture; see core/thumbnails.py
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
 
 
+RENT_SAMPLE_FIELDS = ('zip_code', 'bedrooms', 'bathrooms', 'square_feet', 'monthly_rent')
+
+
+def normalize_zip(zip_code):
+    """Key rent statistics on the five-digit zip ('90210-1234' -> '90210')"""
+    return (zip_code or '').strip()[:5]
+
+
 class Property(models.Model):
     """Rental property listing"""
     STATUS_CHOICES = [
@@ -71,17 +218,125 @@ class Property(models.Model):
     security_deposit = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
     image = models.ImageField(upload_to='properties/', blank=True, null=True)
+    # Manifest of the resized copies of image; see core/thumbnails.py
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     views = models.IntegerField(default=0)
+    # Centroid of zip_code (see core/geo.py), filled in on save
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
     
     class Meta:
         verbose_name_plural = "Properties"
         ordering = ['-created_at']
+        # One index per listing sort mode (see views.PROPERTY_SORTS); each
+        # serves both directions for keyset pagination.
+        indexes = [
+            models.Index(fields=['status', 'created_at', 'id'], name='property_status_created_idx'),
+            models.Index(fields=['status', 'monthly_rent', 'id'], name='property_status_rent_idx'),
+            models.Index(fields=['status', 'bedrooms', 'id'], name='property_status_beds_idx'),
+            models.Index(fields=['status', 'square_feet', 'id'], name='property_status_sqft_idx'),
+            models.Index(fields=['latitude', 'longitude'], name='property_lat_lng_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.city}, {self.state}"
 
+    def save(self, *args, **kwargs):
+        from .geo import zip_centroid
+
+        self.latitude, self.longitude = zip_centroid(self.zip_code) or (None, None)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'zip_code' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'latitude', 'longitude'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_rent_sample = instance.rent_sample()
+        return instance
+
+    def rent_sample(self):
+        """The (zip, bedrooms, bathrooms, square feet, rent) this listing adds to RentStatistic"""
+        values = tuple(self.__dict__.get(field) for field in RENT_SAMPLE_FIELDS)
+        if None in values:
+            return None
+        zip_code, bedrooms, bathrooms, square_feet, monthly_rent = values
+        return (
+            normalize_zip(zip_code), int(bedrooms), float(bathrooms), float(square_feet), float(monthly_rent),
+        )
+
+
+class RentStatistic(models.Model):
+    """Running sums of the listings sharing a zip code and bedroom count.
+
+    Kept in step with Property by signals (core/signals.py) so the rent
+    estimator reads a couple of rows instead of scanning listings.
+    """
+    zip_code = models.CharField(max_length=5)
+    bedrooms = models.IntegerField()
+    listings = models.IntegerField(default=0)
+    rent_sum = models.FloatField(default=0)
+    rent_sq_sum = models.FloatField(default=0)
+    bathrooms_sum = models.FloatField(default=0)
+    square_feet_sum = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['zip_code', 'bedrooms'], name='unique_rent_statistic_cell'),
+        ]
+
+    def __str__(self):
+        return f"{self.zip_code} {self.bedrooms}bd ({self.listings})"
+
+
+class RentModel(models.Model):
+    """Coefficients of the rent regression, refitted by ``manage.py refresh_rent_model``"""
+    fitted_at = models.DateTimeField(default=timezone.now, db_index=True)
+    listings = models.PositiveIntegerField()
+    intercept = models.FloatField()
+    bedrooms_coef = models.FloatField()
+    bathrooms_coef = models.FloatField()
+    square_feet_coef = models.FloatField()
+    residual_std = models.FloatField()
+    mean_square_feet = models.FloatField()
+
+    class Meta:
+        get_latest_by = 'fitted_at'
+
+    def __str__(self):
+        return f"Rent model fitted {self.fitted_at:%Y-%m-%d %H:%M} on {self.listings} listings"
+
+
+class PropertyActivityRollup(models.Model):
+    """Per-property view and application counts bucketed by day, week or month"""
+    PERIOD_CHOICES = [
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+    ]
+
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='activity_rollups')
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES, default='day')
+    period_start = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    applications = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['property', 'period', 'period_start'], name='unique_property_rollup_bucket'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'period_start'], name='rollup_period_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.property_id} {self.period} {self.period_start}"
+
 
 class RentalApplication(models.Model):
     """Tenant application for a property"""
@@ -162,6 +417,86 @@ class ScreeningReport(models.Model):
         return f"Screening for {self.application.tenant.username}"
 
 
+class ScreeningJob(models.Model):
+    """Queued screening provider call for an application; see core/jobs.py"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    ACTIVE_STATUSES = ('queued', 'running')
+
+    application = models.ForeignKey(RentalApplication, on_delete=models.CASCADE, related_name='screening_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    # Earliest time the job may be claimed; pushed back on each retry.
+    run_after = models.DateTimeField(default=timezone.now)
+    # Visibility timeout: a running job whose lock has expired is claimable again.
+    locked_until = models.DateTimeField(null=True, blank=True)
+    lock_token = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='screeningjob_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"Screening job {self.pk} ({self.status}) for application {self.application_id}"
+
+
+class TenantScreeningResult(models.Model):
+    """Most recent bureau result for a tenant, reused across applications; see core/screening_cache.py"""
+    tenant = models.OneToOneField(User, on_delete=models.CASCADE, related_name='screening_result')
+    credit_score = models.PositiveSmallIntegerField()
+    criminal_record_clear = models.BooleanField(default=True)
+    eviction_history_clear = models.BooleanField(default=True)
+    employment_verified = models.BooleanField(default=False)
+    income_verified = models.BooleanField(default=False)
+    screened_at = models.DateTimeField(default=timezone.now, db_index=True)
+    hits = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Screening result for tenant {self.tenant_id} ({self.screened_at:%Y-%m-%d})"
+
+
+class ScreeningBatch(models.Model):
+    """Screening for many applicants of one property, paid in one checkout"""
+    STATUS_CHOICES = [
+        ('awaiting_payment', 'Awaiting Payment'),
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+    ]
+
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='screening_batches')
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='screening_batches')
+    applications = models.ManyToManyField(RentalApplication, related_name='screening_batches')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='awaiting_payment')
+    total = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    # Claimed like ScreeningJob: a run that leaves failures is retried with backoff
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    lock_token = models.CharField(max_length=32, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Screening batch {self.pk} for {self.property.title}"
+
+
 class LeaseDocument(models.Model):
     """Lease agreement document"""
     STATUS_CHOICES = [
@@ -184,6 +519,14 @@ class LeaseDocument(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     
     special_terms = models.TextField(blank=True)
+    # Lease generator fields with no column of their own (names, late fee,
+    # utilities, ...); see core/leases.py
+    terms = models.JSONField(default=dict, blank=True)
+    # SHA-256 of document_file, which is stored under that name
+    document_sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    renewal_of = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='renewals'
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -197,11 +540,110 @@ class LeaseDocument(models.Model):
         return f"Lease for {self.property.title} - {self.tenant.username}"
 
 
+class LeaseRenderJob(models.Model):
+    """Queued PDF render of a lease; claimed like ScreeningJob (see core/jobs.py)"""
+    STATUS_CHOICES = ScreeningJob.STATUS_CHOICES
+    ACTIVE_STATUSES = ScreeningJob.ACTIVE_STATUSES
+
+    lease = models.ForeignKey(LeaseDocument, on_delete=models.CASCADE, related_name='render_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    lock_token = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='leaserenderjob_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"Lease render job {self.pk} ({self.status}) for lease {self.lease_id}"
+
+
+class ThumbnailJob(models.Model):
+    """Queued thumbnail render of a listing photo or profile picture; see core/thumbnails.py"""
+    KIND_CHOICES = [
+        ('property', 'Property image'),
+        ('profile', 'Profile picture'),
+    ]
+    STATUS_CHOICES = ScreeningJob.STATUS_CHOICES
+    ACTIVE_STATUSES = ScreeningJob.ACTIVE_STATUSES
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # A Property or User pk, depending on kind; the job renders whatever image it has when claimed
+    object_id = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    lock_token = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='thumbnailjob_claim_idx'),
+            models.Index(fields=['kind', 'object_id'], name='thumbnailjob_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"Thumbnail job {self.pk} ({self.status}) for {self.kind} {self.object_id}"
+
+
+class Conversation(models.Model):
+    """Message thread between two users, optionally about a property; see core/inbox.py"""
+    property = models.ForeignKey(
+        Property, on_delete=models.CASCADE, related_name='conversations', null=True, blank=True
+    )
+    subject = models.CharField(max_length=200)
+    # Denormalized so an inbox page never touches the messages table
+    last_message = models.ForeignKey(
+        'Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.subject
+
+
+class ConversationMember(models.Model):
+    """One user's side of a conversation: its place in their inbox and their unread count"""
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='members')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversation_memberships')
+    unread_count = models.PositiveIntegerField(default=0)
+    # Copy of Conversation.last_message_at so the inbox sorts on this table alone
+    last_message_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['conversation', 'user'], name='unique_conversation_member'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'last_message_at', 'id'], name='inbox_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} in conversation {self.conversation_id}"
+
+
 class Message(models.Model):
     """Messages between landlord and tenant"""
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_messages')
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='messages', null=True, blank=True)
+    conversation = models.ForeignKey(
+        Conversation, on_delete=models.CASCADE, related_name='messages', null=True, blank=True
+    )
     
     subject = models.CharField(max_length=200)
     body = models.TextField()
@@ -211,6 +653,10 @@ class Message(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'is_read', 'created_at'], name='message_unread_idx'),
+            models.Index(fields=['conversation', 'created_at', 'id'], name='message_thread_idx'),
+        ]
     
     def __str__(self):
         return f"Message from {self.sender.username} to {self.recipient.username}"
@@ -233,8 +679,40 @@ class Transaction(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     stripe_session_id = models.CharField(max_length=255, unique=True)
     application = models.ForeignKey('RentalApplication', on_delete=models.SET_NULL, null=True, blank=True)
+    screening_batch = models.ForeignKey(
+        'ScreeningBatch', on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.username} - {self.purpose} - ${self.amount}"
+
+
+class StripeEvent(models.Model):
+    """Inbox of verified Stripe webhook events, drained by process_stripe_events"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    # A failed event is retried no earlier than this
+    run_after = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['received_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='stripeevent_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} ({self.event_id})"
@@ -0,0 +1,160 @@
+"""Live notifications pushed to browsers over Server-Sent Events.
+
+``broker`` is an in-process publish/subscribe hub. Each open
+``/notifications/stream/`` connection subscribes one asyncio queue for its
+user, and signals publish new messages and rental applications to the
+recipient once their transaction commits.
+
+Served under ASGI (``uvicorn config.asgi:application``), an idle
+connection is just a suspended coroutine and a small queue on the event
+loop, so one worker can hold thousands of them. A WSGI server would
+collect the endless stream into a list before sending anything while
+holding a worker thread, so under WSGI the stream answers 204 (which
+tells EventSource not to reconnect) and pages poll ``inbox_unread`` for
+the unread badge instead; see ``streaming_supported()``.
+
+The broker only reaches clients connected to the same process. Running
+several ASGI workers means a user only hears about events raised in the
+worker their stream is connected to; they still see everything on their
+next page load.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+
+# Events buffered per connection before the oldest are dropped
+QUEUE_SIZE = 100
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_SECONDS = 25
+# Milliseconds the browser waits before reconnecting
+RETRY_MILLISECONDS = 5000
+
+
+def streaming_supported(request):
+    """True if ``request`` came in over ASGI, where an open stream doesn't hold a thread"""
+    return isinstance(request, ASGIRequest)
+
+
+def live_notifications(request):
+    """Context processor: whether base.html opens the event stream or polls"""
+    return {
+        'notifications_streaming': streaming_supported(request),
+        'notifications_poll_ms': settings.NOTIFICATION_POLL_SECONDS * 1000,
+    }
+
+
+class Subscription:
+    """One connection's queue of (id, event, data) tuples"""
+
+    def __init__(self, broker, user_id, loop, maxsize=QUEUE_SIZE):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = loop
+        self.dropped = 0
+        self._queue = asyncio.Queue(maxsize)
+
+    def _put(self, item):
+        # Runs on self.loop. A client too slow to keep up loses its oldest
+        # events rather than holding memory without bound.
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(item)
+
+    async def get(self, timeout=None):
+        """The next event, or None if nothing arrives within ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+class Broker:
+    """Fan events out to every subscription of a user, from any thread"""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """Start receiving ``user_id``'s events on the running event loop"""
+        subscription = Subscription(self, user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def subscriber_count(self, user_id=None):
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscriptions.get(user_id, ()))
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def publish(self, user_id, event, data):
+        """Queue ``event`` for every connection of ``user_id``; returns how many were reached"""
+        with self._lock:
+            item = (next(self._ids), event, data)
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        delivered = 0
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, item)
+            except RuntimeError:
+                # The connection's loop has shut down without unsubscribing
+                self.unsubscribe(subscription)
+            else:
+                delivered += 1
+        return delivered
+
+
+broker = Broker()
+
+
+def publish_on_commit(user_id, event, data):
+    """Publish once the current transaction commits, so clients never fetch rows that don't exist yet"""
+    transaction.on_commit(lambda: broker.publish(user_id, event, data))
+
+
+def format_event(event_id, event, data):
+    """One Server-Sent Events frame"""
+    return f'id: {event_id}\nevent: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+async def event_stream(user_id, heartbeat=HEARTBEAT_SECONDS):
+    """Yield SSE frames of ``user_id``'s events until the client goes away.
+
+    The subscription is opened when the stream starts and closed when the
+    server cancels or closes the generator on disconnect.
+    """
+    async with broker.subscribe(user_id) as subscription:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'
+        while True:
+            item = await subscription.get(timeout=heartbeat)
+            if item is None:
+                # Keeps proxies from timing out the idle connection
+                yield ': keep-alive\n\n'
+            else:
+                yield format_event(*item)
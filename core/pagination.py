@@ -0,0 +1,101 @@
+"""Keyset (cursor) pagination.
+
+Each page is fetched with a WHERE clause that starts after the last row of
+the previous page, so with a matching index page 1000 costs the same as
+page 1. Cursors are signed so clients can't forge arbitrary filters.
+"""
+import datetime
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+
+CURSOR_SALT = 'core.pagination.cursor'
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_cursor: str | None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _decode_value(model, name, raw):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # Annotations (e.g. search_rank) are stored as plain JSON values.
+        return raw
+    return field.to_python(raw)
+
+
+def encode_cursor(key, values):
+    return signing.dumps({'k': key, 'v': [_encode_value(v) for v in values]}, salt=CURSOR_SALT)
+
+
+def decode_cursor(cursor, key):
+    """Return the raw values stored in ``cursor``, or None if it's invalid or for another ordering"""
+    try:
+        payload = signing.loads(cursor, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+    if not isinstance(payload, dict) or payload.get('k') != key:
+        return None
+    return payload.get('v')
+
+
+def _after(ordering, values):
+    """Build the filter for rows strictly after ``values`` in ``ordering``.
+
+    The leading ``<=``/``>=`` term repeats the first column on its own so the
+    database can turn it into an index range scan.
+    """
+    fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+    first, first_desc = fields[0]
+    condition = Q(**{f'{first}__{"lte" if first_desc else "gte"}': values[0]})
+
+    after = Q()
+    for i, (name, desc) in enumerate(fields):
+        step = Q(**{f'{name}__{"lt" if desc else "gt"}': values[i]})
+        for j in range(i):
+            step &= Q(**{fields[j][0]: values[j]})
+        after |= step
+    return condition & after
+
+
+def keyset_paginate(queryset, ordering, key, cursor=None, page_size=24):
+    """Return one KeysetPage of ``queryset`` ordered by ``ordering``.
+
+    ``ordering`` must end in a unique column (normally ``id``/``-id``) so the
+    sort is total. ``key`` names the ordering inside the cursor; a cursor
+    issued for a different key is ignored and the first page is returned.
+    """
+    names = [name.lstrip('-') for name in ordering]
+    queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        raw = decode_cursor(cursor, key)
+        if raw is not None and len(raw) == len(names):
+            values = [_decode_value(queryset.model, n, v) for n, v in zip(names, raw)]
+            queryset = queryset.filter(_after(ordering, values))
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(key, [getattr(last, n) for n in names])
+    return KeysetPage(items=rows, next_cursor=next_cursor)
@@ -0,0 +1,114 @@
+"""Minimal text-only PDF writer.
+
+Enough for generated paperwork such as leases: the standard Courier fonts
+(which every reader has, so nothing is embedded), word wrapping, page
+breaks and page numbers. The output is byte-for-byte identical for the
+same input, with no timestamps or random IDs, so callers can
+content-address the files.
+"""
+import textwrap
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US Letter, in points
+MARGIN = 72
+FOOTER_SIZE = 8
+# style: (font resource, base font, size, space after)
+STYLES = {
+    'title': ('F2', 'Courier-Bold', 14, 12),
+    'heading': ('F2', 'Courier-Bold', 11, 4),
+    'body': ('F1', 'Courier', 10, 8),
+}
+# Courier glyphs are all 600/1000 em wide
+CHAR_WIDTH = 0.6
+LEADING = 1.35
+
+
+def _escape(text):
+    encoded = text.encode('cp1252', errors='replace')
+    return encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def _layout(blocks):
+    """Split ``blocks`` ((style, text) pairs) into pages of (font, size, x, y, text) lines"""
+    usable_width = PAGE_WIDTH - 2 * MARGIN
+    pages, lines = [], []
+    y = PAGE_HEIGHT - MARGIN
+    for style, text in blocks:
+        font, _, size, space_after = STYLES[style]
+        width = int(usable_width / (size * CHAR_WIDTH))
+        wrapped = textwrap.wrap(text, width) or ['']
+        # Keep a heading on the same page as the first lines of its section
+        needed = len(wrapped) * size * LEADING + (3 * 10 * LEADING if style == 'heading' else 0)
+        if lines and y - needed < MARGIN:
+            pages.append(lines)
+            lines, y = [], PAGE_HEIGHT - MARGIN
+        for line in wrapped:
+            if y - size * LEADING < MARGIN:
+                pages.append(lines)
+                lines, y = [], PAGE_HEIGHT - MARGIN
+            y -= size * LEADING
+            x = MARGIN
+            if style == 'title':
+                x = (PAGE_WIDTH - len(line) * size * CHAR_WIDTH) / 2
+            lines.append((font, size, x, y, line))
+        y -= space_after
+    pages.append(lines)
+    return pages
+
+
+def _content_stream(lines, footer):
+    ops = []
+    for font, size, x, y, text in lines + [footer]:
+        ops.append(b'BT /%s %d Tf %.2f %.2f Td (%s) Tj ET' % (font.encode(), size, x, y, _escape(text)))
+    return b'\n'.join(ops)
+
+
+def render_pdf(blocks, title=''):
+    """Render (style, text) ``blocks`` to PDF bytes; styles are the keys of STYLES"""
+    pages = _layout(blocks)
+    fonts = {font: base for font, base, _, _ in STYLES.values()}
+    # Fixed object numbers: 1 catalog, 2 page tree, 3 info, then fonts, then a
+    # (page, contents) pair per page.
+    font_ids = {font: 4 + i for i, font in enumerate(sorted(fonts))}
+    first_page_id = 4 + len(fonts)
+    page_ids = [first_page_id + 2 * i for i in range(len(pages))]
+
+    objects = {
+        1: b'<< /Type /Catalog /Pages 2 0 R >>',
+        2: b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            b' '.join(b'%d 0 R' % pid for pid in page_ids), len(pages),
+        ),
+        3: b'<< /Title (%s) /Producer (TenantScreening) >>' % _escape(title),
+    }
+    for font, object_id in font_ids.items():
+        objects[object_id] = (
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % fonts[font].encode()
+        )
+    resources = b'<< /Font << %s >> >>' % b' '.join(
+        b'/%s %d 0 R' % (font.encode(), object_id) for font, object_id in font_ids.items()
+    )
+    for number, (page_id, lines) in enumerate(zip(page_ids, pages), start=1):
+        footer_text = f'Page {number} of {len(pages)}'
+        footer = (
+            'F1', FOOTER_SIZE, (PAGE_WIDTH - len(footer_text) * FOOTER_SIZE * CHAR_WIDTH) / 2, MARGIN / 2,
+            footer_text,
+        )
+        stream = _content_stream(lines, footer)
+        objects[page_id] = (
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources %s /Contents %d 0 R >>'
+            % (PAGE_WIDTH, PAGE_HEIGHT, resources, page_id + 1)
+        )
+        objects[page_id + 1] = b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream)
+
+    out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(out)
+        out += b'%d 0 obj\n%s\nendobj\n' % (object_id, objects[object_id])
+    xref_offset = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for object_id in sorted(objects):
+        out += b'%010d 00000 n \n' % offsets[object_id]
+    out += b'trailer\n<< /Size %d /Root 1 0 R /Info 3 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+        len(objects) + 1, xref_offset,
+    )
+    return bytes(out)
@@ -0,0 +1,353 @@
+"""Bulk listing import for landlords with whole portfolios.
+
+``import_properties()`` reads CSV or JSON Lines records with the
+PropertyForm fields (plus an optional ``image_url``) and creates a
+listing per valid record. Records are read, validated and inserted a
+batch at a time, so memory use doesn't grow with the file.
+
+Each record is checked with PropertyForm's own field objects and the
+model fields' validators, the same rules a form submission goes through,
+without building a form per row. Images are downloaded concurrently for
+each batch and checked with the form's ImageField. Since any landlord can
+submit URLs, the fetcher only connects to public addresses: every host,
+including each redirect hop, is resolved first and refused if it is
+loopback, private, link-local or otherwise not globally routable, and
+download failures are reported without detail. The connection then goes
+to the address that was checked rather than resolving the host again, so
+a host whose DNS answer changes in between (DNS rebinding) can't steer
+the download inward. A record that fails
+either check is reported with its line number and skipped; the rest of
+its batch is still imported.
+
+Every batch is inserted with ``bulk_create`` in one transaction. That skips
+save() and the Property signals, so each batch fills in coordinates itself
+and updates the search index, rent statistics, geo index and listing
+cache and queues thumbnail renders the way those signals would have.
+"""
+import csv
+import io
+import ipaddress
+import json
+import logging
+import posixpath
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import NamedTuple
+from urllib.parse import urljoin, urlparse
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, transaction
+from requests.adapters import HTTPAdapter
+
+from . import geo, listing_cache, rent_estimator, search, thumbnails
+from .forms import PropertyForm
+from .models import Property
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+MAX_REDIRECTS = 3
+DOWNLOAD_ERROR = 'Could not download image'
+FORMATS = ('csv', 'jsonl')
+FIELDS = [name for name in PropertyForm._meta.fields if name != 'image']
+REPORT_COLUMNS = ['line', 'id', 'error']
+
+# Validation is stateless, so one set of form fields serves every row
+_form_fields = PropertyForm.base_fields
+_image_field = Property._meta.get_field('image')
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Result(NamedTuple):
+    """Outcome of one input record: the new listing's id, or why it was skipped"""
+    line: int
+    id: int = None
+    error: str = ''
+
+
+def read_records(fp, format='csv'):
+    """Yield (line number, record dict or error message) from a text stream.
+
+    A file that isn't UTF-8 or isn't parseable CSV ends with one error for
+    the line where reading stopped, since nothing after it can be trusted.
+    """
+    if format not in FORMATS:
+        raise ValueError(f'Unknown format {format!r}; expected one of {", ".join(FORMATS)}')
+    line_number = 0
+    try:
+        if format == 'csv':
+            reader = csv.DictReader(fp)
+            for row in reader:
+                line_number = reader.line_num
+                yield line_number, row
+        else:
+            for line_number, line in enumerate(fp, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_number, f'Invalid JSON: {e}'
+                    continue
+                yield line_number, record if isinstance(record, dict) else 'Each line must be a JSON object'
+    except UnicodeDecodeError:
+        yield line_number + 1, 'File is not UTF-8 text; stopped reading here'
+    except csv.Error as e:
+        yield line_number + 1, f'Invalid CSV ({e}); stopped reading here'
+
+
+def _format_errors(error):
+    if hasattr(error, 'error_dict'):
+        return '; '.join(f'{field}: {" ".join(messages)}' for field, messages in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+def clean_record(record):
+    """Validated field values for one record; raises ValidationError"""
+    values, errors = {}, {}
+    for name in FIELDS:
+        raw = record.get(name)
+        if isinstance(raw, str):
+            raw = raw.strip()
+        model_field = Property._meta.get_field(name)
+        if raw in (None, '') and model_field.has_default():
+            # Columns like status may be left out and take the model default
+            values[name] = model_field.get_default()
+            continue
+        try:
+            value = _form_fields[name].clean(raw)
+            model_field.run_validators(value)
+        except ValidationError as e:
+            errors[name] = e.messages
+        else:
+            values[name] = value
+    if errors:
+        raise ValidationError(errors)
+    return values
+
+
+class PinnedAddressAdapter(HTTPAdapter):
+    """Connects to an address vetted beforehand instead of resolving the URL's host again.
+
+    The pin is per thread, set with ``pinned()``. The Host header, TLS SNI
+    and certificate check still use the URL's hostname.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._local = threading.local()
+
+    @contextmanager
+    def pinned(self, hostname, address):
+        self._local.pin = (hostname, address) if address else None
+        try:
+            yield
+        finally:
+            self._local.pin = None
+
+    def _pin_for(self, hostname):
+        pin = getattr(self._local, 'pin', None)
+        if pin is None:
+            return None
+        if pin[0] != hostname:
+            # Never fall back to resolving a host nobody checked
+            raise requests.ConnectionError(f'{hostname} was not checked before connecting')
+        return pin[1]
+
+    def send(self, request, *args, **kwargs):
+        parsed = urlparse(request.url)
+        if self._pin_for(parsed.hostname):
+            request.headers['Host'] = parsed.netloc.rpartition('@')[2]
+        return super().send(request, *args, **kwargs)
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        host_params, pool_kwargs = self.build_connection_pool_key_attributes(request, verify, cert)
+        address = self._pin_for(host_params['host'])
+        if address is None:
+            return super().get_connection_with_tls_context(request, verify, proxies=proxies, cert=cert)
+        if host_params['scheme'] == 'https':
+            pool_kwargs = {**pool_kwargs, 'server_hostname': host_params['host'], 'assert_hostname': host_params['host']}
+        return self.poolmanager.connection_from_host(**{**host_params, 'host': address}, pool_kwargs=pool_kwargs)
+
+
+class ImageFetcher:
+    """Downloads listing photos on a thread pool and stores the valid ones"""
+
+    def __init__(self, workers=None, timeout=None, max_bytes=None):
+        self.workers = workers or settings.PROPERTY_IMPORT_IMAGE_WORKERS
+        self.timeout = timeout or settings.PROPERTY_IMPORT_IMAGE_TIMEOUT
+        self.max_bytes = max_bytes or settings.PROPERTY_IMPORT_IMAGE_MAX_BYTES
+        self.session = requests.Session()
+        # A proxy from the environment would resolve hosts itself, unchecked
+        self.session.trust_env = False
+        self.adapter = PinnedAddressAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='property-import')
+
+    def close(self):
+        self._executor.shutdown()
+        self.session.close()
+
+    def check_url(self, url):
+        """The address to connect to for ``url``, or None to resolve normally when private hosts are allowed.
+
+        Raises ValidationError unless ``url`` is http(s) on a host that
+        resolves only to public addresses.
+        """
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+            raise ValidationError('image_url must be an http(s) URL')
+        if settings.PROPERTY_IMPORT_IMAGE_ALLOW_PRIVATE:
+            return None
+        try:
+            port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+            addresses = [info[4][0] for info in socket.getaddrinfo(parsed.hostname, port, type=socket.SOCK_STREAM)]
+        except (OSError, ValueError, UnicodeError):
+            raise ValidationError(DOWNLOAD_ERROR)
+        if not addresses:
+            raise ValidationError(DOWNLOAD_ERROR)
+        for address in addresses:
+            # Drop any IPv6 zone ("fe80::1%eth0") before parsing
+            if not ipaddress.ip_address(address.split('%')[0]).is_global:
+                logger.warning('Refused image_url %s: %s resolves to %s', url, parsed.hostname, address)
+                raise ValidationError(DOWNLOAD_ERROR)
+        return addresses[0]
+
+    def download(self, url):
+        """(final URL, body) for ``url``, following up to MAX_REDIRECTS redirects and checking every hop"""
+        for _ in range(MAX_REDIRECTS + 1):
+            address = self.check_url(url)
+            with self.adapter.pinned(urlparse(url).hostname, address), \
+                    self.session.get(url, timeout=self.timeout, stream=True, allow_redirects=False) as response:
+                if response.is_redirect:
+                    url = urljoin(url, response.headers['Location'])
+                    continue
+                response.raise_for_status()
+                content = bytearray()
+                for chunk in response.iter_content(64 * 1024):
+                    content += chunk
+                    if len(content) > self.max_bytes:
+                        raise ValidationError(f'Image is larger than {self.max_bytes} bytes')
+                return url, bytes(content)
+        raise ValidationError(DOWNLOAD_ERROR)
+
+    def fetch(self, url):
+        """Download and store one image; returns its storage name, raises ValidationError"""
+        try:
+            url, content = self.download(url)
+        except requests.RequestException as e:
+            # The details could describe hosts the importer shouldn't learn about
+            logger.info('Could not download image_url %s: %s', url, e)
+            raise ValidationError(DOWNLOAD_ERROR)
+        name = posixpath.basename(urlparse(url).path) or 'image'
+        # Runs the form's Pillow check, so a broken download is rejected like a bad upload
+        _form_fields['image'].clean(SimpleUploadedFile(name, content))
+        return _image_field.storage.save(_image_field.generate_filename(None, name), ContentFile(content))
+
+    def fetch_many(self, urls):
+        """[(storage name, None) or (None, error message)] for ``urls``, fetched concurrently"""
+        def attempt(url):
+            try:
+                return self.fetch(url), None
+            except ValidationError as e:
+                return None, f'image_url: {" ".join(e.messages)}'
+        return list(self._executor.map(attempt, urls))
+
+
+@contextmanager
+def _image_fetcher(enabled):
+    fetcher = ImageFetcher() if enabled else None
+    try:
+        yield fetcher
+    finally:
+        if fetcher is not None:
+            fetcher.close()
+
+
+def _import_batch(batch, landlord, fetcher):
+    results, pending = [], []
+    for line, record in batch:
+        if isinstance(record, str):
+            results.append(Result(line, error=record))
+            continue
+        try:
+            values = clean_record(record)
+        except ValidationError as e:
+            results.append(Result(line, error=_format_errors(e)))
+            continue
+        image_url = str(record.get('image_url') or '').strip()
+        listing = Property(landlord=landlord, **values)
+        listing.latitude, listing.longitude = geo.zip_centroid(listing.zip_code) or (None, None)
+        pending.append((line, listing, image_url))
+
+    if fetcher is not None:
+        wanted = [(listing, url) for _, listing, url in pending if url]
+        images = fetcher.fetch_many([url for _, url in wanted])
+        failed = {}
+        for (listing, _), (name, error) in zip(wanted, images):
+            if error:
+                failed[id(listing)] = error
+            else:
+                listing.image = name
+        results += [Result(line, error=failed[id(listing)]) for line, listing, _ in pending if id(listing) in failed]
+        pending = [item for item in pending if id(item[1]) not in failed]
+
+    listings = [listing for _, listing, _ in pending]
+    if not listings:
+        return sorted(results)
+    try:
+        with transaction.atomic():
+            Property.objects.bulk_create(listings)
+            # What the post_save signals would have done
+            search.index_properties(listings)
+            rent_estimator.add_statistics(listing.rent_sample() for listing in listings)
+            thumbnails.enqueue_many('property', [listing.pk for listing in listings if listing.image])
+    except DatabaseError as e:
+        for listing in listings:
+            if listing.image:
+                listing.image.delete(save=False)
+        results += [Result(line, error=f'Batch failed: {e}') for line, _, _ in pending]
+    else:
+        for listing in listings:
+            geo.index_property(listing)
+        listing_cache.invalidate()
+        results += [Result(line, id=listing.pk) for line, listing, _ in pending]
+    return sorted(results)
+
+
+def import_properties(records, landlord, batch_size=BATCH_SIZE, fetch_images=True):
+    """Create ``landlord``'s listings from (line, record) pairs, yielding a Result per record in order"""
+    with _image_fetcher(fetch_images) as fetcher:
+        for batch in _chunks(records, batch_size):
+            yield from _import_batch(batch, landlord, fetcher)
+
+
+def report_csv(results):
+    """The Results as CSV text, a block at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writerow(REPORT_COLUMNS)
+    yield flush()
+    for chunk in _chunks(results, BATCH_SIZE):
+        writer.writerows((result.line, result.id or '', result.error) for result in chunk)
+        yield flush()
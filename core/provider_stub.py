@@ -0,0 +1,73 @@
+"""Local stand-in for a screening bureau API, for development and load tests.
+
+Serves ``POST /v1/screenings`` over HTTP/1.1 keep-alive with a configurable
+latency distribution and injected failures, so HTTPProvider's pooling,
+timeouts and circuit breaker can be exercised without a real bureau.
+"""
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubConfig:
+    def __init__(self, latency_ms=200, jitter_ms=50, error_rate=0.0, hang_rate=0.0, hang_ms=30000, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_ms = hang_ms
+        self.random = random.Random(seed)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        config = self.server.config
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+
+        roll = config.random.random()
+        if roll < config.hang_rate:
+            time.sleep(config.hang_ms / 1000)
+        else:
+            delay = config.latency_ms + config.random.uniform(-config.jitter_ms, config.jitter_ms)
+            time.sleep(max(delay, 0) / 1000)
+
+        if self.path != '/v1/screenings':
+            return self._send(404, {'error': 'not found'})
+        if config.random.random() < config.error_rate:
+            return self._send(503, {'error': 'injected failure'})
+        return self._send(200, {
+            'application_id': payload.get('application_id'),
+            'credit_score': config.random.randint(580, 820),
+            'criminal_record_clear': config.random.random() > 0.05,
+            'eviction_history_clear': config.random.random() > 0.05,
+            'employment_verified': True,
+            'income_verified': True,
+        })
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (e.g. its read timeout fired while we slept).
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(host='127.0.0.1', port=8099, config=None, verbose=False):
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.config = config or StubConfig()
+    server.verbose = verbose
+    return server
@@ -0,0 +1,156 @@
+"""Screening provider clients.
+
+Every screening goes through ``get_provider().screen(application)``. The
+backend is chosen by ``settings.SCREENING_PROVIDER``:
+
+* ``simulated`` - the random in-process result the app has always used;
+* ``http`` - a JSON API (a real bureau, or the bundled stub started with
+  ``manage.py run_screening_stub``) called over a pooled keep-alive
+  session with per-call timeouts behind a circuit breaker.
+
+The provider is built once per process so its connection pool is shared by
+every request and worker thread.
+"""
+import random
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+class ProviderError(Exception):
+    """The provider call failed; the screening job may retry it"""
+
+
+class CircuitOpenError(ProviderError):
+    """Calls are being short-circuited after repeated provider failures"""
+
+
+@dataclass
+class ScreeningResult:
+    credit_score: int
+    criminal_record_clear: bool = True
+    eviction_history_clear: bool = True
+    employment_verified: bool = False
+    income_verified: bool = False
+
+
+class CircuitBreaker:
+    """Fails fast once ``failure_threshold`` consecutive calls have failed.
+
+    After ``reset_timeout`` seconds one trial call is let through
+    (half-open); success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def call(self, func, *args, **kwargs):
+        with self._lock:
+            state = self._state()
+            if state == 'open' or (state == 'half_open' and self._trial_in_flight):
+                raise CircuitOpenError('Screening provider circuit is open')
+            self._trial_in_flight = state == 'half_open'
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._trial_in_flight = False
+                self._failures += 1
+                if state == 'half_open' or self._failures >= self.failure_threshold:
+                    self._opened_at = self._clock()
+            raise
+        with self._lock:
+            self._trial_in_flight = False
+            self._failures = 0
+            self._opened_at = None
+        return result
+
+
+class SimulatedProvider:
+    def screen(self, application):
+        return ScreeningResult(
+            credit_score=random.randint(700, 820),
+            employment_verified=True,
+            income_verified=True,
+        )
+
+
+class HTTPProvider:
+    def __init__(self, url, timeout=(2.0, 10.0), pool_size=10, breaker=None):
+        self.url = url
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        # Retries are the job queue's business; the adapter only pools.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def screen(self, application):
+        return self.breaker.call(self._request, application)
+
+    def _request(self, application):
+        payload = {
+            'application_id': application.pk,
+            'tenant_id': application.tenant_id,
+            'annual_income': str(application.annual_income),
+            'employer_name': application.employer_name,
+        }
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as exc:
+            raise ProviderError(f'Screening provider request failed: {exc}') from exc
+        return ScreeningResult(
+            credit_score=int(data['credit_score']),
+            criminal_record_clear=bool(data.get('criminal_record_clear', True)),
+            eviction_history_clear=bool(data.get('eviction_history_clear', True)),
+            employment_verified=bool(data.get('employment_verified', False)),
+            income_verified=bool(data.get('income_verified', False)),
+        )
+
+
+def build_provider(config):
+    backend = config.get('BACKEND', 'simulated')
+    if backend == 'simulated':
+        return SimulatedProvider()
+    if backend == 'http':
+        return HTTPProvider(
+            url=config['URL'],
+            timeout=(config.get('CONNECT_TIMEOUT', 2.0), config.get('READ_TIMEOUT', 10.0)),
+            pool_size=config.get('POOL_SIZE', 10),
+            breaker=CircuitBreaker(
+                failure_threshold=config.get('CIRCUIT_FAILURE_THRESHOLD', 5),
+                reset_timeout=config.get('CIRCUIT_RESET_TIMEOUT', 30.0),
+            ),
+        )
+    raise ValueError(f'Unknown screening provider backend: {backend!r}')
+
+
+@lru_cache(maxsize=None)
+def get_provider():
+    return build_provider(settings.SCREENING_PROVIDER)
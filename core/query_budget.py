@@ -0,0 +1,134 @@
+"""Per-request database query accounting.
+
+``QueryRecorder`` hooks every database connection with an execute wrapper
+and records each statement's SQL and duration. Three numbers come out of
+it: how many queries ran, how many of them repeated a statement already
+seen (same SQL with any parameters, the signature of an N+1 loop), and the
+total time spent in the database.
+
+``QueryBudgetMiddleware`` records every request while
+settings.QUERY_BUDGET_ENABLED is on (it follows DEBUG by default). It
+reports the numbers in ``Server-Timing`` and ``X-DB-*`` response headers
+and logs a warning for requests over QUERY_BUDGET_WARN_QUERIES or with
+repeated statements. ``assert_query_budget()`` checks the same numbers in
+tests.
+
+Streaming responses (CSV exports and reports) run most of their queries
+after the headers have gone out. For those the headers only count the
+view itself; the middleware keeps recording while the body is iterated
+and applies the warning to the full total once the stream ends. Async
+streams (the ASGI notification stream) are not recorded past the view.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """Context manager recording (sql, seconds) for every query run inside it on this thread"""
+
+    def __init__(self, using=None):
+        self.using = [using] if using else list(connections)
+        self.queries = []
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in self.using:
+            self._stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def seconds(self):
+        return sum(seconds for _, seconds in self.queries)
+
+    def repeated(self):
+        """{sql: times run} for statements that ran more than once"""
+        counts = Counter(sql for sql, _ in self.queries)
+        return {sql: n for sql, n in counts.items() if n > 1}
+
+    @property
+    def duplicates(self):
+        """Queries that repeated an earlier statement"""
+        return sum(n - 1 for n in self.repeated().values())
+
+    def summary(self):
+        return {'queries': self.count, 'duplicates': self.duplicates, 'db_ms': round(self.seconds * 1000, 2)}
+
+    def report(self, limit=5):
+        """Human-readable summary with the most repeated statements"""
+        lines = ['{queries} queries, {duplicates} repeated, {db_ms}ms in the database'.format(**self.summary())]
+        repeated = sorted(self.repeated().items(), key=lambda item: -item[1])
+        for sql, n in repeated[:limit]:
+            lines.append(f'  {n}x {sql[:300]}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def assert_query_budget(max_queries, max_duplicates=0, using=None):
+    """Fail if the block runs more than ``max_queries`` queries or repeats more than ``max_duplicates``"""
+    with QueryRecorder(using) as recorder:
+        yield recorder
+    if recorder.count > max_queries or recorder.duplicates > max_duplicates:
+        raise AssertionError(
+            f'Query budget exceeded (max {max_queries} queries, {max_duplicates} repeated): {recorder.report()}'
+        )
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with recorder:
+            response = self.get_response(request)
+        stats = recorder.summary()
+        response['X-DB-Queries'] = stats['queries']
+        response['X-DB-Duplicates'] = stats['duplicates']
+        response['Server-Timing'] = f'db;dur={stats["db_ms"]};desc="{stats["queries"]} queries"'
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.record_stream(request, recorder, response.streaming_content)
+        else:
+            self.check(request, recorder)
+        return response
+
+    def record_stream(self, request, recorder, content):
+        iterator = iter(content)
+        try:
+            while True:
+                # Re-entered per chunk: a server may iterate the body on another thread
+                with recorder:
+                    try:
+                        chunk = next(iterator)
+                    except StopIteration:
+                        break
+                yield chunk
+        finally:
+            self.check(request, recorder)
+
+    def check(self, request, recorder):
+        if recorder.count > settings.QUERY_BUDGET_WARN_QUERIES or recorder.duplicates:
+            logger.warning('%s %s: %s', request.method, request.path, recorder.report())
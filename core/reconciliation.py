@@ -0,0 +1,166 @@
+"""Reconcile Transaction rows against a payment processor export.
+
+The export is streamed row by row and handled in fixed-size chunks: each
+chunk's sessions are fetched with one ``in_bulk`` query and any status
+changes are written with one ``UPDATE`` per new status. Memory use
+therefore depends on the chunk size, not on the size of the file.
+
+Only transactions still ``pending`` are changed. That is checked again when
+writing, with the rows locked, so a webhook that completes a transaction
+after the chunk was read wins, and the purchase is fulfilled only once. Anything else that
+disagrees with the export (unknown sessions, amount differences, a
+completed payment the processor reports as failed) goes to the mismatch
+report for a human to look at.
+"""
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Transaction
+from .stripe_events import fulfil_transaction
+
+# Processor statuses mapped onto Transaction.status
+STATUS_MAP = {
+    'complete': 'completed',
+    'completed': 'completed',
+    'paid': 'completed',
+    'succeeded': 'completed',
+    'failed': 'failed',
+    'canceled': 'failed',
+    'cancelled': 'failed',
+    'expired': 'failed',
+    'open': 'pending',
+    'pending': 'pending',
+    'unpaid': 'pending',
+}
+
+ID_FIELDS = ('checkout_session_id', 'session_id', 'stripe_session_id', 'id')
+
+REPORT_COLUMNS = [
+    'session_id', 'issue', 'export_status', 'transaction_status', 'export_amount', 'transaction_amount',
+]
+
+
+def iter_rows(fp, fmt):
+    """Yield export rows as dicts from an open text file"""
+    if fmt == 'csv':
+        yield from csv.DictReader(fp)
+    elif fmt == 'jsonl':
+        for line in fp:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    else:
+        raise ValueError(f'Unsupported export format: {fmt!r}')
+
+
+def _session_id(row, id_field):
+    if id_field:
+        return row.get(id_field)
+    for field in ID_FIELDS:
+        if row.get(field):
+            return row[field]
+    return None
+
+
+def _amount(row, amount_in_cents):
+    raw = row.get('amount')
+    if raw in (None, ''):
+        return None
+    try:
+        amount = Decimal(str(raw))
+    except InvalidOperation:
+        return None
+    return amount / 100 if amount_in_cents else amount
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _apply(changed):
+    """Write the new statuses of ``changed`` to rows still pending and fulfil completions; returns those applied"""
+    with transaction.atomic():
+        still_pending = set(
+            Transaction.objects.select_for_update()
+            .filter(pk__in=[txn.pk for txn in changed], status='pending')
+            .values_list('pk', flat=True)
+        )
+        applied = [txn for txn in changed if txn.pk in still_pending]
+        now = timezone.now()
+        for status in {txn.status for txn in applied}:
+            Transaction.objects.filter(
+                pk__in=[txn.pk for txn in applied if txn.status == status], status='pending',
+            ).update(status=status, updated_at=now)
+        for txn in applied:
+            txn.updated_at = now
+            if txn.status == 'completed':
+                fulfil_transaction(txn)
+    return applied
+
+
+def reconcile(rows, report_writer=None, batch_size=1000, id_field=None, amount_in_cents=False, dry_run=False):
+    """Apply an export to pending transactions; returns a dict of counters"""
+    summary = {'rows': 0, 'matched': 0, 'updated': 0, 'mismatches': 0}
+
+    def report(session_id, issue, export_status='', txn=None, export_amount=None):
+        summary['mismatches'] += 1
+        if report_writer is not None:
+            report_writer.writerow({
+                'session_id': session_id,
+                'issue': issue,
+                'export_status': export_status,
+                'transaction_status': txn.status if txn else '',
+                'export_amount': '' if export_amount is None else export_amount,
+                'transaction_amount': txn.amount if txn else '',
+            })
+
+    for chunk in _chunks(rows, batch_size):
+        summary['rows'] += len(chunk)
+        keyed = [(_session_id(row, id_field), row) for row in chunk]
+        found = Transaction.objects.in_bulk(
+            {session_id for session_id, _ in keyed if session_id}, field_name='stripe_session_id'
+        )
+
+        changed = []
+        for session_id, row in keyed:
+            if not session_id:
+                report('', 'missing_session_id')
+                continue
+            txn = found.get(session_id)
+            export_status = str(row.get('status', '')).lower()
+            export_amount = _amount(row, amount_in_cents)
+            if txn is None:
+                report(session_id, 'unknown_transaction', export_status, export_amount=export_amount)
+                continue
+            summary['matched'] += 1
+
+            if export_amount is not None and export_amount != txn.amount:
+                report(session_id, 'amount_mismatch', export_status, txn, export_amount)
+
+            target = STATUS_MAP.get(export_status)
+            if target is None:
+                report(session_id, 'unknown_status', export_status, txn, export_amount)
+            elif txn.status == 'pending' and target != 'pending':
+                txn.status = target
+                changed.append(txn)
+            elif txn.status != target and target != 'pending':
+                report(session_id, 'status_conflict', export_status, txn, export_amount)
+
+        if changed and not dry_run:
+            changed = _apply(changed)
+        summary['updated'] += len(changed)
+
+    return summary
+
+
+def report_writer(fp):
+    writer = csv.DictWriter(fp, fieldnames=REPORT_COLUMNS)
+    writer.writeheader()
+    return writer
@@ -0,0 +1,387 @@
+"""Market rent estimates from comparable listings.
+
+An estimate combines two precomputed pieces:
+
+* a least-squares fit of rent on bedrooms, bathrooms and square feet over
+  every listing, done with NumPy by ``fit_model()`` (``manage.py
+  refresh_rent_model``) and stored as a RentModel row;
+* a location offset for the zip code and bedroom count, derived from the
+  running sums in RentStatistic, which signals keep current as listings
+  are created, edited and deleted.
+
+Because the fit is linear, a cell's mean residual is its mean rent minus the
+model evaluated at its mean features, so offsets track new listings between
+refits without rescanning anything. Thin cells are shrunk towards their
+zip, and thin zips towards no offset at all. Estimating is one lookup for
+the model, one for the zip's rows, and a dot product; ``estimate_csv()``
+runs the same arithmetic over whole batches of units at once.
+"""
+import csv
+import io
+import math
+import operator
+from dataclasses import dataclass
+from functools import reduce
+from itertools import islice
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Cast, Substr, Trim
+
+from .models import Property, RentModel, RentStatistic, normalize_zip
+
+# (intercept, bedrooms, bathrooms, square feet) until the first fit; the
+# same flat rates the estimator used before it had data.
+DEFAULT_COEFFICIENTS = (1000.0, 400.0, 200.0, 0.0)
+DEFAULT_SQUARE_FEET = 900.0
+# Listings don't record amenities, so these stay flat premiums
+AMENITY_PREMIUMS = {'has_parking': 150, 'has_pool': 100, 'has_gym': 100}
+# A cell with this many listings gets half its own offset and half its parent's
+SHRINKAGE_LISTINGS = 5
+# Half-width of the range, as a share of the estimate, before there is a fit
+DEFAULT_SPREAD = 0.1
+FIT_CHUNK_SIZE = 50000
+# Rows per batch in estimate_csv(), and zips per RentStatistic query
+BATCH_SIZE = 5000
+ZIP_QUERY_SIZE = 500
+
+
+@dataclass
+class RentEstimate:
+    rent: int
+    low: int
+    high: int
+    comparables: int
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def current_model():
+    try:
+        return RentModel.objects.latest()
+    except RentModel.DoesNotExist:
+        return None
+
+
+def model_parameters(model):
+    """Return (coefficients, mean square feet, residual std or None) for ``model``"""
+    if model is None:
+        return np.array(DEFAULT_COEFFICIENTS), DEFAULT_SQUARE_FEET, None
+    coefficients = np.array([
+        model.intercept, model.bedrooms_coef, model.bathrooms_coef, model.square_feet_coef,
+    ])
+    return coefficients, model.mean_square_feet, model.residual_std
+
+
+def _shrink(listings):
+    return listings / (listings + SHRINKAGE_LISTINGS)
+
+
+def _mean_residual(coefficients, listings, rent_sum, bedrooms_sum, bathrooms_sum, square_feet_sum):
+    means = np.array([listings, bedrooms_sum, bathrooms_sum, square_feet_sum]) / listings
+    return rent_sum / listings - coefficients @ means
+
+
+def zip_cells(coefficients, rows):
+    """Summarise one zip's RentStatistic ``rows`` for estimating.
+
+    Returns ``({bedrooms: (offset, mean square feet, listings)}, zip offset)``
+    where each offset is a shrunken mean residual: the zip's towards zero,
+    each cell's towards the zip's.
+    """
+    if not rows:
+        return {}, 0.0
+    totals = np.array([
+        [row.listings, row.rent_sum, row.bedrooms * row.listings, row.bathrooms_sum, row.square_feet_sum]
+        for row in rows
+    ]).sum(axis=0)
+    zip_offset = _shrink(totals[0]) * _mean_residual(coefficients, *totals)
+    cells = {}
+    for row in rows:
+        weight = _shrink(row.listings)
+        residual = _mean_residual(
+            coefficients, row.listings, row.rent_sum, row.bedrooms * row.listings,
+            row.bathrooms_sum, row.square_feet_sum,
+        )
+        cells[row.bedrooms] = (
+            weight * residual + (1 - weight) * zip_offset, row.square_feet_sum / row.listings, row.listings,
+        )
+    return cells, zip_offset
+
+
+class Estimator:
+    """Vectorized estimates against one rent model.
+
+    Each zip's statistics are fetched once, the first time a batch mentions
+    it, so a long run costs one query per batch of unseen zips.
+    """
+
+    def __init__(self, model=None):
+        self.coefficients, self.mean_square_feet, self.residual_std = model_parameters(
+            model if model is not None else current_model()
+        )
+        self._zips = {}
+
+    def _load(self, zip_codes):
+        missing = [zip_code for zip_code in zip_codes if zip_code not in self._zips]
+        for chunk in _chunks(missing, ZIP_QUERY_SIZE):
+            rows = {}
+            for row in RentStatistic.objects.filter(zip_code__in=chunk, listings__gt=0):
+                rows.setdefault(row.zip_code, []).append(row)
+            for zip_code in chunk:
+                self._zips[zip_code] = zip_cells(self.coefficients, rows.get(zip_code, []))
+
+    def estimate_many(self, zip_codes, bedrooms, bathrooms, square_feet, premiums):
+        """Estimate a batch; ``square_feet`` may hold NaN for unknown sizes.
+
+        Returns arrays (rent, low, high, comparables).
+        """
+        zip_codes = [normalize_zip(zip_code) for zip_code in zip_codes]
+        self._load(set(zip_codes))
+        count = len(zip_codes)
+        offsets = np.empty(count)
+        typical_square_feet = np.empty(count)
+        comparables = np.zeros(count, dtype=int)
+        for i, (zip_code, beds) in enumerate(zip(zip_codes, bedrooms)):
+            cells, zip_offset = self._zips[zip_code]
+            cell = cells.get(beds)
+            if cell is None:
+                offsets[i], typical_square_feet[i] = zip_offset, self.mean_square_feet
+            else:
+                offsets[i], typical_square_feet[i], comparables[i] = cell
+
+        square_feet = np.asarray(square_feet, dtype=float)
+        features = np.column_stack([
+            np.ones(count),
+            np.asarray(bedrooms, dtype=float),
+            np.asarray(bathrooms, dtype=float),
+            np.where(np.isnan(square_feet), typical_square_feet, square_feet),
+        ])
+        # Absurd inputs overflow to inf; callers report those units individually
+        with np.errstate(over='ignore', invalid='ignore'):
+            rent = np.maximum(features @ self.coefficients + offsets + np.asarray(premiums, dtype=float), 0.0)
+            spread = self.residual_std if self.residual_std is not None else rent * DEFAULT_SPREAD
+            return rent.round(), np.maximum(rent - spread, 0.0).round(), (rent + spread).round(), comparables
+
+
+def estimate_rent(zip_code, bedrooms, bathrooms, square_feet=None, amenities=()):
+    """Estimate monthly rent; ``square_feet`` defaults to the typical size of comparable listings"""
+    rent, low, high, comparables = Estimator().estimate_many(
+        [zip_code], [bedrooms], [bathrooms],
+        [math.nan if square_feet is None else square_feet],
+        [sum(AMENITY_PREMIUMS[amenity] for amenity in amenities)],
+    )
+    return RentEstimate(rent=int(rent[0]), low=int(low[0]), high=int(high[0]), comparables=int(comparables[0]))
+
+
+def fit_model(chunk_size=FIT_CHUNK_SIZE):
+    """Fit rent on bedrooms, bathrooms and square feet over every listing and save it.
+
+    The normal equations are accumulated one chunk of rows at a time, so
+    memory stays flat however large the table is. Returns the new RentModel,
+    or None if there are too few listings to fit.
+    """
+    xtx = np.zeros((4, 4))
+    xty = np.zeros(4)
+    yty = 0.0
+    listings = 0
+    rows = Property.objects.order_by().values_list(
+        'bedrooms', 'bathrooms', 'square_feet', 'monthly_rent',
+    ).iterator(chunk_size=chunk_size)
+    for chunk in _chunks(rows, chunk_size):
+        data = np.array(chunk, dtype=float)
+        x = np.column_stack([np.ones(len(data)), data[:, :3]])
+        y = data[:, 3]
+        xtx += x.T @ x
+        xty += x.T @ y
+        yty += y @ y
+        listings += len(data)
+
+    if listings <= len(xty):
+        return None
+    # lstsq rather than solve: a market where every listing has the same
+    # bathroom count makes the system singular
+    coefficients = np.linalg.lstsq(xtx, xty, rcond=None)[0]
+    sse = max(yty - 2 * coefficients @ xty + coefficients @ xtx @ coefficients, 0.0)
+    return RentModel.objects.create(
+        listings=listings,
+        intercept=coefficients[0],
+        bedrooms_coef=coefficients[1],
+        bathrooms_coef=coefficients[2],
+        square_feet_coef=coefficients[3],
+        residual_std=math.sqrt(sse / (listings - len(coefficients))),
+        mean_square_feet=xtx[0, 3] / listings,
+    )
+
+
+def aggregate_statistics(properties):
+    """Group a Property queryset into the per-(zip, bedrooms) sums stored in RentStatistic"""
+    rent = Cast('monthly_rent', FloatField())
+    return properties.order_by().annotate(
+        zip5=Substr(Trim('zip_code'), 1, 5),
+    ).values('zip5', 'bedrooms').annotate(
+        listings=Count('id'),
+        rent_sum=Sum(rent),
+        rent_sq_sum=Sum(rent * rent),
+        bathrooms_sum=Sum(Cast('bathrooms', FloatField())),
+        square_feet_sum=Sum(Cast('square_feet', FloatField())),
+    )
+
+
+def rebuild_statistics():
+    """Recompute every RentStatistic row from the listings table; returns the row count"""
+    cells = [
+        RentStatistic(zip_code=row.pop('zip5'), **row)
+        for row in aggregate_statistics(Property.objects.all())
+    ]
+    with transaction.atomic():
+        RentStatistic.objects.all().delete()
+        RentStatistic.objects.bulk_create(cells, batch_size=1000)
+    return len(cells)
+
+
+STATISTIC_SUMS = (
+    ('listings', IntegerField()), ('rent_sum', FloatField()), ('rent_sq_sum', FloatField()),
+    ('bathrooms_sum', FloatField()), ('square_feet_sum', FloatField()),
+)
+# Cells per UPDATE; each costs about a dozen parameters (SQLite allows 999)
+CELLS_PER_UPDATE = 50
+
+
+def _increment(cells):
+    """Add {(zip, bedrooms): [listings, rent, rent squared, bathrooms, square feet]} to RentStatistic"""
+    with transaction.atomic():
+        RentStatistic.objects.bulk_create(
+            [RentStatistic(zip_code=zip_code, bedrooms=bedrooms) for zip_code, bedrooms in cells],
+            ignore_conflicts=True,
+        )
+        # One UPDATE for a whole chunk of cells, each field adding its cell's delta
+        for chunk in _chunks(cells.items(), CELLS_PER_UPDATE):
+            matches = [Q(zip_code=zip_code, bedrooms=bedrooms) for (zip_code, bedrooms), _ in chunk]
+            RentStatistic.objects.filter(reduce(operator.or_, matches)).update(**{
+                field: F(field) + Case(
+                    *[When(match, then=Value(deltas[i])) for match, (_, deltas) in zip(matches, chunk)],
+                    default=Value(0), output_field=output_field,
+                )
+                for i, (field, output_field) in enumerate(STATISTIC_SUMS)
+            })
+
+
+def _apply(sample, sign):
+    zip_code, bedrooms, bathrooms, square_feet, rent = sample
+    _increment({(zip_code, bedrooms): [sign, sign * rent, sign * rent * rent, sign * bathrooms, sign * square_feet]})
+
+
+def update_statistics(old, new):
+    """Move a listing's contribution from sample ``old`` to ``new`` (either may be None)"""
+    if old == new:
+        return
+    if old is not None:
+        _apply(old, -1)
+    if new is not None:
+        _apply(new, 1)
+
+
+def add_statistics(samples):
+    """Add many new listings' rent samples with one update per (zip, bedrooms) cell"""
+    cells = {}
+    for zip_code, bedrooms, bathrooms, square_feet, rent in filter(None, samples):
+        cell = cells.setdefault((zip_code, bedrooms), [0, 0.0, 0.0, 0.0, 0.0])
+        for i, value in enumerate((1, rent, rent * rent, bathrooms, square_feet)):
+            cell[i] += value
+    if cells:
+        _increment(cells)
+
+
+RESULT_COLUMNS = ['estimated_rent', 'low_range', 'high_range', 'comparables', 'error']
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+
+
+def parse_unit(row):
+    """Return (zip, bedrooms, bathrooms, square feet, premium) for a CSV row; raises ValueError"""
+    zip_code = (row.get('zip_code') or '').strip()
+    if not zip_code:
+        raise ValueError('zip_code is required')
+    values = []
+    for field, cast in [('bedrooms', int), ('bathrooms', float)]:
+        raw = (row.get(field) or '').strip()
+        try:
+            value = cast(raw)
+            # isfinite() raises OverflowError for ints too large for a float
+            finite = math.isfinite(value)
+        except (ValueError, OverflowError):
+            finite = False
+        if not finite:
+            raise ValueError(f'{field} must be a number, got {raw!r}')
+        if value < 0:
+            raise ValueError(f'{field} cannot be negative')
+        values.append(value)
+    raw = (row.get('square_feet') or '').strip()
+    # Blank means unknown (NaN), estimated from comparable listings
+    square_feet = math.nan
+    if raw:
+        try:
+            square_feet = float(raw)
+        except ValueError:
+            raise ValueError(f'square_feet must be a number, got {raw!r}')
+        if not math.isfinite(square_feet) or square_feet < 0:
+            raise ValueError('square_feet must be a positive number')
+    premium = sum(
+        amount for amenity, amount in AMENITY_PREMIUMS.items()
+        if (row.get(amenity) or '').strip().lower() in TRUE_VALUES
+    )
+    return (zip_code, *values, square_feet, premium)
+
+
+def estimate_csv(fp, batch_size=BATCH_SIZE, estimator=None):
+    """Estimate every unit in a CSV file, yielding the output CSV a batch at a time.
+
+    Input needs ``zip_code``, ``bedrooms`` and ``bathrooms`` columns;
+    ``square_feet`` and the amenity flags are optional. Every input column
+    is echoed back with RESULT_COLUMNS appended, and a row that can't be
+    parsed gets its ``error`` filled in instead of an estimate.
+    """
+    estimator = estimator or Estimator()
+    reader = csv.DictReader(fp)
+    fieldnames = list(reader.fieldnames or [])
+    fieldnames += [column for column in RESULT_COLUMNS if column not in fieldnames]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writeheader()
+    yield flush()
+    for chunk in _chunks(reader, batch_size):
+        units = []
+        for row in chunk:
+            try:
+                units.append(parse_unit(row))
+            except ValueError as e:
+                row['error'] = str(e)
+                units.append(None)
+        valid = [unit for unit in units if unit is not None]
+        if valid:
+            results = zip(*estimator.estimate_many(*zip(*valid)))
+            for row, unit in zip(chunk, units):
+                if unit is not None:
+                    rent, low, high, comparables = next(results)
+                    try:
+                        row.update(
+                            estimated_rent=int(rent), low_range=int(low), high_range=int(high),
+                            comparables=int(comparables), error='',
+                        )
+                    except (ValueError, OverflowError):
+                        # Inputs so extreme the estimate isn't a finite number
+                        row['error'] = 'Could not estimate this unit'
+        writer.writerows(chunk)
+        yield flush()
@@ -0,0 +1,174 @@
+"""Pre-aggregated property activity for dashboard charts.
+
+Views and application submissions are added to one PropertyActivityRollup
+row per property per day as they happen, so a chart reads a handful of
+small rows instead of scanning raw activity. ``compact()`` later folds old
+daily rows into weekly and then monthly buckets to keep the table small.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import PropertyActivityRollup, RentalApplication
+
+
+def _add(counts, field, period='day', period_start=None):
+    """Add ``counts`` ({property_id: n}) to ``field`` of each property's bucket.
+
+    Missing buckets are inserted first with ``ignore_conflicts`` so concurrent
+    writers never race on creation; the increments are then plain
+    ``F()`` updates, one per distinct delta.
+    """
+    if not counts:
+        return
+    period_start = period_start or timezone.localdate()
+    buckets = PropertyActivityRollup.objects.filter(period=period, period_start=period_start)
+    with transaction.atomic():
+        PropertyActivityRollup.objects.bulk_create(
+            [PropertyActivityRollup(property_id=pk, period=period, period_start=period_start)
+             for pk in counts],
+            ignore_conflicts=True,
+        )
+        by_delta = defaultdict(list)
+        for pk, delta in counts.items():
+            by_delta[delta].append(pk)
+        for delta, pks in by_delta.items():
+            buckets.filter(property_id__in=pks).update(**{field: F(field) + delta})
+
+
+def record_views(counts, day=None):
+    _add(counts, 'views', period_start=day)
+
+
+def record_application(property_id, day=None):
+    _add({property_id: 1}, 'applications', period_start=day)
+
+
+def daily_series(landlord, days=7):
+    """Return [(date, views, applications)] for the last ``days`` days, oldest first"""
+    end = timezone.localdate()
+    start = end - datetime.timedelta(days=days - 1)
+    totals = {
+        row['period_start']: (row['views'], row['applications'])
+        for row in PropertyActivityRollup.objects.filter(
+            property__landlord=landlord, period='day', period_start__gte=start,
+        ).values('period_start').annotate(views=Sum('views'), applications=Sum('applications'))
+    }
+    series = []
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        views, applications = totals.get(day, (0, 0))
+        series.append((day, views, applications))
+    return series
+
+
+def _roll_up(source_period, target_period, trunc, cutoff, batch_size):
+    """Move ``source_period`` rows older than ``cutoff`` into ``target_period`` buckets.
+
+    ``cutoff`` is aligned to a target bucket boundary by the caller, so every
+    bucket is built from complete data in one pass.
+    """
+    old = PropertyActivityRollup.objects.filter(period=source_period, period_start__lt=cutoff)
+    grouped = (
+        old.order_by()
+        .annotate(bucket=trunc('period_start'))
+        .values('property_id', 'bucket')
+        .annotate(views=Sum('views'), applications=Sum('applications'))
+        .order_by('property_id', 'bucket')
+    )
+    merged = 0
+    with transaction.atomic():
+        batch = []
+        for row in grouped.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                merged += _merge_buckets(batch, target_period)
+                batch = []
+        merged += _merge_buckets(batch, target_period)
+        deleted, _ = old.delete()
+    return merged, deleted
+
+
+def _merge_buckets(rows, period):
+    if not rows:
+        return 0
+    existing = {
+        (r.property_id, r.period_start): r
+        for r in PropertyActivityRollup.objects.filter(
+            period=period,
+            property_id__in={row['property_id'] for row in rows},
+            period_start__in={row['bucket'] for row in rows},
+        )
+    }
+    to_create, to_update = [], []
+    for row in rows:
+        current = existing.get((row['property_id'], row['bucket']))
+        if current is None:
+            to_create.append(PropertyActivityRollup(
+                property_id=row['property_id'], period=period, period_start=row['bucket'],
+                views=row['views'], applications=row['applications'],
+            ))
+        else:
+            current.views += row['views']
+            current.applications += row['applications']
+            to_update.append(current)
+    PropertyActivityRollup.objects.bulk_create(to_create)
+    PropertyActivityRollup.objects.bulk_update(to_update, ['views', 'applications'])
+    return len(rows)
+
+
+def compact(daily_retention_days=90, weekly_retention_days=365, batch_size=1000, today=None):
+    """Fold daily rows past the retention window into weeks, and old weeks into months"""
+    today = today or timezone.localdate()
+    day_cutoff = today - datetime.timedelta(days=daily_retention_days)
+    day_cutoff -= datetime.timedelta(days=day_cutoff.weekday())  # Monday
+    week_cutoff = today - datetime.timedelta(days=weekly_retention_days)
+    week_cutoff = week_cutoff.replace(day=1)
+
+    weekly = _roll_up('day', 'week', TruncWeek, day_cutoff, batch_size)
+    monthly = _roll_up('week', 'month', TruncMonth, week_cutoff, batch_size)
+    return {'weekly': weekly, 'monthly': monthly}
+
+
+def backfill_applications(since, batch_size=1000):
+    """Recompute daily application counts from RentalApplication.submitted_at.
+
+    Only days on or after ``since`` are rewritten, so buckets that have
+    already been compacted into weeks or months are never double counted.
+    """
+    grouped = (
+        RentalApplication.objects.filter(submitted_at__date__gte=since)
+        .order_by()
+        .annotate(day=TruncDate('submitted_at'))
+        .values('property_id', 'day')
+        .annotate(total=Count('id'))
+        .order_by('property_id', 'day')
+    )
+    written = 0
+    with transaction.atomic():
+        PropertyActivityRollup.objects.filter(period='day', period_start__gte=since).update(applications=0)
+        batch = []
+        for row in grouped.iterator(chunk_size=batch_size):
+            batch.append(PropertyActivityRollup(
+                property_id=row['property_id'], period='day', period_start=row['day'],
+                applications=row['total'],
+            ))
+            if len(batch) >= batch_size:
+                written += _upsert_applications(batch)
+                batch = []
+        written += _upsert_applications(batch)
+    return written
+
+
+def _upsert_applications(rollups):
+    PropertyActivityRollup.objects.bulk_create(
+        rollups,
+        update_conflicts=True,
+        unique_fields=['property', 'period', 'period_start'],
+        update_fields=['applications'],
+    )
+    return len(rollups)
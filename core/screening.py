@@ -0,0 +1,46 @@
+from . import screening_cache
+from .models import ScreeningReport
+from .providers import get_provider
+
+
+def credit_score_range(score_val):
+    if score_val >= 750: return 'excellent'
+    if score_val >= 700: return 'good'
+    if score_val >= 650: return 'fair'
+    return 'poor'
+
+
+def report_fields(result):
+    """Map a provider ScreeningResult onto ScreeningReport fields"""
+    score_val = result.credit_score
+    clear = result.criminal_record_clear and result.eviction_history_clear
+    return {
+        'credit_score_range': credit_score_range(score_val),
+        'criminal_record_clear': result.criminal_record_clear,
+        'eviction_history_clear': result.eviction_history_clear,
+        'employment_verified': result.employment_verified,
+        'income_verified': result.income_verified,
+        'recommendation': 'Accept' if score_val > 650 and clear else 'Conditional',
+        'risk_level': 'low' if score_val > 700 and clear else 'medium' if score_val > 650 else 'high',
+    }
+
+
+def generate_screening_report(application, provider=None):
+    """Screen the applicant through the configured provider and store the report.
+
+    Idempotent: an application that already has a report keeps it (and no
+    provider call is made), so a retried job never double-writes or double-bills.
+    A fresh cached result for the tenant is reused instead of calling the provider.
+    """
+    existing = ScreeningReport.objects.filter(application=application).first()
+    if existing is not None:
+        return existing
+
+    result = screening_cache.lookup([application.tenant_id]).get(application.tenant_id)
+    if result is None:
+        result = (provider or get_provider()).screen(application)
+        screening_cache.store({application.tenant_id: result})
+    report, _ = ScreeningReport.objects.get_or_create(
+        application=application, defaults=report_fields(result)
+    )
+    return report
@@ -0,0 +1,105 @@
+"""Tenant-level cache of bureau screening results.
+
+A tenant applying to several properties is screened once: while their
+TenantScreeningResult is younger than ``SCREENING_CACHE_TTL`` a new
+application reuses it instead of calling (and paying) the provider again.
+The row is dropped whenever one of the tenant's verification flags changes
+(User.save() and UserQuerySet.update() call invalidate_tenants()).
+
+Hit/miss/invalidation counters are per process; ``TenantScreeningResult.hits``
+keeps a durable per-tenant hit count.
+"""
+import datetime
+import threading
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TenantScreeningResult
+from .providers import ScreeningResult
+
+RESULT_FIELDS = (
+    'credit_score', 'criminal_record_clear', 'eviction_history_clear',
+    'employment_verified', 'income_verified',
+)
+
+
+class CacheCounters:
+    def __init__(self, names=('hits', 'misses', 'invalidations')):
+        self.names = names
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self.names, 0)
+
+    def add(self, name, n=1):
+        if n:
+            with self._lock:
+                self._counts[name] += n
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+counters = CacheCounters()
+
+
+def ttl():
+    return datetime.timedelta(seconds=settings.SCREENING_CACHE_TTL)
+
+
+def cache_stats():
+    stats = counters.snapshot()
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def lookup(tenant_ids):
+    """Return {tenant_id: ScreeningResult} for tenants with a fresh cached result"""
+    tenant_ids = set(tenant_ids)
+    if not tenant_ids or settings.SCREENING_CACHE_TTL <= 0:
+        counters.add('misses', len(tenant_ids))
+        return {}
+    fresh = TenantScreeningResult.objects.filter(
+        tenant_id__in=tenant_ids, screened_at__gte=timezone.now() - ttl()
+    )
+    found = {
+        row['tenant_id']: ScreeningResult(**{f: row[f] for f in RESULT_FIELDS})
+        for row in fresh.values('tenant_id', *RESULT_FIELDS)
+    }
+    if found:
+        TenantScreeningResult.objects.filter(tenant_id__in=found).update(hits=F('hits') + 1)
+    counters.add('hits', len(found))
+    counters.add('misses', len(tenant_ids) - len(found))
+    return found
+
+
+def store(results):
+    """Cache fresh provider results, given as {tenant_id: ScreeningResult}"""
+    if not results or settings.SCREENING_CACHE_TTL <= 0:
+        return
+    now = timezone.now()
+    TenantScreeningResult.objects.bulk_create(
+        [
+            TenantScreeningResult(
+                tenant_id=tenant_id, screened_at=now, hits=0,
+                **{f: getattr(result, f) for f in RESULT_FIELDS},
+            )
+            for tenant_id, result in results.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['tenant'],
+        update_fields=[*RESULT_FIELDS, 'screened_at', 'hits'],
+    )
+
+
+def invalidate_tenants(tenant_ids):
+    """Drop cached results for ``tenant_ids`` (an iterable or a pk queryset)"""
+    deleted, _ = TenantScreeningResult.objects.filter(tenant_id__in=tenant_ids).delete()
+    counters.add('invalidations', deleted)
+    return deleted
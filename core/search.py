@@ -0,0 +1,98 @@
+"""Full-text search over property listings.
+
+On SQLite the listing text is mirrored into an FTS5 table (created by
+migration 0006) and ranked with BM25. Other database backends fall back to
+the original ``icontains`` filters.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'core_property_fts'
+FTS_COLUMNS = ('title', 'description', 'address')
+# bm25() column weights, in FTS_COLUMNS order: title matches count the most.
+FTS_WEIGHTS = (10.0, 1.0, 5.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_enabled(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query: every word must match as a prefix"""
+    return ' '.join(f'"{token}"*' for token in _TOKEN_RE.findall(text))
+
+
+def search_properties(queryset, text):
+    """Filter ``queryset`` to listings matching ``text``, best matches first"""
+    if not fts_enabled():
+        return queryset.filter(
+            Q(title__icontains=text) |
+            Q(description__icontains=text) |
+            Q(address__icontains=text)
+        )
+
+    match = build_match_query(text)
+    if not match:
+        return queryset.none()
+
+    weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+    table = queryset.model._meta.db_table
+    # bm25() is lower-is-better. It's exposed as an annotation rather than an
+    # extra() select so callers can filter on it (keyset pagination does).
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match],
+    ).annotate(
+        search_rank=RawSQL(f'bm25({FTS_TABLE}, {weights})', [], output_field=FloatField()),
+    ).order_by('search_rank', 'id')
+
+
+def index_property(property_obj):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [property_obj.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s)',
+            [property_obj.pk] + [getattr(property_obj, column) for column in FTS_COLUMNS],
+        )
+
+
+def index_properties(properties):
+    """Index newly created properties in one statement; bulk_create() skips the post_save signal"""
+    if not fts_enabled() or not properties:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s)',
+            [[property_obj.pk] + [getattr(property_obj, column) for column in FTS_COLUMNS]
+             for property_obj in properties],
+        )
+
+
+def unindex_property(pk):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+
+def rebuild_index():
+    """Repopulate the index from core_property; returns the number of rows indexed"""
+    if not fts_enabled():
+        return 0
+    columns = ', '.join(FTS_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT id, {columns} FROM core_property'
+        )
+        indexed = cursor.rowcount
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return indexed
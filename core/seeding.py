@@ -0,0 +1,279 @@
+"""Deterministic synthetic data at scale, for performance work.
+
+``seed()`` streams users, listings, applications and inbox threads into the
+database with ``bulk_create`` in fixed-size batches, so memory stays flat
+apart from the primary keys held to wire up foreign keys. The same
+``seed`` value always produces the same rows, timestamps included.
+
+bulk_create skips save() and signals, so everything those would maintain
+is filled in directly (coordinates, trust scores, conversation and unread
+counters) or rebuilt once at the end by ``rebuild_derived()``.
+
+Seeded users are named ``<prefix>-landlord-0000001``,
+``<prefix>-tenant-0000001`` and so on, all with the password
+SEED_PASSWORD.
+"""
+import datetime
+import itertools
+import random
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from . import geo, listing_cache, rent_estimator, rollups, search
+from .models import Conversation, ConversationMember, Message, Property, RentalApplication, User
+
+SEED_PASSWORD = 'seed-password'
+BATCH_SIZE = 5000
+# Seeded activity is spread over the HISTORY_DAYS before START
+HISTORY_DAYS = 365
+START = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+FIRST_NAMES = ['Alex', 'Blair', 'Casey', 'Dana', 'Emery', 'Finley', 'Gray', 'Harper', 'Indy', 'Jordan',
+               'Kai', 'Logan', 'Morgan', 'Noel', 'Parker', 'Quinn', 'Riley', 'Sage', 'Taylor', 'Wren']
+LAST_NAMES = ['Adams', 'Brooks', 'Chen', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Hughes', 'Ito', 'Jones',
+              'Khan', 'Lopez', 'Moreau', 'Nguyen', 'Okafor', 'Patel', 'Rossi', 'Silva', 'Tanaka', 'Walsh']
+ADJECTIVES = ['Sunny', 'Quiet', 'Spacious', 'Modern', 'Charming', 'Renovated', 'Cozy', 'Bright', 'Historic']
+KINDS = ['Loft', 'Studio', 'Townhouse', 'Apartment', 'Bungalow', 'Duplex', 'Condo', 'Cottage']
+STREETS = ['Main St', 'Oak Ave', 'Maple Dr', 'Cedar Ln', 'Park Pl', 'Lake Rd', 'Hill St', 'River Way']
+FEATURES = ['hardwood floors', 'in-unit laundry', 'a private balcony', 'stainless appliances', 'a fenced yard',
+            'walk-in closets', 'central air', 'a rooftop deck', 'covered parking', 'great transit access']
+EMPLOYERS = ['Acme Corp', 'Globex', 'Initech', 'Umbrella Health', 'Stark Industries', 'City Schools']
+JOBS = ['Engineer', 'Nurse', 'Teacher', 'Analyst', 'Designer', 'Manager', 'Technician']
+APPLICATION_STATUSES = ['pending'] * 5 + ['under_review'] * 2 + ['approved', 'rejected']
+MESSAGE_LINES = ['Is this still available?', 'Are pets allowed?', 'Can I schedule a viewing?',
+                 'Yes, it is.', 'Thanks for applying!', 'What day works for you?', 'Parking is included.']
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def _timestamp(rng):
+    return START - datetime.timedelta(seconds=rng.randrange(HISTORY_DAYS * 24 * 3600))
+
+
+@contextmanager
+def _explicit_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values we generate"""
+    fields = [field for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _insert(model, objects, batch_size, saved=None, key=lambda obj: obj.pk):
+    """bulk_create ``objects`` a batch at a time, appending ``key(obj)`` of each saved one to ``saved``"""
+    count = 0
+    for batch in _batches(objects, batch_size):
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        if saved is not None:
+            saved.extend(map(key, batch))
+        count += len(batch)
+    return count
+
+
+def _users(rng, prefix, role, count, password):
+    for i in range(1, count + 1):
+        joined = _timestamp(rng)
+        yield User(
+            username=f'{prefix}-{role}-{i:07d}',
+            email=f'{prefix}-{role}-{i}@example.com',
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            password=password,
+            role=role,
+            is_identity_verified=rng.random() < 0.6,
+            has_employment_history=rng.random() < 0.7,
+            has_rental_history=rng.random() < 0.5,
+            date_joined=joined,
+            created_at=joined,
+        )
+
+
+def _properties(rng, landlord_ids, count):
+    centroids = geo.zip_centroids()
+    zip_codes = sorted(centroids)
+    for i in range(1, count + 1):
+        zip_code = rng.choice(zip_codes)
+        bedrooms = rng.choices(range(6), weights=[8, 30, 32, 18, 8, 4])[0]
+        square_feet = 400 + bedrooms * 350 + rng.randrange(300)
+        rent = Decimal(800 + bedrooms * 450 + square_feet // 3 + rng.randrange(400))
+        created = _timestamp(rng)
+        latitude, longitude = centroids[zip_code]
+        yield Property(
+            landlord_id=rng.choice(landlord_ids),
+            title=f'{rng.choice(ADJECTIVES)} {rng.choice(KINDS)} #{i}',
+            description=f'{bedrooms} bedroom home with {rng.choice(FEATURES)} and {rng.choice(FEATURES)}.',
+            address=f'{rng.randrange(1, 9999)} {rng.choice(STREETS)}',
+            city='Seedville',
+            state='CA',
+            zip_code=zip_code,
+            bedrooms=bedrooms,
+            bathrooms=Decimal(max(2, bedrooms + rng.randrange(3))) / 2,
+            square_feet=square_feet,
+            monthly_rent=rent,
+            security_deposit=rent,
+            status=rng.choices(['available', 'pending', 'rented'], weights=[80, 10, 10])[0],
+            views=rng.randrange(500),
+            latitude=latitude,
+            longitude=longitude,
+            created_at=created,
+            updated_at=created,
+        )
+
+
+def _applications(rng, property_ids, tenant_ids, count):
+    # Spread evenly with the remainder on random listings; each listing draws
+    # distinct tenants, so (property, tenant) stays unique.
+    per_property, extra = divmod(count, len(property_ids))
+    busier = set(rng.sample(range(len(property_ids)), min(extra, len(property_ids))))
+    for index, property_id in enumerate(property_ids):
+        n = min(per_property + (index in busier), len(tenant_ids))
+        for tenant_id in rng.sample(tenant_ids, n):
+            submitted = _timestamp(rng)
+            yield RentalApplication(
+                property_id=property_id,
+                tenant_id=tenant_id,
+                current_address=f'{rng.randrange(1, 9999)} {rng.choice(STREETS)}',
+                move_in_date=(submitted + datetime.timedelta(days=rng.randrange(14, 90))).date(),
+                employer_name=rng.choice(EMPLOYERS),
+                job_title=rng.choice(JOBS),
+                annual_income=Decimal(rng.randrange(30, 250) * 1000),
+                employment_duration=f'{rng.randrange(1, 15)} years',
+                number_of_occupants=rng.randrange(1, 5),
+                has_pets=rng.random() < 0.3,
+                status=rng.choice(APPLICATION_STATUSES),
+                submitted_at=submitted,
+                updated_at=submitted,
+            )
+
+
+def _inbox(rng, listings, tenant_ids, conversations, messages, batch_size):
+    """Tenant-landlord threads with the counters inbox.send_message() keeps; returns the message count"""
+    threads = []  # (property id, tenant id, landlord id, started) per conversation
+    conversation_ids = []
+
+    def generate_conversations():
+        for _ in range(conversations):
+            property_id, landlord_id = rng.choice(listings)
+            started = _timestamp(rng)
+            threads.append((property_id, rng.choice(tenant_ids), landlord_id, started))
+            yield Conversation(property_id=property_id, subject=f'Listing #{property_id}', created_at=started)
+
+    _insert(Conversation, generate_conversations(), batch_size, conversation_ids)
+
+    # Every thread gets at least one message; the rest go to random threads
+    per_thread = [1] * conversations
+    for _ in range(max(messages - conversations, 0)):
+        per_thread[rng.randrange(conversations)] += 1
+    unread = {}  # (conversation id, user id) -> count
+    last_at = {}
+
+    def generate_messages():
+        for conversation_id, (property_id, tenant_id, landlord_id, sent_at), count in zip(
+            conversation_ids, threads, per_thread,
+        ):
+            for n in range(count):
+                sender, recipient = (tenant_id, landlord_id) if n % 2 == 0 else (landlord_id, tenant_id)
+                sent_at += datetime.timedelta(minutes=rng.randrange(5, 3 * 24 * 60))
+                # Only the latest replies are likely to still be unread
+                is_read = n < count - 2 or rng.random() < 0.5
+                if not is_read:
+                    unread[conversation_id, recipient] = unread.get((conversation_id, recipient), 0) + 1
+                yield Message(
+                    conversation_id=conversation_id, sender_id=sender, recipient_id=recipient,
+                    property_id=property_id, subject=f'Listing #{property_id}', body=rng.choice(MESSAGE_LINES),
+                    is_read=is_read, created_at=sent_at,
+                )
+            last_at[conversation_id] = sent_at
+
+    message_count = _insert(Message, generate_messages(), batch_size)
+    _insert(ConversationMember, (
+        ConversationMember(
+            conversation_id=conversation_id, user_id=user_id,
+            unread_count=unread.get((conversation_id, user_id), 0), last_message_at=last_at[conversation_id],
+        )
+        for conversation_id, (_, tenant_id, landlord_id, _) in zip(conversation_ids, threads)
+        for user_id in (tenant_id, landlord_id)
+    ), batch_size)
+
+    latest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at', '-id')
+    totals = (
+        ConversationMember.objects.filter(user=OuterRef('pk')).order_by()
+        .values('user').annotate(total=Sum('unread_count')).values('total')
+    )
+    members = sorted({user_id for _, tenant_id, landlord_id, _ in threads for user_id in (tenant_id, landlord_id)})
+    with transaction.atomic():
+        for batch in _batches(conversation_ids, batch_size):
+            Conversation.objects.filter(pk__in=batch).update(
+                last_message=Subquery(latest.values('pk')[:1]),
+                last_message_at=Subquery(latest.values('created_at')[:1]),
+            )
+        for batch in _batches(members, batch_size):
+            User.objects.filter(pk__in=batch).update(unread_messages=Coalesce(Subquery(totals), 0))
+    return message_count
+
+
+def rebuild_derived():
+    """Recompute what skipped save() calls and signal handlers would have kept up to date"""
+    search.rebuild_index()
+    rent_estimator.rebuild_statistics()
+    rollups.backfill_applications((START - datetime.timedelta(days=HISTORY_DAYS)).date())
+    geo.property_index.invalidate()
+    listing_cache.invalidate()
+
+
+def seed(landlords, tenants, properties=0, applications=0, conversations=0, messages=0, seed=0,
+         prefix='seed', batch_size=BATCH_SIZE, log=None):
+    """Generate the given volumes; returns {'landlords': rows created, ...}"""
+    if not landlords or not tenants:
+        raise ValueError('Seeding needs at least one landlord and one tenant')
+    if User.objects.filter(username__startswith=f'{prefix}-').exists():
+        raise ValueError(f'Users named "{prefix}-..." already exist; pick another prefix')
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+    # Hashing is deliberately slow, so every seeded user shares one hash
+    password = make_password(SEED_PASSWORD)
+    created = dict.fromkeys(('landlords', 'tenants', 'properties', 'applications', 'conversations', 'messages'), 0)
+
+    with _explicit_timestamps(User, Property, RentalApplication, Conversation, Message):
+        landlord_ids, tenant_ids = [], []
+        created['landlords'] = _insert(
+            User, _users(rng, prefix, 'landlord', landlords, password), batch_size, landlord_ids,
+        )
+        created['tenants'] = _insert(User, _users(rng, prefix, 'tenant', tenants, password), batch_size, tenant_ids)
+        log(f'{landlords} landlords, {tenants} tenants')
+
+        listings = []  # (property id, landlord id)
+        created['properties'] = _insert(
+            Property, _properties(rng, landlord_ids, properties), batch_size, listings,
+            key=lambda listing: (listing.pk, listing.landlord_id),
+        )
+        log(f'{properties} properties')
+
+        if listings and applications:
+            created['applications'] = _insert(
+                RentalApplication, _applications(rng, [pk for pk, _ in listings], tenant_ids, applications),
+                batch_size,
+            )
+            log(f'{created["applications"]} applications')
+        if listings and conversations:
+            created['messages'] = _inbox(rng, listings, tenant_ids, conversations, messages, batch_size)
+            created['conversations'] = conversations
+            log(f'{conversations} conversations, {created["messages"]} messages')
+
+    rebuild_derived()
+    return created
@@ -0,0 +1,119 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+
+from . import geo, listing_cache, rent_estimator, rollups, search, thumbnails
+from .models import RENT_SAMPLE_FIELDS, Message, Property, RentalApplication, User
+from .notifications import publish_on_commit
+
+
+@receiver(post_save, sender=Property)
+def index_property(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(search.FTS_COLUMNS):
+        return
+    search.index_property(instance)
+
+
+@receiver(post_delete, sender=Property)
+def unindex_property(sender, instance, **kwargs):
+    search.unindex_property(instance.pk)
+
+
+@receiver(post_save, sender=Property)
+def locate_property(sender, instance, raw=False, **kwargs):
+    if not raw:
+        geo.index_property(instance)
+
+
+@receiver(post_delete, sender=Property)
+def unlocate_property(sender, instance, **kwargs):
+    geo.property_index.remove(instance.pk)
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_listings(sender, instance, **kwargs):
+    listing_cache.invalidate()
+
+
+@receiver(post_save, sender=Property)
+def track_rent_statistics(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(RENT_SAMPLE_FIELDS):
+        return
+    if created:
+        old = None
+    elif hasattr(instance, '_loaded_rent_sample'):
+        old = instance._loaded_rent_sample
+    else:
+        # Saved without being loaded first, so there is no way to tell what
+        # it used to contribute; refresh_rent_model --rebuild resyncs.
+        return
+    new = instance.rent_sample()
+    rent_estimator.update_statistics(old, new)
+    instance._loaded_rent_sample = new
+
+
+@receiver(post_delete, sender=Property)
+def untrack_rent_statistics(sender, instance, **kwargs):
+    old = getattr(instance, '_loaded_rent_sample', None) or instance.rent_sample()
+    rent_estimator.update_statistics(old, None)
+
+
+def _queue_thumbnails(kind, instance, raw, update_fields):
+    _, image_field, variants_field = thumbnails.TARGETS[kind]
+    if raw or (update_fields is not None and image_field not in update_fields):
+        return
+    name, manifest = getattr(instance, image_field).name, getattr(instance, variants_field)
+    if thumbnails.needs_render(name, manifest):
+        thumbnails.enqueue(kind, instance.pk)
+    elif not name and manifest:
+        thumbnails.clear(kind, instance.pk, manifest)
+        setattr(instance, variants_field, {})
+
+
+@receiver(post_save, sender=Property)
+def queue_property_thumbnails(sender, instance, raw=False, update_fields=None, **kwargs):
+    _queue_thumbnails('property', instance, raw, update_fields)
+
+
+@receiver(post_save, sender=User)
+def queue_profile_thumbnails(sender, instance, raw=False, update_fields=None, **kwargs):
+    _queue_thumbnails('profile', instance, raw, update_fields)
+
+
+@receiver(post_save, sender=RentalApplication)
+def count_application(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        rollups.record_application(instance.property_id)
+
+
+@receiver(post_save, sender=RentalApplication)
+def notify_application(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    property_obj, tenant = instance.property, instance.tenant
+    publish_on_commit(property_obj.landlord_id, 'application', {
+        'id': instance.pk,
+        'property': property_obj.title,
+        'applicant': tenant.get_full_name() or tenant.username,
+        'url': reverse('application_detail', args=[instance.pk]),
+    })
+
+
+@receiver(post_save, sender=Message)
+def notify_message(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    sender_user = instance.sender
+    publish_on_commit(instance.recipient_id, 'message', {
+        'id': instance.pk,
+        'conversation': instance.conversation_id,
+        'subject': instance.subject,
+        'sender': sender_user.get_full_name() or sender_user.username,
+        'preview': instance.body[:140],
+        'url': reverse('conversation_detail', args=[instance.conversation_id]) if instance.conversation_id else '',
+    })
@@ -0,0 +1,235 @@
+"""Fingerprinted, precompressed static files and the middleware that serves them.
+
+``PrecompressedManifestStaticFilesStorage`` is ManifestStaticFilesStorage
+(every collected file also gets a content-hashed copy such as
+``css/styles.3b1f8a2c4d5e.css``, and ``{% static %}`` links to it) that
+then, still inside ``collectstatic``, writes siblings next to each file:
+
+- ``.gz`` and ``.br`` for text assets (CSS, JS, SVG, ...), when they come
+  out meaningfully smaller. Brotli needs the optional ``brotli`` package.
+- ``.webp`` and ``.avif`` for PNG and JPEG images, when smaller. AVIF
+  needs a Pillow build with AVIF support (Pillow 11.2+ or the
+  ``pillow-avif-plugin`` package).
+
+``PrecompressedStaticMiddleware`` serves STATIC_ROOT when
+settings.STATIC_SERVE_COLLECTED is on (it follows ``not DEBUG`` by
+default). It picks the best sibling the client accepts (brotli over gzip,
+AVIF over WebP) and sends fingerprinted files with a year-long
+``immutable`` Cache-Control, since their names change with their content.
+Stylesheets keep referring to ``hero_bg.<hash>.png``; browsers that
+accept WebP or AVIF simply get those bytes for it.
+"""
+import gzip
+import io
+import logging
+import mimetypes
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+from PIL import Image
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    # Registers an AVIF encoder with Pillow builds that lack one
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.xml', '.html', '.ico')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+# Siblings that don't save at least this fraction of the original aren't kept
+MIN_SAVING = 0.05
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# (suffix, Content-Encoding) in order of preference
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+# (suffix, media type, Pillow format, save options) in order of preference
+IMAGE_FORMATS = (
+    ('.avif', 'image/avif', 'AVIF', {'quality': 60}),
+    ('.webp', 'image/webp', 'WEBP', {'quality': 80, 'method': 6}),
+)
+
+
+def _gzip(content):
+    # mtime=0 keeps the output identical between runs of collectstatic
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def _brotli(content):
+    return brotli.compress(content, quality=11)
+
+
+def _image_converter(image_format, options):
+    def convert(content):
+        image = Image.open(io.BytesIO(content))
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        output = io.BytesIO()
+        image.save(output, image_format, **options)
+        return output.getvalue()
+    return convert
+
+
+def sibling_encoders(name):
+    """[(suffix, function of the original bytes)] for the siblings ``name`` gets"""
+    extension = os.path.splitext(name)[1].lower()
+    if extension in COMPRESSIBLE_EXTENSIONS:
+        encoders = [('.gz', _gzip)]
+        if brotli is not None:
+            encoders.append(('.br', _brotli))
+        return encoders
+    if extension in IMAGE_EXTENSIONS:
+        Image.init()
+        return [
+            (suffix, _image_converter(image_format, options))
+            for suffix, _, image_format, options in IMAGE_FORMATS
+            if image_format in Image.SAVE
+        ]
+    return []
+
+
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        if not self.hashed_files:
+            # collectstatic hasn't run here (development, tests): link the files as they are
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        if brotli is None:
+            logger.warning('The brotli package is not installed; writing gzip siblings only')
+        for name, hashed_name in self.hashed_files.items():
+            for path in {name, hashed_name}:
+                self.write_siblings(path)
+
+    def write_siblings(self, name):
+        """Write ``name``'s precompressed and re-encoded siblings; returns the names written"""
+        encoders = sibling_encoders(name)
+        if not encoders:
+            return []
+        with self.open(name) as fp:
+            content = fp.read()
+        written = []
+        for suffix, encode in encoders:
+            try:
+                encoded = encode(content)
+            except (OSError, ValueError) as exc:
+                logger.warning('Could not write %s%s: %s', name, suffix, exc)
+                continue
+            sibling = name + suffix
+            if self.exists(sibling):
+                self.delete(sibling)
+            if len(encoded) > len(content) * (1 - MIN_SAVING):
+                continue
+            self._save(sibling, ContentFile(encoded))
+            written.append(sibling)
+        return written
+
+
+def _accepted(header):
+    """Lower-cased tokens of an Accept or Accept-Encoding header, minus those refused with q=0"""
+    tokens = set()
+    for part in header.split(','):
+        token, *params = [piece.strip() for piece in part.split(';')]
+        quality = 1.0
+        for param in params:
+            if param.replace(' ', '').startswith('q='):
+                try:
+                    quality = float(param.split('=', 1)[1])
+                except ValueError:
+                    quality = 0.0
+        if token and quality > 0:
+            tokens.add(token.lower())
+    return tokens
+
+
+@lru_cache(maxsize=4096)
+def _siblings(path):
+    """Suffixes of the siblings present next to ``path`` (collected files don't change while running)"""
+    return frozenset(
+        suffix for suffix in [suffix for suffix, _ in ENCODINGS] + [suffix for suffix, *_ in IMAGE_FORMATS]
+        if os.path.isfile(path + suffix)
+    )
+
+
+class PrecompressedStaticMiddleware:
+    def __init__(self, get_response):
+        if not settings.STATIC_SERVE_COLLECTED or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self._fingerprinted = None
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path.startswith(self.prefix):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not name or not os.path.isfile(path):
+            return None
+
+        content_type, _ = mimetypes.guess_type(name)
+        content_type = content_type or 'application/octet-stream'
+        available = _siblings(path)
+        vary, encoding, served = [], None, path
+        if any(suffix in available for suffix, *_ in IMAGE_FORMATS):
+            vary.append('Accept')
+            accepted = _accepted(request.headers.get('Accept', ''))
+            for suffix, media_type, _, _ in IMAGE_FORMATS:
+                if suffix in available and media_type in accepted:
+                    served, content_type = path + suffix, media_type
+                    break
+        elif any(suffix in available for suffix, _ in ENCODINGS):
+            vary.append('Accept-Encoding')
+            accepted = _accepted(request.headers.get('Accept-Encoding', ''))
+            for suffix, coding in ENCODINGS:
+                if suffix in available and coding in accepted:
+                    served, encoding = path + suffix, coding
+                    break
+
+        stat = os.stat(served)
+        if self.fingerprinted(name):
+            cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            cache_control = f'public, max-age={settings.STATIC_UNHASHED_MAX_AGE}'
+        if not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(served, 'rb'), content_type=content_type, filename=os.path.basename(name))
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = cache_control
+        if vary:
+            response['Vary'] = ', '.join(vary)
+        return response
+
+    def fingerprinted(self, name):
+        if self._fingerprinted is None:
+            # The manifest collectstatic wrote, loaded when the storage is first used
+            self._fingerprinted = frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        return name in self._fingerprinted
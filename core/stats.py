@@ -0,0 +1,37 @@
+from django.db.models import Count
+
+from .models import Property, RentalApplication, TRUST_BADGE_CHOICES
+
+
+def landlord_dashboard_stats(landlord):
+    """Dashboard analytics for a landlord in a fixed number of queries.
+
+    One query loads the landlord's properties with their application counts
+    annotated; one grouped query over (status, badge) yields both the status
+    breakdown and the applicant trust-badge distribution.
+    """
+    properties = list(
+        Property.objects.filter(landlord=landlord)
+        .annotate(application_count=Count('applications'))
+    )
+
+    status_counts = {key: 0 for key, _ in RentalApplication.STATUS_CHOICES}
+    badge_counts = {key: 0 for key, _ in TRUST_BADGE_CHOICES}
+    grouped = (
+        RentalApplication.objects.filter(property__landlord=landlord)
+        .order_by()
+        .values_list('status', 'tenant__trust_badge')
+        .annotate(total=Count('id'))
+    )
+    for status, badge, total in grouped:
+        status_counts[status] = status_counts.get(status, 0) + total
+        badge_counts[badge] = badge_counts.get(badge, 0) + total
+
+    return {
+        'properties': properties,
+        'total_properties': len(properties),
+        'total_views': sum(p.views for p in properties),
+        'total_applications': sum(status_counts.values()),
+        'status_counts': status_counts,
+        'badge_counts': badge_counts,
+    }
@@ -0,0 +1,102 @@
+"""Processing for the Stripe webhook inbox.
+
+``stripe_webhook`` only verifies the signature and stores the event in
+StripeEvent (deduplicated on Stripe's event ID), then acks. This module
+drains that inbox. Each event's handler runs in the same database
+transaction that flips it from ``pending`` to ``processed``: a crash or
+error rolls both back, and a second processor can never claim an event
+that has already been handled. So every event takes effect exactly once.
+An event whose handler fails is retried with the same exponential backoff
+as the job queues (``jobs.backoff_delay``), up to MAX_ATTEMPTS times.
+"""
+import datetime
+import json
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .jobs import backoff_delay, enqueue_screening
+from .models import ScreeningBatch, StripeEvent, Transaction
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+
+
+def record_event(raw_payload):
+    """Store a verified webhook body; returns False if the event was already received"""
+    event = json.loads(raw_payload)
+    try:
+        with transaction.atomic():
+            StripeEvent.objects.create(event_id=event['id'], event_type=event['type'], payload=event)
+    except IntegrityError:
+        return False
+    return True
+
+
+def handle_checkout_session_completed(event):
+    session = event['data']['object']
+    txn = Transaction.objects.select_for_update().get(stripe_session_id=session['id'])
+    if txn.status == 'completed':
+        return
+    txn.status = 'completed'
+    txn.save(update_fields=['status', 'updated_at'])
+    fulfil_transaction(txn)
+
+
+def fulfil_transaction(txn):
+    """Start whatever a completed payment paid for"""
+    # Queue the screening; nothing here waits on the provider
+    if txn.purpose == 'screening' and txn.screening_batch_id:
+        ScreeningBatch.objects.filter(
+            pk=txn.screening_batch_id, status='awaiting_payment'
+        ).update(status='queued')
+    elif txn.purpose == 'screening' and txn.application_id:
+        enqueue_screening(txn.application)
+
+
+HANDLERS = {
+    'checkout.session.completed': handle_checkout_session_completed,
+}
+
+
+def process_event(event):
+    """Handle one inbox event; returns its resulting status"""
+    try:
+        with transaction.atomic():
+            claimed = StripeEvent.objects.filter(pk=event.pk, status='pending').update(
+                status='processed', processed_at=timezone.now(), attempts=F('attempts') + 1,
+            )
+            if not claimed:
+                return None
+            handler = HANDLERS.get(event.event_type)
+            if handler is not None:
+                handler(event.payload)
+    except Exception as exc:
+        logger.exception('Stripe event %s failed', event.event_id)
+        attempts = event.attempts + 1
+        if attempts >= MAX_ATTEMPTS:
+            status, run_after = 'failed', event.run_after
+        else:
+            status = 'pending'
+            run_after = timezone.now() + datetime.timedelta(seconds=backoff_delay(attempts))
+        StripeEvent.objects.filter(pk=event.pk, status='pending').update(
+            attempts=attempts, status=status, run_after=run_after, last_error=repr(exc),
+        )
+        return status
+    return 'processed'
+
+
+def process_pending(batch_size=100):
+    """Process one batch of due pending events, oldest first; returns {status: count}"""
+    results = {}
+    events = StripeEvent.objects.filter(
+        status='pending', run_after__lte=timezone.now(),
+    ).order_by('run_after', 'id')[:batch_size]
+    for event in events:
+        status = process_event(event)
+        if status is not None:
+            results[status] = results.get(status, 0) + 1
+    return results
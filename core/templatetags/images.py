@@ -0,0 +1,40 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from core.thumbnails import FORMATS
+
+register = template.Library()
+
+
+def _srcset(storage, variants):
+    return ', '.join(f'{storage.url(variant["name"])} {variant["width"]}w' for variant in variants)
+
+
+@register.simple_tag
+def responsive_image(image, variants, variant_set, sizes, alt='', loading='lazy', **attrs):
+    """A <picture> offering ``variant_set`` of an image's thumbnails (see core/thumbnails.py) in every format.
+
+    Until the thumbnails are rendered this falls back to the original.
+    Other keyword arguments (class, style, ...) become <img> attributes.
+    """
+    extra = format_html_join('', ' {}="{}"', attrs.items())
+    available = (variants or {}).get('variants', {}).get(variant_set)
+    if not available or variants.get('source') != image.name:
+        return format_html('<img src="{}" alt="{}" loading="{}"{}>', image.url, alt, loading, extra)
+
+    by_format = {
+        extension: sorted((v for v in available if v['format'] == extension), key=lambda v: v['width'])
+        for _, extension, _, _ in FORMATS
+    }
+    fallback = by_format.pop('jpg')
+    sources = format_html_join(
+        '', '<source type="image/{}" srcset="{}" sizes="{}">',
+        ((extension, _srcset(image.storage, found), sizes) for extension, found in by_format.items() if found),
+    )
+    smallest = fallback[0]
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" loading="{}" '
+        'decoding="async"{}></picture>',
+        sources, image.storage.url(smallest['name']), _srcset(image.storage, fallback), sizes,
+        smallest['width'], smallest['height'], alt, loading, extra,
+    )
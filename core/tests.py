@@ -1,3 +1,1831 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import Sum, Value
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    User, Conversation, ConversationMember, LeaseDocument, LeaseRenderJob, Message, Property, PropertyActivityRollup, RentalApplication, RentStatistic, ScreeningBatch, ScreeningJob,
+    ScreeningReport, StripeEvent, TenantScreeningResult, ThumbnailJob, Transaction,
+)
+from . import geo, inbox, jobs, leases, listing_cache, notifications, reconciliation, rent_estimator, rollups, screening_cache, search, seeding, stripe_events, thumbnails, view_benchmark
+from .pagination import keyset_paginate
+from .property_import import ImageFetcher, import_properties, read_records
+from .provider_stub import StubConfig, make_server
+from .query_budget import QueryRecorder, assert_query_budget
+from .providers import CircuitBreaker, CircuitOpenError, HTTPProvider, ProviderError, SimulatedProvider
+from .screening import generate_screening_report
+from .search import search_properties
+from .stats import landlord_dashboard_stats
+from .view_counter import ViewCounter, view_counter
+
+
+def make_property(landlord, **kwargs):
+    defaults = {
+        'title': 'Sunny Loft',
+        'description': 'Bright loft close to transit',
+        'address': '1 Main St',
+        'city': 'Springfield',
+        'state': 'IL',
+        'zip_code': '62701',
+        'bedrooms': 2,
+        'bathrooms': Decimal('1.0'),
+        'square_feet': 900,
+        'monthly_rent': Decimal('1500.00'),
+        'security_deposit': Decimal('1500.00'),
+    }
+    defaults.update(kwargs)
+    return Property.objects.create(landlord=landlord, **defaults)
+
+
+def make_application(property_obj, tenant, **kwargs):
+    defaults = {
+        'current_address': '2 Elm St',
+        'move_in_date': datetime.date(2026, 1, 1),
+        'employer_name': 'Acme',
+        'job_title': 'Engineer',
+        'annual_income': Decimal('85000.00'),
+        'employment_duration': '3 years',
+        'number_of_occupants': 1,
+    }
+    defaults.update(kwargs)
+    return RentalApplication.objects.create(property=property_obj, tenant=tenant, **defaults)
+
+
+class TrustScoreTests(TestCase):
+    def setUp(self):
+        self.tenant = User.objects.create_user('tenant', email='', role='tenant')
+
+    def stored(self, user=None):
+        return tuple(User.objects.values_list('trust_score', 'trust_badge').get(pk=(user or self.tenant).pk))
+
+    def test_new_user_is_scored(self):
+        self.assertEqual(self.stored(), (0, 'unranked'))
+        User.objects.create_user('verified', email='v@example.com', is_identity_verified=True,
+                                 has_employment_history=True, has_rental_history=True)
+        self.assertEqual(self.stored(User.objects.get(username='verified')), (70, 'silver'))
+
+    def test_save_with_update_fields(self):
+        self.tenant.is_identity_verified = True
+        self.tenant.background_check_clear = True
+        self.tenant.email = 't@example.com'
+        self.tenant.save(update_fields=['is_identity_verified', 'background_check_clear', 'email'])
+        self.assertEqual(self.stored(), (50, 'bronze'))
+
+    def test_queryset_update(self):
+        User.objects.filter(pk=self.tenant.pk).update(
+            email='t@example.com', phone_number='555-0100', is_identity_verified=True,
+            has_employment_history=True, has_rental_history=True,
+        )
+        self.assertEqual(self.stored(), (80, 'silver'))
+        # Writing False (or an expression) is scored from the new values too
+        User.objects.filter(pk=self.tenant.pk).update(has_rental_history=False, background_check_clear=Value(True))
+        self.assertEqual(self.stored(), (80, 'silver'))
+
+    def test_bulk_update(self):
+        other = User.objects.create_user('other', email='o@example.com')
+        self.tenant.has_rental_history = True
+        other.is_identity_verified = other.has_employment_history = other.background_check_clear = True
+        User.objects.bulk_update([self.tenant, other], ['has_rental_history', 'is_identity_verified',
+                                                        'has_employment_history', 'background_check_clear'])
+        self.assertEqual(self.stored(), (20, 'unranked'))
+        self.assertEqual(self.stored(other), (70, 'silver'))
+
+    def test_bulk_create(self):
+        created = User.objects.bulk_create([
+            User(username='a', email='a@example.com', phone_number='555-0100', is_identity_verified=True,
+                 has_employment_history=True, has_rental_history=True, background_check_clear=True),
+            User(username='b', email=''),
+        ])
+        self.assertEqual([self.stored(user) for user in created], [(100, 'gold'), (0, 'unranked')])
+
+    def test_admin_change(self):
+        staff = User.objects.create_superuser('staff', 'staff@example.com', 'x')
+        self.client.force_login(staff)
+        url = reverse('admin:core_user_change', args=[self.tenant.pk])
+        data = {
+            'username': 'tenant', 'email': 't@example.com', 'role': 'tenant', 'phone_number': '',
+            'is_active': 'on', 'date_joined_0': '2026-01-01', 'date_joined_1': '00:00:00',
+            'is_identity_verified': 'on', 'has_employment_history': 'on', 'has_rental_history': 'on',
+        }
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.stored(), (70, 'silver'))
+
+    def test_backfill_command(self):
+        User.objects.filter(pk=self.tenant.pk).update(email='t@example.com', is_identity_verified=True)
+        User.objects.create_user('other', email='o@example.com', has_rental_history=True)
+        # Writing the score explicitly skips recomputation, leaving it wrong
+        User.objects.update(trust_score=0, trust_badge='unranked')
+
+        stdout = io.StringIO()
+        call_command('backfill_trust_scores', batch_size=1, stdout=stdout)
+        self.assertIn('Backfilled trust scores for 2 users', stdout.getvalue())
+        self.assertEqual(self.stored(), (30, 'unranked'))
+        self.assertEqual(self.stored(User.objects.get(username='other')), (30, 'unranked'))
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user('landlord', role='landlord')
+
+    def seed(self, n_properties, n_tenants):
+        for i in range(n_properties):
+            make_property(self.landlord, title=f'Unit {i}', views=i)
+        for i in range(n_tenants):
+            tenant = User.objects.create_user(
+                f'tenant{self.landlord.properties.count()}_{i}',
+                email='t@example.com', is_identity_verified=bool(i % 2),
+                has_rental_history=bool(i % 3), has_employment_history=True,
+            )
+            for property_obj in self.landlord.properties.all():
+                make_application(property_obj, tenant)
+
+    def test_counts(self):
+        self.seed(n_properties=3, n_tenants=4)
+        RentalApplication.objects.filter(tenant__username__endswith='_0').update(status='approved')
+
+        stats = landlord_dashboard_stats(self.landlord)
+
+        self.assertEqual(stats['total_properties'], 3)
+        self.assertEqual(stats['total_views'], 0 + 1 + 2)
+        self.assertEqual(stats['total_applications'], 12)
+        self.assertEqual(stats['status_counts']['approved'], 3)
+        self.assertEqual(stats['status_counts']['pending'], 9)
+        self.assertEqual([p.application_count for p in stats['properties']], [4, 4, 4])
+        expected_badges = {'gold': 0, 'silver': 0, 'bronze': 0, 'unranked': 0}
+        for tenant in User.objects.filter(role='tenant'):
+            expected_badges[tenant.trust_badge] += 3
+        self.assertEqual(stats['badge_counts'], expected_badges)
+
+    def test_dashboard_query_count_is_flat(self):
+        self.client.force_login(self.landlord)
+        self.seed(n_properties=1, n_tenants=1)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('dashboard'))
+
+        self.seed(n_properties=5, n_tenants=5)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(small), len(large))
+
+
+class PropertySearchTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user('landlord', role='landlord')
+
+    def search(self, text):
+        return list(search_properties(Property.objects.all(), text))
+
+    def test_prefix_match_and_title_ranks_first(self):
+        in_description = make_property(self.landlord, title='Cosy flat', description='Has a waterfront deck')
+        in_title = make_property(self.landlord, title='Waterfront condo', description='Quiet street')
+        make_property(self.landlord, title='Downtown studio', description='Near shops')
+
+        self.assertEqual(self.search('water'), [in_title, in_description])
+        self.assertEqual(self.search('waterfront condo'), [in_title])
+
+    def test_index_follows_saves_and_deletes(self):
+        property_obj = make_property(self.landlord, title='Garden cottage')
+        property_obj.title = 'Harbor cottage'
+        property_obj.save()
+        self.assertEqual(self.search('garden'), [])
+        self.assertEqual(self.search('harbor'), [property_obj])
+
+        property_obj.delete()
+        self.assertEqual(self.search('harbor'), [])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        landlord = User.objects.create_user('landlord', role='landlord')
+        # Repeated rents force the id tie-breaker to do its job.
+        for i in range(7):
+            make_property(landlord, title=f'Unit {i}', monthly_rent=Decimal(1000 + (i % 3) * 100))
+
+    def walk(self, ordering, page_size):
+        seen, cursor = [], None
+        while True:
+            page = keyset_paginate(Property.objects.all(), ordering, 'test', cursor, page_size)
+            seen.extend(page.items)
+            if not page.has_next:
+                return seen
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_row_in_order(self):
+        for ordering in [('-created_at', '-id'), ('monthly_rent', 'id'), ('-monthly_rent', '-id')]:
+            expected = list(Property.objects.order_by(*ordering))
+            self.assertEqual(self.walk(ordering, page_size=2), expected)
+
+    def test_foreign_or_tampered_cursor_restarts(self):
+        page = keyset_paginate(Property.objects.all(), ('monthly_rent', 'id'), 'price', page_size=2)
+        other = keyset_paginate(Property.objects.all(), ('-created_at', '-id'), 'newest', page.next_cursor, 2)
+        tampered = keyset_paginate(Property.objects.all(), ('monthly_rent', 'id'), 'price', page.next_cursor + 'x', 2)
+        self.assertEqual(other.items, list(Property.objects.order_by('-created_at', '-id')[:2]))
+        self.assertEqual(tampered.items, page.items)
+
+
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        landlord = User.objects.create_user('landlord', role='landlord')
+        self.hot = make_property(landlord, title='Hot')
+        self.cold = make_property(landlord, title='Cold')
+        self.lukewarm = make_property(landlord, title='Lukewarm')
+
+    def test_flush_merges_increments(self):
+        counter = ViewCounter(flush_interval=3600, max_pending=1000)
+        for _ in range(50):
+            counter.record(self.hot.pk)
+        counter.record(self.cold.pk)
+        counter.record(self.lukewarm.pk)
+        self.assertEqual(counter.pending(), 52)
+
+        updated_at = self.hot.updated_at
+        # A SELECT of the listings that still exist, one UPDATE per distinct
+        # delta (50 and 1) for the counters and again for today's rollups,
+        # one rollup INSERT, and four savepoint statements.
+        with self.assertNumQueries(10):
+            self.assertEqual(counter.flush(), 52)
+
+        self.hot.refresh_from_db()
+        self.cold.refresh_from_db()
+        self.assertEqual(self.hot.views, 50)
+        self.assertEqual(self.cold.views, 1)
+        self.assertEqual(self.hot.updated_at, updated_at)
+        self.assertEqual(counter.pending(), 0)
+        self.assertEqual(
+            PropertyActivityRollup.objects.get(property=self.hot, period='day').views, 50
+        )
+
+    def test_views_of_deleted_listing_are_dropped(self):
+        counter = ViewCounter(flush_interval=3600, max_pending=1000)
+        counter.record(self.hot.pk)
+        counter.record(self.cold.pk, count=2)
+        self.cold.delete()
+
+        self.assertEqual(counter.flush(), 1)
+        self.assertEqual(counter.pending(), 0)
+        self.hot.refresh_from_db()
+        self.assertEqual(self.hot.views, 1)
+        self.assertEqual(list(PropertyActivityRollup.objects.values_list('property_id', 'views')), [(self.hot.pk, 1)])
+
+        # Later flushes keep working
+        counter.record(self.hot.pk)
+        self.assertEqual(counter.flush(), 1)
+
+    def test_max_pending_forces_flush(self):
+        counter = ViewCounter(flush_interval=3600, max_pending=3)
+        for _ in range(3):
+            counter.record(self.hot.pk)
+        self.hot.refresh_from_db()
+        self.assertEqual(self.hot.views, 3)
+        self.assertEqual(counter.pending(), 0)
+
+
+    def test_failed_flush_does_not_reach_the_viewer(self):
+        counter = ViewCounter(flush_interval=3600, max_pending=2)
+        with mock.patch.object(rollups, 'record_views', side_effect=DatabaseError('locked')), \
+                self.assertLogs('core.view_counter', 'ERROR'):
+            counter.record(self.hot.pk)
+            counter.record(self.hot.pk)
+        self.assertEqual(counter.pending(), 2)
+        self.assertEqual(counter.flush(), 2)
+        self.hot.refresh_from_db()
+        self.assertEqual(self.hot.views, 2)
+
+class ActivityRollupTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user('landlord', role='landlord')
+        self.property = make_property(self.landlord)
+        self.today = datetime.date(2026, 6, 17)
+
+    def test_applications_and_daily_series(self):
+        tenant = User.objects.create_user('tenant')
+        make_application(self.property, tenant)
+        rollups.record_views({self.property.pk: 5})
+        rollups.record_views({self.property.pk: 2})
+
+        series = rollups.daily_series(self.landlord, days=7)
+        self.assertEqual(len(series), 7)
+        self.assertEqual(series[-1][1:], (7, 1))
+        self.assertEqual([views for _, views, _ in series[:-1]], [0] * 6)
+
+    def test_compact_rolls_days_into_weeks_and_months(self):
+        # 2026-01-05 and 2026-01-07 share a week; 2026-06-15 is inside retention.
+        for day, views in [((2026, 1, 5), 1), ((2026, 1, 7), 2), ((2026, 6, 15), 4)]:
+            rollups.record_views({self.property.pk: views}, day=datetime.date(*day))
+
+        rollups.compact(daily_retention_days=90, weekly_retention_days=365, today=self.today)
+        buckets = {
+            (r.period, r.period_start): r.views
+            for r in PropertyActivityRollup.objects.filter(property=self.property)
+        }
+        self.assertEqual(buckets, {
+            ('week', datetime.date(2026, 1, 5)): 3,
+            ('day', datetime.date(2026, 6, 15)): 4,
+        })
+
+        rollups.compact(daily_retention_days=90, weekly_retention_days=30, today=self.today)
+        self.assertEqual(
+            list(PropertyActivityRollup.objects.filter(period='month').values_list('period_start', 'views')),
+            [(datetime.date(2026, 1, 1), 3)],
+        )
+
+
+class ScreeningJobTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user('landlord', role='landlord')
+        self.application = make_application(make_property(self.landlord), User.objects.create_user('tenant'))
+
+    def test_run_screening_only_enqueues(self):
+        self.client.force_login(self.landlord)
+        url = reverse('run_screening', args=[self.application.pk])
+        self.client.post(url)
+        self.client.post(url)
+
+        job = ScreeningJob.objects.get(application=self.application)
+        self.assertEqual(job.status, 'queued')
+        self.assertFalse(ScreeningReport.objects.exists())
+        self.assertEqual(
+            self.client.get(reverse('screening_status', args=[self.application.pk])).json()['status'],
+            'queued',
+        )
+
+        [claimed] = jobs.claim_jobs(limit=10)
+        self.assertEqual(jobs.run_job(claimed), 'succeeded')
+        self.assertTrue(ScreeningReport.objects.filter(application=self.application).exists())
+
+    def test_failure_backs_off_then_gives_up(self):
+        job = jobs.enqueue_screening(self.application)
+        ScreeningJob.objects.filter(pk=job.pk).update(max_attempts=2)
+
+        with mock.patch.object(jobs, 'generate_screening_report', side_effect=RuntimeError('bureau down')):
+            [claimed] = jobs.claim_jobs(limit=1)
+            self.assertEqual(jobs.run_job(claimed), 'queued')
+            job.refresh_from_db()
+            self.assertGreater(job.run_after, timezone.now())
+            self.assertEqual(jobs.claim_jobs(limit=1), [])
+
+            ScreeningJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            [claimed] = jobs.claim_jobs(limit=1)
+            self.assertEqual(jobs.run_job(claimed), 'failed')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIn('bureau down', job.last_error)
+
+    def test_expired_claim_is_reclaimed_and_stale_worker_ignored(self):
+        jobs.enqueue_screening(self.application)
+        [stale] = jobs.claim_jobs(limit=1, visibility_timeout=0)
+        [fresh] = jobs.claim_jobs(limit=1)
+        self.assertNotEqual(stale.lock_token, fresh.lock_token)
+
+        jobs.run_job(stale)
+        self.assertEqual(ScreeningJob.objects.get().status, 'running')
+        jobs.run_job(fresh)
+        self.assertEqual(ScreeningJob.objects.get().status, 'succeeded')
+
+
+class ScreeningProviderTests(TestCase):
+    def setUp(self):
+        landlord = User.objects.create_user('landlord', role='landlord')
+        self.application = make_application(make_property(landlord), User.objects.create_user('tenant'))
+
+    def start_stub(self, **config):
+        server = make_server(port=0, config=StubConfig(seed=1, **config))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f'http://127.0.0.1:{server.server_port}/v1/screenings'
+
+    def test_http_provider_against_stub(self):
+        provider = HTTPProvider(self.start_stub(latency_ms=1, jitter_ms=0))
+        report = generate_screening_report(self.application, provider=provider)
+        self.assertTrue(report.employment_verified)
+        self.assertIn(report.credit_score_range, {'excellent', 'good', 'fair', 'poor'})
+
+    def test_timeouts_open_the_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        provider = HTTPProvider(self.start_stub(latency_ms=300, jitter_ms=0), timeout=(1.0, 0.05), breaker=breaker)
+        for _ in range(2):
+            with self.assertRaises(ProviderError):
+                provider.screen(self.application)
+        with self.assertRaises(CircuitOpenError):
+            provider.screen(self.application)
+
+    def test_half_open_trial(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+
+        def fail():
+            raise ProviderError('down')
+
+        with self.assertRaises(ProviderError):
+            breaker.call(fail)
+        self.assertEqual(breaker.state, 'open')
+        now[0] = 10
+        self.assertEqual(breaker.state, 'half_open')
+        self.assertEqual(breaker.call(lambda: 'ok'), 'ok')
+        self.assertEqual(breaker.state, 'closed')
+
+
+class ScreeningBatchTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user('landlord', role='landlord')
+        self.property = make_property(self.landlord)
+        self.applications = [
+            make_application(self.property, User.objects.create_user(f'tenant{i}')) for i in range(5)
+        ]
+
+    @mock.patch('core.views.stripe')
+    def test_one_checkout_then_webhook_queues_batch(self, stripe_mock):
+        stripe_mock.checkout.Session.create.return_value = mock.Mock(id='cs_batch', url='https://stripe.test/pay')
+        self.client.force_login(self.landlord)
+
+        response = self.client.post(reverse('create_batch_checkout_session', args=[self.property.pk]))
+        self.assertEqual(response['Location'], 'https://stripe.test/pay')
+        line_item = stripe_mock.checkout.Session.create.call_args.kwargs['line_items'][0]
+        self.assertEqual(line_item['quantity'], 5)
+
+        response = self.client.post(
+            reverse('create_batch_checkout_session', args=[self.property.pk]), {'application_ids': ['1 OR 1=1', '²']},
+        )
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+        batch = ScreeningBatch.objects.get()
+        self.assertEqual((batch.status, batch.total), ('awaiting_payment', 5))
+        self.assertEqual(batch.transactions.get().amount, Decimal('225.00'))
+
+        self.client.post(
+            reverse('stripe_webhook'), content_type='application/json',
+            data={'id': 'evt_1', 'type': 'checkout.session.completed', 'data': {'object': {'id': 'cs_batch'}}},
+        )
+        stripe_events.process_pending()
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, 'queued')
+
+    def test_run_batch_bulk_creates_reports(self):
+        generate_screening_report(self.applications[0])
+        batch = ScreeningBatch.objects.create(
+            property=self.property, requested_by=self.landlord, total=5, status='queued'
+        )
+        batch.applications.set(self.applications)
+
+        claimed = jobs.claim_batch()
+        self.assertEqual(claimed.pk, batch.pk)
+        self.assertIsNone(jobs.claim_batch())
+        self.assertEqual(jobs.run_batch(claimed, concurrency=3, flush_every=2), 4)
+
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.completed, batch.failed), ('completed', 5, 0))
+        self.assertEqual(ScreeningReport.objects.filter(application__property=self.property).count(), 5)
+
+    def make_batch(self):
+        batch = ScreeningBatch.objects.create(
+            property=self.property, requested_by=self.landlord, total=5, status='queued'
+        )
+        batch.applications.set(self.applications)
+        return batch
+
+    def test_failed_applicants_are_retried(self):
+        batch = self.make_batch()
+        provider = SimulatedProvider()
+        flaky = {self.applications[1].pk}
+
+        def screen(application):
+            if application.pk in flaky:
+                raise ProviderError('bureau timeout')
+            return provider.screen(application)
+
+        self.assertEqual(jobs.run_batch(jobs.claim_batch(), provider=mock.Mock(screen=screen)), 4)
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.completed, batch.failed), ('queued', 4, 1))
+        self.assertGreater(batch.run_after, timezone.now())
+
+        flaky.clear()
+        ScreeningBatch.objects.filter(pk=batch.pk).update(run_after=timezone.now())
+        self.assertEqual(jobs.run_batch(jobs.claim_batch(), provider=mock.Mock(screen=screen)), 1)
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.completed, batch.failed, batch.attempts), ('completed', 5, 0, 2))
+
+    def test_worker_that_lost_its_lock_stops_writing(self):
+        batch = self.make_batch()
+        stale = jobs.claim_batch(visibility_timeout=0)
+        # The lock expired, so a second worker takes the batch over
+        fresh = jobs.claim_batch()
+        self.assertNotEqual(stale.lock_token, fresh.lock_token)
+
+        self.assertEqual(jobs.run_batch(stale, flush_every=1, provider=SimulatedProvider()), 0)
+        self.assertFalse(ScreeningReport.objects.exists())
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.completed), ('running', 0))
+
+        self.assertEqual(jobs.run_batch(fresh, provider=SimulatedProvider()), 5)
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.completed), ('completed', 5))
+
+
+class ScreeningCacheTests(TestCase):
+    def setUp(self):
+        screening_cache.counters.reset()
+        landlord = User.objects.create_user('landlord', role='landlord')
+        self.tenant = User.objects.create_user('tenant')
+        self.first = make_application(make_property(landlord, title='A'), self.tenant)
+        self.second = make_application(make_property(landlord, title='B'), self.tenant)
+        self.provider = mock.Mock(wraps=SimulatedProvider())
+
+    def test_second_application_reuses_result(self):
+        generate_screening_report(self.first, provider=self.provider)
+        generate_screening_report(self.second, provider=self.provider)
+
+        self.assertEqual(self.provider.screen.call_count, 1)
+        self.assertEqual(
+            self.first.screening.credit_score_range,
+            ScreeningReport.objects.get(application=self.second).credit_score_range,
+        )
+        stats = screening_cache.cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    @override_settings(SCREENING_CACHE_TTL=60)
+    def test_stale_result_is_refetched(self):
+        generate_screening_report(self.first, provider=self.provider)
+        TenantScreeningResult.objects.update(screened_at=timezone.now() - datetime.timedelta(seconds=61))
+        generate_screening_report(self.second, provider=self.provider)
+        self.assertEqual(self.provider.screen.call_count, 2)
+
+    def test_verification_change_invalidates(self):
+        generate_screening_report(self.first, provider=self.provider)
+        tenant = User.objects.get(pk=self.tenant.pk)
+        tenant.phone_number = '555-0100'
+        tenant.save()
+        self.assertTrue(TenantScreeningResult.objects.exists())
+
+        tenant.background_check_clear = True
+        tenant.save()
+        self.assertFalse(TenantScreeningResult.objects.exists())
+
+        screening_cache.store({self.tenant.pk: SimulatedProvider().screen(self.first)})
+        User.objects.filter(pk=self.tenant.pk).update(has_rental_history=True)
+        self.assertFalse(TenantScreeningResult.objects.exists())
+        self.assertEqual(screening_cache.cache_stats()['invalidations'], 2)
+
+
+@mock.patch('core.views.stripe')
+class StripeWebhookInboxTests(TestCase):
+    def setUp(self):
+        landlord = User.objects.create_user('landlord', role='landlord')
+        self.application = make_application(make_property(landlord), User.objects.create_user('tenant'))
+        self.txn = Transaction.objects.create(
+            user=landlord, amount=Decimal('45.00'), purpose='screening',
+            stripe_session_id='cs_1', application=self.application,
+        )
+
+    def deliver(self, event_id='evt_1', session_id='cs_1'):
+        return self.client.post(
+            reverse('stripe_webhook'), content_type='application/json',
+            data={'id': event_id, 'type': 'checkout.session.completed', 'data': {'object': {'id': session_id}}},
+        )
+
+    def test_webhook_only_records(self, stripe_mock):
+        with self.assertNumQueries(3):
+            response = self.deliver()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(StripeEvent.objects.get().status, 'pending')
+        self.txn.refresh_from_db()
+        self.assertEqual(self.txn.status, 'pending')
+
+    def test_duplicate_deliveries_processed_once(self, stripe_mock):
+        self.deliver()
+        self.deliver()
+        self.assertEqual(StripeEvent.objects.count(), 1)
+
+        self.assertEqual(stripe_events.process_pending(), {'processed': 1})
+        self.assertEqual(stripe_events.process_pending(), {})
+        self.txn.refresh_from_db()
+        self.assertEqual(self.txn.status, 'completed')
+        self.assertEqual(ScreeningJob.objects.filter(application=self.application).count(), 1)
+
+    def test_failed_handler_rolls_back_and_retries(self, stripe_mock):
+        self.deliver(session_id='cs_unknown')
+        self.assertEqual(stripe_events.process_pending(), {'pending': 1})
+        event = StripeEvent.objects.get()
+        self.assertEqual((event.status, event.attempts), ('pending', 1))
+        self.assertIn('DoesNotExist', event.last_error)
+
+        # Backed off: not retried until run_after
+        self.assertGreater(event.run_after, timezone.now())
+        self.assertEqual(stripe_events.process_pending(), {})
+        StripeEvent.objects.update(run_after=timezone.now())
+        self.assertEqual(stripe_events.process_pending(), {'pending': 1})
+        self.assertEqual(StripeEvent.objects.get().attempts, 2)
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('landlord', role='landlord')
+        for session_id, status in [('cs_a', 'pending'), ('cs_b', 'pending'), ('cs_c', 'completed'), ('cs_d', 'pending')]:
+            Transaction.objects.create(
+                user=user, amount=Decimal('45.00'), purpose='subscription',
+                stripe_session_id=session_id, status=status,
+            )
+
+    def test_streams_export_in_batches(self):
+        export = io.StringIO(
+            'session_id,status,amount\n'
+            'cs_a,complete,45.00\n'
+            'cs_b,expired,45.00\n'
+            'cs_c,failed,45.00\n'
+            'cs_d,open,40.00\n'
+            'cs_zz,complete,45.00\n'
+        )
+        report = io.StringIO()
+        # One in_bulk SELECT per chunk of two rows; for the chunk that changed
+        # anything, a locking SELECT and one UPDATE per new status inside a
+        # savepoint.
+        with self.assertNumQueries(8):
+            summary = reconciliation.reconcile(
+                reconciliation.iter_rows(export, 'csv'), reconciliation.report_writer(report), batch_size=2,
+            )
+
+        self.assertEqual(summary, {'rows': 5, 'matched': 4, 'updated': 2, 'mismatches': 3})
+        statuses = dict(Transaction.objects.values_list('stripe_session_id', 'status'))
+        self.assertEqual(statuses, {'cs_a': 'completed', 'cs_b': 'failed', 'cs_c': 'completed', 'cs_d': 'pending'})
+        issues = [(row['session_id'], row['issue']) for row in csv.DictReader(io.StringIO(report.getvalue()))]
+        self.assertEqual(issues, [
+            ('cs_c', 'status_conflict'), ('cs_d', 'amount_mismatch'), ('cs_zz', 'unknown_transaction'),
+        ])
+
+
+    def test_transaction_completed_meanwhile_is_left_alone(self):
+        export = io.StringIO('session_id,status\ncs_a,complete\ncs_b,expired\n')
+        in_bulk = Transaction.objects.in_bulk
+
+        def read_then_webhook(*args, **kwargs):
+            found = in_bulk(*args, **kwargs)
+            # The webhook completes (and fulfils) cs_a after reconciliation read it
+            Transaction.objects.filter(stripe_session_id='cs_a').update(status='completed')
+            return found
+
+        with mock.patch.object(Transaction.objects, 'in_bulk', side_effect=read_then_webhook), \
+                mock.patch.object(reconciliation, 'fulfil_transaction') as fulfil:
+            summary = reconciliation.reconcile(reconciliation.iter_rows(export, 'csv'))
+
+        fulfil.assert_not_called()
+        self.assertEqual(summary['updated'], 1)
+        statuses = dict(Transaction.objects.values_list('stripe_session_id', 'status'))
+        self.assertEqual((statuses['cs_a'], statuses['cs_b']), ('completed', 'failed'))
+
+class RentEstimatorTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user(username='ll', password='x', role='landlord')
+        # Exactly rent = 500 + 300/bed + 100/bath + 1/sqft, plus $200 in 90210
+        for zip_code, premium in [('62701', 0), ('90210', 200)]:
+            for beds, baths, sqft in [(1, 1, 650), (2, 1, 900), (2, 2, 1050), (3, 2, 1200)]:
+                make_property(
+                    self.landlord, zip_code=zip_code, bedrooms=beds, bathrooms=Decimal(baths), square_feet=sqft,
+                    monthly_rent=Decimal(500 + 300 * beds + 100 * baths + sqft + premium),
+                )
+
+    def test_statistics_follow_listing_changes(self):
+        cell = RentStatistic.objects.get(zip_code='90210', bedrooms=2)
+        self.assertEqual((cell.listings, cell.rent_sum), (2, 4850))
+
+        listing = Property.objects.get(zip_code='90210', bedrooms=3)
+        listing.bedrooms = 2
+        listing.save()
+        listing.delete()
+        Property.objects.get(zip_code='90210', bedrooms=1).delete()
+
+        live = {
+            (row.zip_code, row.bedrooms): (row.listings, row.rent_sum, row.square_feet_sum)
+            for row in RentStatistic.objects.filter(listings__gt=0)
+        }
+        rent_estimator.rebuild_statistics()
+        rebuilt = {
+            (row.zip_code, row.bedrooms): (row.listings, row.rent_sum, row.square_feet_sum)
+            for row in RentStatistic.objects.all()
+        }
+        self.assertEqual(live, rebuilt)
+
+    def test_estimate_is_regression_plus_location_offset(self):
+        model = rent_estimator.fit_model(chunk_size=3)
+        self.assertEqual(model.listings, 8)
+        self.assertAlmostEqual(model.square_feet_coef, 1.0, places=6)
+
+        with self.assertNumQueries(2):
+            beverly_hills = rent_estimator.estimate_rent('90210-1234', 2, 1, square_feet=900)
+        springfield = rent_estimator.estimate_rent('62701', 2, 1, square_feet=900)
+        self.assertEqual(beverly_hills.comparables, 2)
+        self.assertGreater(beverly_hills.rent, springfield.rent)
+        self.assertLess(beverly_hills.low, beverly_hills.rent)
+
+    def test_batch_csv_matches_single_estimates(self):
+        rent_estimator.fit_model()
+        units = io.StringIO(
+            'unit,zip_code,bedrooms,bathrooms,square_feet,has_pool\n'
+            'A,90210,2,1,900,\n'
+            'B,62701,3,2,,yes\n'
+            'C,62701,two,1,,\n'
+            'D,10001,1,1,700,\n'
+            'E,10001,1,nan,,\n'
+            f'F,10001,{10 ** 307},1,,\n'
+            'G,10001,1,1,900,\n'
+        )
+        # One model lookup, then one RentStatistic query per batch of new zips
+        with self.assertNumQueries(3):
+            output = ''.join(rent_estimator.estimate_csv(units, batch_size=2))
+
+        rows = {row['unit']: row for row in csv.DictReader(io.StringIO(output))}
+        expected = rent_estimator.estimate_rent('62701', 3, 2, amenities=['has_pool'])
+        self.assertEqual(int(rows['B']['estimated_rent']), expected.rent)
+        self.assertEqual(int(rows['A']['estimated_rent']), rent_estimator.estimate_rent('90210', 2, 1, 900).rent)
+        self.assertEqual(rows['C']['estimated_rent'], '')
+        self.assertIn('bedrooms', rows['C']['error'])
+        self.assertEqual(rows['D']['comparables'], '0')
+        # A bad row gets its own error; the rows after it are still estimated
+        self.assertIn('bathrooms', rows['E']['error'])
+        self.assertEqual(rows['F']['error'], 'Could not estimate this unit')
+        self.assertEqual(rows['F']['estimated_rent'], '')
+        self.assertEqual(rows['G']['error'], '')
+        self.assertTrue(rows['G']['estimated_rent'])
+
+    def test_batch_endpoint_streams_csv_to_landlords(self):
+        self.client.force_login(self.landlord)
+        upload = io.BytesIO(b'zip_code,bedrooms,bathrooms\n62701,2,1\n')
+        upload.name = 'units.csv'
+        response = self.client.post(reverse('rent_estimator_batch'), {'units': upload})
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 1)
+        self.assertTrue(rows[0]['estimated_rent'])
+
+    def test_view_rejects_malformed_inputs(self):
+        valid = {'zip_code': '10001', 'bedrooms': '1', 'bathrooms': '1', 'square_feet': '800'}
+        for field, values in [
+            ('square_feet', ('big', '-50', 'inf', 'nan')),
+            ('bathrooms', ('nan', 'inf', '-inf', 'two')),
+            ('bedrooms', ('nan', 'inf', '1.5')),
+        ]:
+            for value in values:
+                with self.subTest(field=field, value=value):
+                    response = self.client.post(reverse('rent_estimator'), {**valid, field: value})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertIsNone(response.context['result'])
+                    self.assertIn(field, str(list(response.context['messages'])[0]))
+
+    def test_view_falls_back_to_default_rates_without_data(self):
+        response = self.client.post(reverse('rent_estimator'), {
+            'zip_code': '10001', 'bedrooms': 1, 'bathrooms': 1, 'has_parking': 'true',
+        })
+        # 1000 + 400 + 200 + 150 parking, no comparables
+        self.assertEqual(response.context['result']['optimal_price'], '1,750')
+        self.assertEqual(response.context['result']['comparables'], 0)
+
+
+class RadiusSearchTests(TestCase):
+    def setUp(self):
+        geo.property_index.invalidate()
+        self.landlord = User.objects.create_user(username='ll', password='x', role='landlord')
+        self.tenant = User.objects.create_user(username='tt', password='x', role='tenant')
+        self.hollywood = make_property(self.landlord, title='Hills', zip_code='90210', monthly_rent=Decimal('3000'))
+        self.downtown = make_property(self.landlord, title='Downtown', zip_code='90012', monthly_rent=Decimal('2000'))
+        self.sf = make_property(self.landlord, title='Mission', zip_code='94110')
+        self.unknown = make_property(self.landlord, title='Nowhere', zip_code='00000')
+
+    def test_coordinates_come_from_zip_centroids(self):
+        self.assertEqual((self.sf.latitude, self.sf.longitude), geo.zip_centroid('94110'))
+        self.assertIsNone(self.unknown.latitude)
+
+    def test_index_follows_listing_changes(self):
+        self.assertEqual(set(geo.properties_within('90210', 15)), {self.hollywood.pk, self.downtown.pk})
+
+        self.downtown.zip_code = '94103'
+        self.downtown.save()
+        self.sf.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(set(geo.properties_within('94103', 5)), {self.downtown.pk})
+        self.assertEqual(set(geo.properties_within('90210', 15)), {self.hollywood.pk})
+
+    def test_stale_index_reloads_in_the_background(self):
+        geo.get_index()
+        geo.property_index.loaded_at -= settings.GEO_INDEX_MAX_AGE + 1
+        with mock.patch.object(geo.threading, 'Thread') as thread, self.assertNumQueries(0):
+            self.assertEqual(set(geo.properties_within('90210', 15)), {self.hollywood.pk, self.downtown.pk})
+            geo.get_index()
+        # One reload at a time, and the search itself never waited for it
+        thread.assert_called_once_with(target=geo.reload_index, name='geo-index-reload', daemon=True)
+
+        # An edit saved while the reload's query was running survives the swap
+        points = list(geo._points())
+        self.downtown.zip_code = '94103'
+        self.downtown.save()
+        geo.property_index.load(points)
+        self.assertEqual(set(geo.properties_within('90210', 15)), {self.hollywood.pk})
+        self.assertIsNone(geo.property_index._journal)
+
+    def test_dense_areas_fall_back_to_sql_distance(self):
+        with mock.patch.object(geo, 'MAX_PK_FILTER', 1):
+            nearby, distances = geo.filter_near(Property.objects.all(), '90210', 15)
+        self.assertEqual(set(nearby), {self.hollywood, self.downtown})
+        self.assertEqual(len(distances), 2)
+
+    def test_property_list_combines_radius_with_filters(self):
+        self.client.force_login(self.tenant)
+        response = self.client.get(reverse('property_list'), {'near': '90210', 'radius': 25, 'min_price': 2500})
+        self.assertEqual(list(response.context['properties']), [self.hollywood])
+        self.assertEqual(response.context['properties'][0].distance, 0)
+
+        # Non-ASCII digits fall back to the default radius
+        response = self.client.get(reverse('property_list'), {'near': '90210', 'radius': '²'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['radius'], 10)
+
+
+class LeaseRenderingTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.landlord = User.objects.create_user(username='ll', password='x', role='landlord')
+        self.tenant = User.objects.create_user(username='tt', password='x', role='tenant')
+        self.property = make_property(self.landlord)
+        make_application(self.property, self.tenant)
+
+    def make_lease(self, **kwargs):
+        defaults = {
+            'property': self.property,
+            'tenant': self.tenant,
+            'lease_start_date': datetime.date(2026, 1, 1),
+            'lease_end_date': datetime.date(2026, 12, 31),
+            'monthly_rent': Decimal('1500.00'),
+            'security_deposit': Decimal('1500.00'),
+            'status': 'signed_both',
+            'terms': {'late_fee': '50', 'utilities': ['Water']},
+        }
+        defaults.update(kwargs)
+        return LeaseDocument.objects.create(**defaults)
+
+    def test_identical_leases_share_one_pdf(self):
+        first, second = self.make_lease(), self.make_lease()
+        leases.enqueue_render(first)
+        leases.enqueue_render(second)
+
+        claimed = leases.claim_render_jobs(10)
+        self.assertEqual([leases.run_render_job(job) for job in claimed], ['succeeded', 'succeeded'])
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertTrue(first.document_file.name.endswith(f'{first.document_sha256}.pdf'))
+        self.assertEqual(first.document_file.name, second.document_file.name)
+        self.assertTrue(first.document_file.read().startswith(b'%PDF-1.4'))
+
+        self.make_lease(monthly_rent=Decimal('1600.00'))
+        other = LeaseDocument.objects.latest('id')
+        leases.render_lease(other)
+        self.assertNotEqual(other.document_sha256, first.document_sha256)
+
+    def test_renew_portfolio_queues_each_lease_once(self):
+        current = self.make_lease()
+        self.make_lease(status='terminated')
+
+        renewals = leases.renew_portfolio(self.landlord, rent_increase_percent=3)
+        self.assertEqual(len(renewals), 1)
+        renewal = LeaseDocument.objects.get(renewal_of=current)
+        self.assertEqual(renewal.lease_start_date, datetime.date(2027, 1, 1))
+        self.assertEqual(renewal.lease_end_date, datetime.date(2027, 12, 31))
+        self.assertEqual(renewal.monthly_rent, Decimal('1545.00'))
+        self.assertEqual(LeaseRenderJob.objects.get().lease, renewal)
+
+        self.assertEqual(leases.renew_portfolio(self.landlord), [])
+
+    def test_generator_saves_lease_and_queues_render(self):
+        self.client.force_login(self.landlord)
+        response = self.client.post(reverse('lease_generate'), {
+            'property': self.property.pk, 'tenant': self.tenant.pk,
+            'address': '1 Main St', 'city_state_zip': 'Springfield, IL 62701',
+            'landlord_name': 'Lee Lord', 'tenant_name': 'Tia Tenant',
+            'start_date': '2026-02-01', 'end_date': '2027-01-31',
+            'rent_amount': '1500', 'deposit_amount': '1500', 'late_fee': '50', 'pets_allowed': 'no',
+        })
+        lease = response.context['lease']
+        self.assertEqual(lease.terms['tenant_name'], 'Tia Tenant')
+        self.assertEqual(LeaseRenderJob.objects.get().lease, lease)
+
+        # Not rendered yet
+        response = self.client.get(reverse('lease_download', args=[lease.pk]))
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+
+class InboxTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user(username='ll', password='x', role='landlord')
+        self.tenant = User.objects.create_user(username='tt', password='x', role='tenant')
+        self.property = make_property(self.landlord)
+
+    def test_counters_follow_send_and_read(self):
+        conversation = inbox.start_conversation(self.tenant, self.landlord, 'Sunny Loft', self.property)
+        self.assertEqual(inbox.start_conversation(self.landlord, self.tenant, 'Again', self.property), conversation)
+        inbox.send_message(conversation, self.tenant, 'Is it still available?')
+        last = inbox.send_message(conversation, self.tenant, 'Also, pets?')
+
+        self.landlord.refresh_from_db()
+        self.assertEqual(self.landlord.unread_messages, 2)
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.last_message, last)
+        member = ConversationMember.objects.get(conversation=conversation, user=self.landlord)
+        self.assertEqual(member.unread_count, 2)
+
+        self.assertEqual(inbox.mark_read(conversation, self.landlord), 2)
+        self.landlord.refresh_from_db()
+        self.assertEqual(self.landlord.unread_messages, 0)
+        self.assertFalse(Message.objects.filter(recipient=self.landlord, is_read=False).exists())
+
+    def test_inbox_page_is_keyset_paginated(self):
+        tenants = [User.objects.create_user(username=f't{i}', password='x', role='tenant') for i in range(5)]
+        for tenant in tenants:
+            conversation = inbox.start_conversation(tenant, self.landlord, f'From {tenant.username}')
+            inbox.send_message(conversation, tenant, 'Hello')
+
+        with self.assertNumQueries(1):
+            first = inbox.inbox_page(self.landlord, page_size=3)
+            subjects = [m.conversation.subject for m in first.items]
+            senders = [m.conversation.last_message.sender.username for m in first.items]
+        self.assertEqual(subjects, ['From t4', 'From t3', 'From t2'])
+        self.assertEqual(senders, ['t4', 't3', 't2'])
+        rest = inbox.inbox_page(self.landlord, cursor=first.next_cursor, page_size=3)
+        self.assertEqual([m.conversation.subject for m in rest.items], ['From t1', 'From t0'])
+        self.assertFalse(rest.has_next)
+
+    def test_contact_reply_and_read_views(self):
+        self.client.force_login(self.tenant)
+        response = self.client.post(reverse('contact_landlord', args=[self.property.pk]), {'body': 'Hi there'})
+        conversation = Conversation.objects.get()
+        self.assertRedirects(response, reverse('conversation_detail', args=[conversation.pk]))
+
+        self.client.force_login(self.landlord)
+        response = self.client.get(reverse('inbox'))
+        self.assertContains(response, 'Hi there')
+        self.client.get(reverse('conversation_detail', args=[conversation.pk]))
+        self.client.post(reverse('conversation_detail', args=[conversation.pk]), {'body': 'Yes, still free'})
+
+        self.tenant.refresh_from_db()
+        self.landlord.refresh_from_db()
+        self.assertEqual((self.tenant.unread_messages, self.landlord.unread_messages), (1, 0))
+
+
+class NotificationTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user(username='ll', password='x', role='landlord')
+        self.tenant = User.objects.create_user(username='tt', password='x', role='tenant')
+        self.property = make_property(self.landlord)
+
+    async def test_publish_reaches_subscribers_from_other_threads(self):
+        async with notifications.broker.subscribe(self.landlord.pk) as subscription:
+            publisher = threading.Thread(
+                target=notifications.broker.publish, args=(self.landlord.pk, 'ping', {'n': 1}),
+            )
+            publisher.start()
+            publisher.join()
+            event_id, event, data = await subscription.get(timeout=1)
+        self.assertEqual((event, data), ('ping', {'n': 1}))
+        self.assertEqual(notifications.broker.subscriber_count(self.landlord.pk), 0)
+
+    async def test_new_rows_are_pushed_after_commit(self):
+        def apply_and_message():
+            with self.captureOnCommitCallbacks(execute=True):
+                make_application(self.property, self.tenant)
+                conversation = inbox.start_conversation(self.tenant, self.landlord, 'Sunny Loft', self.property)
+                inbox.send_message(conversation, self.tenant, 'Is it still available?')
+
+        async with notifications.broker.subscribe(self.landlord.pk) as subscription:
+            await sync_to_async(apply_and_message)()
+            events = [await subscription.get(timeout=1) for _ in range(2)]
+        self.assertEqual([event for _, event, _ in events], ['application', 'message'])
+        self.assertEqual(events[0][2]['property'], 'Sunny Loft')
+        self.assertEqual(events[1][2]['preview'], 'Is it still available?')
+
+    async def test_stream_view(self):
+        response = await self.async_client.get(reverse('notification_stream'))
+        self.assertEqual(response.status_code, 401)
+
+        await self.async_client.aforce_login(self.landlord)
+        response = await self.async_client.get(reverse('notification_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b'retry:'))
+        notifications.broker.publish(self.landlord.pk, 'message', {'subject': 'Hi'})
+        frame = await asyncio.wait_for(anext(chunks), 1)
+        self.assertIn(b'event: message\ndata: {"subject":"Hi"}', frame)
+
+    async def test_wsgi_pages_poll_instead_of_streaming(self):
+        await sync_to_async(self.client.force_login)(self.landlord)
+        response = await sync_to_async(self.client.get)(reverse('notification_stream'))
+        self.assertEqual(response.status_code, 204)
+        page = (await sync_to_async(self.client.get)(reverse('inbox'))).content.decode()
+        self.assertNotIn('EventSource', page)
+        self.assertIn(reverse('inbox_unread'), page)
+        response = await sync_to_async(self.client.get)(reverse('inbox_unread'))
+        self.assertEqual(response.json(), {'unread': 0})
+
+        await self.async_client.aforce_login(self.landlord)
+        page = (await self.async_client.get(reverse('inbox'))).content.decode()
+        self.assertIn('new EventSource', page)
+
+    async def test_idle_stream_sends_heartbeats_and_unsubscribes_on_close(self):
+        stream = notifications.event_stream(self.tenant.pk, heartbeat=0.01)
+        await anext(stream)
+        self.assertEqual(await anext(stream), ': keep-alive\n\n')
+        self.assertEqual(notifications.broker.subscriber_count(self.tenant.pk), 1)
+        await stream.aclose()
+        self.assertEqual(notifications.broker.subscriber_count(self.tenant.pk), 0)
+
+
+class ListingCacheTests(TestCase):
+    def setUp(self):
+        caches[settings.LISTING_CACHE_ALIAS].clear()
+        listing_cache.counters.reset()
+        self.landlord = User.objects.create_user(username='ll', password='x', role='landlord')
+        self.tenant = User.objects.create_user(username='tt', password='x', role='tenant')
+        self.property = make_property(self.landlord)
+        self.client.force_login(self.tenant)
+
+    def property_queries(self, url, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in ctx.captured_queries if 'core_property' in q['sql']]
+
+    def test_equivalent_searches_share_an_entry(self):
+        response, queries = self.property_queries(reverse('property_list'), {'city': 'Springfield', 'sort': 'newest'})
+        self.assertTrue(queries)
+        self.assertContains(response, 'Sunny Loft')
+        response, queries = self.property_queries(
+            reverse('property_list'), {'sort': 'bogus', 'city': ' Springfield ', 'utm_source': 'mail'},
+        )
+        self.assertEqual(queries, [])
+        self.assertContains(response, 'Sunny Loft')
+        stats = listing_cache.cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    def test_property_changes_invalidate(self):
+        self.property_queries(reverse('home'))
+        self.property_queries(reverse('property_list'))
+        invalidations = listing_cache.cache_stats()['invalidations']
+        self.property.title = 'Renovated Loft'
+        self.property.save()
+        self.assertEqual(listing_cache.cache_stats()['invalidations'], invalidations + 1)
+
+        for url in (reverse('home'), reverse('property_list')):
+            response, queries = self.property_queries(url)
+            self.assertTrue(queries)
+            self.assertContains(response, 'Renovated Loft')
+
+        self.property.delete()
+        response, _ = self.property_queries(reverse('property_list'))
+        self.assertContains(response, 'No properties found')
+
+    def test_detail_page_is_cached(self):
+        url = reverse('property_detail', args=[self.property.pk])
+        self.addCleanup(view_counter.flush)
+        self.property_queries(url)
+        response, queries = self.property_queries(url)
+        self.assertEqual(queries, [])
+        self.assertContains(response, 'Sunny Loft')
+        self.assertContains(response, 'Apply for This Property')
+
+        # Owner details aren't cached with the listing
+        User.objects.filter(pk=self.landlord.pk).update(email='new@example.com')
+        self.assertContains(self.client.get(url), 'new@example.com')
+        cached = listing_cache.get_or_compute('property_detail', {'pk': self.property.pk}, lambda: None)
+        self.assertNotIn('landlord', cached['property'])
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        barrier = threading.Barrier(8)
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'fragment'
+
+        def request():
+            barrier.wait()
+            results.append(listing_cache.get_or_compute('burst', {}, compute))
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['fragment'] * 8)
+        self.assertEqual(listing_cache.cache_stats()['coalesced'], 7)
+
+    def test_expired_entry_is_served_stale_while_refreshing(self):
+        cache = caches[settings.LISTING_CACHE_ALIAS]
+        listing_cache.get_or_compute('page', {}, lambda: 'old')
+        key = listing_cache.cache_key('page', {})
+        cache.set(key, ('old', time.time() - 1, 0.01))
+
+        # Another worker is already refreshing it
+        cache.add(f'{key}:lock', 1)
+        self.assertEqual(listing_cache.get_or_compute('page', {}, lambda: 'new'), 'old')
+        self.assertEqual(listing_cache.cache_stats()['stale_hits'], 1)
+
+        cache.delete(f'{key}:lock')
+        self.assertEqual(listing_cache.get_or_compute('page', {}, lambda: 'new'), 'new')
+        self.assertEqual(listing_cache.get_or_compute('page', {}, lambda: 'newer'), 'new')
+
+    def test_early_expiry_is_probabilistic(self):
+        listing_cache.get_or_compute('page', {}, lambda: 'old')
+        with mock.patch('core.listing_cache.random.random', return_value=0.0):
+            self.assertEqual(listing_cache.get_or_compute('page', {}, lambda: 'new'), 'old')
+        key = listing_cache.cache_key('page', {})
+        value, refresh_at, _ = caches[settings.LISTING_CACHE_ALIAS].get(key)
+        caches[settings.LISTING_CACHE_ALIAS].set(key, (value, refresh_at, 60.0))
+        # A slow-to-compute entry drawn from the tail refreshes minutes early
+        with mock.patch('core.listing_cache.random.random', return_value=0.9999):
+            self.assertEqual(listing_cache.get_or_compute('page', {}, lambda: 'new'), 'new')
+
+    def test_stats_are_staff_only(self):
+        response = self.client.get(reverse('cache_stats'))
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(User.objects.create_user(username='ops', password='x', is_staff=True))
+        response = self.client.get(reverse('cache_stats'))
+        self.assertEqual(set(response.json()), {'listings', 'screening'})
+
+
+# Most queries each page may run. Every case is measured against the seeded
+# data, then again after grow() adds more of everything, and must cost the
+# same both times; a count that moves means a query scales with data size.
+PROPERTY_IMPORT_CSV = (
+    'title,description,address,city,state,zip_code,bedrooms,bathrooms,square_feet,monthly_rent,security_deposit,status\n'
+    'Garden Flat,Quiet street,3 Oak Ave,Springfield,IL,62701,2,1.5,850,1400,1400,\n'
+    ',No title,4 Oak Ave,Springfield,IL,62701,-1,1,700,1200,1200,available\n'
+    'Corner Studio,Near transit,5 Oak Ave,Springfield,IL,62701,0,1,450,950,950,rented\n'
+)
+
+
+QUERY_BUDGETS = {
+    'home': 1,
+    'register': 0,
+    'button_preview': 0,
+    'login': 0,
+    'logout': 4,
+    'rent_estimator': 4,
+    'rent_estimator_batch': 4,
+    'dashboard (landlord)': 7,
+    'dashboard (tenant)': 5,
+    'lease_generate': 4,
+    'lease_download': 3,
+    'lease_renew_all': 7,
+    'property_list': 3,
+    'property_detail': 5,
+    'property_create': 2,
+    'property_import': 10,
+    'application_create': 4,
+    'application_detail': 4,
+    'application_review': 4,
+    'run_screening': 7,
+    'screening_status': 5,
+    'view_screening_report': 3,
+    'screening_batch_detail': 4,
+    'screening_batch_status': 3,
+    'inbox': 3,
+    'conversation_detail': 10,
+    'contact_landlord': 15,
+    'notification_stream': 2,
+    'inbox_unread': 2,
+    'create_checkout_session': 5,
+    'create_batch_checkout_session': 4,
+    'payment_success': 2,
+    'stripe_webhook': 3,
+    'cache_stats': 2,
+    'admin user': 4,
+    'admin property': 6,
+    'admin rentalapplication': 4,
+    'admin screeningreport': 4,
+    'admin leasedocument': 4,
+    'admin message': 4,
+}
+
+
+@mock.patch('core.views.stripe')
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(view_counter.flush)
+
+        self.landlord = User.objects.create_user(
+            username='ll', password='x', role='landlord', first_name='Lana', last_name='Lord',
+        )
+        self.tenant = User.objects.create_user(username='tt', password='x', role='tenant')
+        self.newcomer = User.objects.create_user(username='new', password='x', role='tenant')
+        self.staff = User.objects.create_superuser(username='ops', password='x')
+        self.property = make_property(self.landlord)
+        self.application = make_application(self.property, self.tenant)
+        self.report = generate_screening_report(self.application, provider=SimulatedProvider())
+        self.batch = ScreeningBatch.objects.create(property=self.property, requested_by=self.landlord, total=1)
+        self.batch.applications.add(self.application)
+        self.lease = LeaseDocument.objects.create(
+            property=self.property, tenant=self.tenant, status='signed_both',
+            lease_start_date=datetime.date(2026, 1, 1), lease_end_date=datetime.date(2026, 12, 31),
+            monthly_rent=Decimal('1500.00'), security_deposit=Decimal('1500.00'),
+        )
+        leases.render_lease(self.lease)
+        self.conversation = inbox.start_conversation(self.tenant, self.landlord, 'Sunny Loft', self.property)
+        inbox.send_message(self.conversation, self.tenant, 'Is it still available?')
+        self.rounds = 0
+
+    def grow(self):
+        """Add several more of every kind of row the pages read"""
+        self.rounds += 1
+        for i in range(3):
+            tenant = User.objects.create_user(username=f'g{self.rounds}-{i}', password='x', role='tenant')
+            property_obj = make_property(self.landlord, title=f'Loft {self.rounds}-{i}')
+            for listing in (property_obj, self.property):
+                application = make_application(listing, tenant)
+                generate_screening_report(application, provider=SimulatedProvider())
+                self.batch.applications.add(application)
+            LeaseDocument.objects.create(
+                property=property_obj, tenant=self.tenant, status='signed_both',
+                lease_start_date=datetime.date(2026, 1, 1), lease_end_date=datetime.date(2026, 12, 31),
+                monthly_rent=Decimal('1500.00'), security_deposit=Decimal('1500.00'),
+            )
+            conversation = inbox.start_conversation(tenant, self.landlord, f'About loft {i}', property_obj)
+            inbox.send_message(conversation, tenant, 'Hello')
+            inbox.send_message(self.conversation, self.tenant, f'Follow-up {i}')
+            Transaction.objects.create(
+                user=self.landlord, amount=Decimal('45.00'), purpose='screening', application=self.application,
+                stripe_session_id=f'cs_seed_{self.rounds}_{i}',
+            )
+
+    def cases(self):
+        """{label: (user, method, url, data)} covering every route in core/urls.py and the admin lists"""
+        application, report, batch = self.application, self.report, self.batch
+        units = io.BytesIO(b'zip_code,bedrooms,bathrooms\n62701,2,1\n62701,3,2\n')
+        units.name = 'units.csv'
+        listings = io.BytesIO(PROPERTY_IMPORT_CSV.encode())
+        listings.name = 'listings.csv'
+        cases = {
+            'home': (None, 'get', reverse('home'), None),
+            'register': (None, 'get', reverse('register'), None),
+            'button_preview': (None, 'get', reverse('button_preview'), None),
+            'login': (None, 'get', reverse('login'), None),
+            'logout': (self.tenant, 'get', reverse('logout'), None),
+            'rent_estimator': (self.tenant, 'post', reverse('rent_estimator'),
+                               {'zip_code': '62701', 'bedrooms': '2', 'bathrooms': '1'}),
+            'rent_estimator_batch': (self.landlord, 'post', reverse('rent_estimator_batch'), {'units': units}),
+            'dashboard (landlord)': (self.landlord, 'get', reverse('dashboard'), None),
+            'dashboard (tenant)': (self.tenant, 'get', reverse('dashboard'), None),
+            'lease_generate': (self.landlord, 'get', reverse('lease_generate'), None),
+            'lease_download': (self.tenant, 'get', reverse('lease_download', args=[self.lease.pk]), None),
+            'lease_renew_all': (self.landlord, 'post', reverse('lease_renew_all'), {'rent_increase': '3'}),
+            'property_list': (self.tenant, 'get', reverse('property_list'), None),
+            'property_detail': (self.tenant, 'get', reverse('property_detail', args=[self.property.pk]), None),
+            'property_create': (self.landlord, 'get', reverse('property_create'), None),
+            'property_import': (self.landlord, 'post', reverse('property_import'), {'properties': listings}),
+            'application_create': (
+                self.newcomer, 'get', reverse('application_create', args=[self.property.pk]), None,
+            ),
+            'application_detail': (
+                self.landlord, 'get', reverse('application_detail', args=[application.pk]), None,
+            ),
+            'application_review': (
+                self.landlord, 'post', reverse('application_review', args=[application.pk]),
+                {'status': 'under_review'},
+            ),
+            'run_screening': (self.landlord, 'post', reverse('run_screening', args=[application.pk]), None),
+            'screening_status': (self.landlord, 'get', reverse('screening_status', args=[application.pk]), None),
+            'view_screening_report': (
+                self.landlord, 'get', reverse('view_screening_report', args=[report.pk]), None,
+            ),
+            'screening_batch_detail': (
+                self.landlord, 'get', reverse('screening_batch_detail', args=[batch.pk]), None,
+            ),
+            'screening_batch_status': (
+                self.landlord, 'get', reverse('screening_batch_status', args=[batch.pk]), None,
+            ),
+            'inbox': (self.landlord, 'get', reverse('inbox'), None),
+            'conversation_detail': (
+                self.landlord, 'get', reverse('conversation_detail', args=[self.conversation.pk]), None,
+            ),
+            'contact_landlord': (
+                self.tenant, 'post', reverse('contact_landlord', args=[self.property.pk]), {'body': 'Hi'},
+            ),
+            'notification_stream': (self.tenant, 'get', reverse('notification_stream'), None),
+            'inbox_unread': (self.tenant, 'get', reverse('inbox_unread'), None),
+            'create_checkout_session': (
+                self.landlord, 'get', reverse('create_checkout_session', args=[application.pk]), None,
+            ),
+            'create_batch_checkout_session': (
+                self.landlord, 'post', reverse('create_batch_checkout_session', args=[self.property.pk]), None,
+            ),
+            'payment_success': (self.landlord, 'get', reverse('payment_success'), {'session_id': 'cs_1'}),
+            'stripe_webhook': (None, 'post', reverse('stripe_webhook'), None),
+            'cache_stats': (self.staff, 'get', reverse('cache_stats'), None),
+        }
+        for model in ('user', 'property', 'rentalapplication', 'screeningreport', 'leasedocument', 'message'):
+            cases[f'admin {model}'] = (self.staff, 'get', reverse(f'admin:core_{model}_changelist'), None)
+        return cases
+
+    def measure(self, label, user, method, url, data):
+        # Measure cache misses, and keep buffered view counts from flushing mid-request
+        caches[settings.LISTING_CACHE_ALIAS].clear()
+        view_counter.flush()
+        self.client.logout()
+        if user is not None:
+            self.client.force_login(user)
+        if label == 'stripe_webhook':
+            self.rounds += 1
+            request = lambda: self.client.post(url, content_type='application/json', data={
+                'id': f'evt_{self.rounds}', 'type': 'checkout.session.completed', 'data': {'object': {'id': 'cs_1'}},
+            })
+        else:
+            request = lambda: getattr(self.client, method)(url, data)
+        with QueryRecorder() as recorder:
+            response = request()
+            if response.streaming:
+                # Exports and imports do their work while the body is iterated
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, label)
+        return recorder
+
+    def test_every_route_has_a_budget(self, stripe_mock):
+        from .urls import urlpatterns
+
+        covered = {label.split(' ')[0] for label in self.cases()}
+        self.assertEqual({pattern.name for pattern in urlpatterns} - covered, set())
+        self.assertEqual(set(self.cases()) - set(QUERY_BUDGETS), set())
+
+    def test_query_budgets(self, stripe_mock):
+        stripe_mock.checkout.Session.create.side_effect = lambda **kwargs: mock.Mock(
+            id=f'cs_{Transaction.objects.count()}', url='https://stripe.test/checkout',
+        )
+        first = {label: self.measure(label, *case) for label, case in self.cases().items()}
+        self.grow()
+        for label, case in self.cases().items():
+            second = self.measure(label, *case)
+            with self.subTest(label):
+                self.assertLessEqual(first[label].count, QUERY_BUDGETS[label], first[label].report())
+                self.assertLessEqual(
+                    second.count, first[label].count, f'queries grew with the data: {second.report()}',
+                )
+                self.assertEqual(second.duplicates, 0, second.report())
+
+    @override_settings(QUERY_BUDGET_ENABLED=True)
+    def test_middleware_reports_queries(self, stripe_mock):
+        self.client.force_login(self.landlord)
+        response = self.client.get(reverse('inbox'))
+        self.assertEqual(response['X-DB-Queries'], str(QUERY_BUDGETS['inbox']))
+        self.assertEqual(response['X-DB-Duplicates'], '0')
+        self.assertTrue(response['Server-Timing'].startswith('db;dur='))
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_WARN_QUERIES=5)
+    def test_middleware_counts_streamed_queries(self, stripe_mock):
+        self.client.force_login(self.landlord)
+        listings = io.BytesIO(PROPERTY_IMPORT_CSV.encode())
+        listings.name = 'listings.csv'
+        response = self.client.post(reverse('property_import'), {'properties': listings})
+        # Headers go out before the import runs, so they only cover the view
+        self.assertEqual(response['X-DB-Queries'], '2')
+        with self.assertLogs('core.query_budget', 'WARNING') as logs:
+            b''.join(response.streaming_content)
+        self.assertIn(f'{QUERY_BUDGETS["property_import"]} queries', logs.output[0])
+
+    def test_assert_query_budget(self, stripe_mock):
+        with assert_query_budget(1):
+            list(Property.objects.all())
+        self.grow()
+        with self.assertRaisesRegex(AssertionError, r'7x SELECT "core_user"'):
+            with assert_query_budget(10):
+                for application in RentalApplication.objects.all():
+                    application.tenant
+
+
+class SeedScaleTests(TestCase):
+    VOLUMES = {'landlords': 3, 'tenants': 12, 'properties': 20, 'applications': 50, 'conversations': 8, 'messages': 30}
+
+    def setUp(self):
+        self.addCleanup(view_counter.flush)
+
+    def test_seed_is_deterministic(self):
+        created = seeding.seed(**self.VOLUMES, seed=7, prefix='a', batch_size=7)
+        self.assertEqual(created, self.VOLUMES)
+        seeding.seed(**self.VOLUMES, seed=7, prefix='b', batch_size=7)
+        fields = ('title', 'zip_code', 'monthly_rent', 'created_at')
+        listings = [
+            list(Property.objects.filter(landlord__username__startswith=f'{prefix}-').order_by('pk').values_list(*fields))
+            for prefix in ('a', 'b')
+        ]
+        self.assertEqual(listings[0], listings[1])
+        with self.assertRaises(ValueError):
+            seeding.seed(**self.VOLUMES, prefix='a')
+
+    def test_seed_keeps_derived_data_consistent(self):
+        seeding.seed(**self.VOLUMES, seed=1, batch_size=5)
+        self.assertFalse(Property.objects.filter(latitude__isnull=True).exists())
+        self.assertEqual(
+            RentStatistic.objects.aggregate(total=Sum('listings'))['total'], self.VOLUMES['properties'],
+        )
+        self.assertEqual(
+            PropertyActivityRollup.objects.aggregate(total=Sum('applications'))['total'],
+            self.VOLUMES['applications'],
+        )
+        for conversation in Conversation.objects.all():
+            self.assertEqual(
+                conversation.last_message_id, conversation.messages.order_by('-created_at', '-id').first().pk,
+            )
+        for member in ConversationMember.objects.all():
+            unread = Message.objects.filter(
+                conversation=member.conversation_id, recipient=member.user_id, is_read=False,
+            ).count()
+            self.assertEqual(member.unread_count, unread)
+        for user in User.objects.all():
+            self.assertEqual(user.unread_messages, Message.objects.filter(recipient=user, is_read=False).count())
+        self.assertTrue(search_properties(Property.objects.all(), 'bedroom').exists())
+
+    def test_benchmark_views(self):
+        seeding.seed(**self.VOLUMES)
+        User.objects.create_superuser(username='ops', password='x')
+        messages_before = Message.objects.count()
+        output = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+        output.close()
+        self.addCleanup(os.remove, output.name)
+
+        call_command('benchmark_views', iterations=2, warmup=0, output=output.name, stdout=io.StringIO())
+        with open(output.name, encoding='utf-8') as fp:
+            results = json.load(fp)
+
+        from .urls import urlpatterns
+
+        measured = {label.split(' ')[0] for label in results['views']}
+        self.assertEqual({pattern.name for pattern in urlpatterns} - measured - set(results['skipped']), set())
+        for label, result in results['views'].items():
+            with self.subTest(label):
+                self.assertTrue(all(status < 400 for status in result['status']), result)
+                self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+                self.assertLessEqual(result['p95_ms'], result['p99_ms'])
+        self.assertEqual(results['views']['property_list']['status'], [200])
+        # Every request was rolled back
+        self.assertEqual(Message.objects.count(), messages_before)
+
+        slower = json.loads(json.dumps(results))
+        slower['views']['home']['p95_ms'] *= 2
+        changes = {label: change for label, _, _, change in view_benchmark.compare(results, slower)}
+        self.assertAlmostEqual(changes['home'], 1.0)
+        self.assertEqual(changes['inbox'], 0)
+
+
+class PropertyImportTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user('landlord', password='x', role='landlord')
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def serve_images(self):
+        """A local HTTP server with /photo.png, /notes.txt, /redirect (to /photo.png) and nothing else"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from PIL import Image
+
+        png = io.BytesIO()
+        Image.new('RGB', (4, 4), 'red').save(png, 'PNG')
+        files = {'/photo.png': png.getvalue(), '/notes.txt': b'not an image'}
+        self.requested_hosts = requested_hosts = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                requested_hosts.append(self.headers['Host'])
+                if self.path == '/redirect':
+                    self.send_response(302)
+                    self.send_header('Location', '/photo.png')
+                    self.end_headers()
+                    return
+                body = files.get(self.path)
+                self.send_response(200 if body else 404)
+                self.end_headers()
+                self.wfile.write(body or b'')
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f'http://127.0.0.1:{server.server_port}'
+
+    def test_import_csv_skips_invalid_rows(self):
+        version = listing_cache.current_version()
+        results = list(import_properties(
+            read_records(io.StringIO(PROPERTY_IMPORT_CSV)), self.landlord, batch_size=2, fetch_images=False,
+        ))
+
+        self.assertEqual([result.line for result in results], [2, 3, 4])
+        self.assertIsNone(results[1].id)
+        self.assertIn('title: This field is required.', results[1].error)
+        self.assertIn('bedrooms: Ensure this value is greater than or equal to 0.', results[1].error)
+        flat, studio = Property.objects.filter(pk__in=[results[0].id, results[2].id]).order_by('pk')
+        self.assertEqual((flat.landlord, flat.status, flat.bathrooms), (self.landlord, 'available', Decimal('1.5')))
+        self.assertEqual(studio.status, 'rented')
+        self.assertIsNotNone(flat.latitude)
+        self.assertEqual(list(search_properties(Property.objects.all(), 'studio')), [studio])
+        self.assertEqual(
+            list(RentStatistic.objects.order_by('bedrooms').values_list('bedrooms', 'listings', 'rent_sum')),
+            [(0, 1, 950.0), (2, 1, 1400.0)],
+        )
+        self.assertNotEqual(listing_cache.current_version(), version)
+
+    def test_import_jsonl_fetches_images(self):
+        base = self.serve_images()
+        row = next(csv.DictReader(io.StringIO(PROPERTY_IMPORT_CSV)))
+        lines = [
+            json.dumps({**row, 'image_url': f'{base}/photo.png'}),
+            json.dumps({**row, 'image_url': f'{base}/missing.png'}),
+            '{"title": ',
+            json.dumps({**row, 'image_url': f'{base}/notes.txt'}),
+            json.dumps({**row, 'bedrooms': 3}),
+        ]
+        # The test server is on loopback, which imports normally refuse
+        with override_settings(PROPERTY_IMPORT_IMAGE_ALLOW_PRIVATE=True):
+            results = list(import_properties(read_records(io.StringIO('\n'.join(lines)), 'jsonl'), self.landlord))
+
+        self.assertEqual([bool(result.id) for result in results], [True, False, False, False, True])
+        self.assertEqual(results[1].error, 'image_url: Could not download image')
+        self.assertTrue(results[2].error.startswith('Invalid JSON'))
+        self.assertTrue(results[3].error.startswith('image_url: Upload a valid image.'))
+        with_photo = Property.objects.get(pk=results[0].id)
+        self.assertTrue(with_photo.image.name.startswith('properties/photo'))
+        self.assertTrue(with_photo.image.storage.exists(with_photo.image.name))
+        self.assertEqual(
+            list(ThumbnailJob.objects.values_list('kind', 'object_id', 'status')), [('property', with_photo.pk, 'queued')],
+        )
+        self.assertFalse(Property.objects.get(pk=results[4].id).image)
+
+    def test_private_and_redirected_image_urls_are_refused(self):
+        base = self.serve_images()
+        row = next(csv.DictReader(io.StringIO(PROPERTY_IMPORT_CSV)))
+        urls = [f'{base}/photo.png', 'http://169.254.169.254/latest/meta-data/', f'{base}/redirect']
+        lines = [json.dumps({**row, 'image_url': url}) for url in urls]
+        results = list(import_properties(read_records(io.StringIO('\n'.join(lines)), 'jsonl'), self.landlord))
+        self.assertEqual([result.error for result in results], ['image_url: Could not download image'] * 3)
+
+        # Each redirect hop is checked too, not just the first URL
+        fetcher = ImageFetcher()
+        self.addCleanup(fetcher.close)
+        with override_settings(PROPERTY_IMPORT_IMAGE_ALLOW_PRIVATE=True):
+            self.assertTrue(fetcher.fetch(f'{base}/redirect').startswith('properties/photo'))
+        with mock.patch.object(fetcher, 'check_url', side_effect=[None, ValidationError('refused')]):
+            with self.assertRaisesMessage(ValidationError, 'refused'):
+                fetcher.fetch(f'{base}/redirect')
+
+    def test_connection_is_pinned_to_the_checked_address(self):
+        import socket
+        import urllib3
+
+        port = int(self.serve_images().rsplit(':', 1)[1])
+        real_getaddrinfo = socket.getaddrinfo
+        real_connect = urllib3.util.connection.create_connection
+        # Public for the check, then rebound to loopback for any later lookup
+        answers = iter(['93.184.215.14', '127.0.0.1'])
+        connected = []
+
+        def getaddrinfo(host, *args, **kwargs):
+            if host == 'photos.example':
+                return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (next(answers), port))]
+            return real_getaddrinfo(host, *args, **kwargs)
+
+        def create_connection(address, *args, **kwargs):
+            connected.append(address[0])
+            # The local server stands in for the public host
+            return real_connect(('127.0.0.1', address[1]), *args, **kwargs)
+
+        fetcher = ImageFetcher()
+        self.addCleanup(fetcher.close)
+        with mock.patch('socket.getaddrinfo', getaddrinfo), \
+                mock.patch('urllib3.util.connection.create_connection', create_connection):
+            name = fetcher.fetch(f'http://photos.example:{port}/photo.png')
+        self.assertTrue(name.startswith('properties/photo'))
+        self.assertEqual(connected, ['93.184.215.14'])
+        self.assertEqual(self.requested_hosts, [f'photos.example:{port}'])
+
+    def test_upload_and_command(self):
+        upload = io.BytesIO(PROPERTY_IMPORT_CSV.encode())
+        upload.name = 'listings.csv'
+        self.client.force_login(self.landlord)
+        response = self.client.post(reverse('property_import'), {'properties': upload})
+        report = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['line'] for row in report], ['2', '3', '4'])
+        self.assertEqual([bool(row['id']) for row in report], [True, False, True])
+        self.assertEqual(Property.objects.count(), 2)
+
+        path = os.path.join(settings.MEDIA_ROOT, 'listings.csv')
+        with open(path, 'w') as fp:
+            fp.write(PROPERTY_IMPORT_CSV)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_properties', path, landlord='landlord', stdout=stdout, stderr=stderr)
+        self.assertIn('Imported 2 listings; skipped 1 rows', stdout.getvalue())
+        self.assertIn('Line 3: title', stderr.getvalue())
+        self.assertEqual(Property.objects.count(), 4)
+
+        # Unreadable files end the report with an error row instead of cutting it off
+        broken = io.BytesIO(PROPERTY_IMPORT_CSV.encode() + b'Loft,\xff\n')
+        broken.name = 'listings.csv'
+        response = self.client.post(reverse('property_import'), {'properties': broken})
+        report = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(report[-1]['error'], 'File is not UTF-8 text; stopped reading here')
+        oversized = io.StringIO('title\n"' + 'x' * (csv.field_size_limit() + 1) + '"\n')
+        self.assertIn('Invalid CSV (field larger than field limit', list(read_records(oversized))[0][1])
+
+        tenant = User.objects.create_user('tenant', password='x', role='tenant')
+        self.client.force_login(tenant)
+        self.assertRedirects(
+            self.client.post(reverse('property_import'), {'properties': upload}), reverse('dashboard'),
+            fetch_redirect_response=False,
+        )
+
+
+def make_photo(size=(1600, 1000), image_format='JPEG'):
+    """Noisy enough that the card size limit matters"""
+    from PIL import Image
+
+    photo = Image.merge('RGB', [Image.effect_noise(size, sigma) for sigma in (30, 50, 70)])
+    content = io.BytesIO()
+    photo.save(content, image_format, quality=95)
+    return content.getvalue()
+
+
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user('landlord', password='x', role='landlord')
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_upload_is_rendered_by_worker_and_served_with_srcset(self):
+        from django.core.files.base import ContentFile
+
+        listing = make_property(self.landlord)
+        self.assertFalse(ThumbnailJob.objects.exists())
+        listing.image.save('loft.jpg', ContentFile(make_photo()))
+        self.assertEqual(list(ThumbnailJob.objects.values_list('object_id', 'status')), [(listing.pk, 'queued')])
+
+        stdout = io.StringIO()
+        call_command('run_thumbnail_worker', once=True, workers=1, stdout=stdout)
+        self.assertIn(f'(property {listing.pk}): succeeded', stdout.getvalue())
+        listing.refresh_from_db()
+        manifest = listing.image_variants
+        self.assertEqual(manifest['source'], listing.image.name)
+        self.assertEqual((manifest['width'], manifest['height']), (1600, 1000))
+        cards = manifest['variants']['card']
+        self.assertEqual({variant['format'] for variant in cards}, {'webp', 'jpg'})
+        self.assertTrue(all(variant['height'] * 2 == variant['width'] for variant in cards))
+        self.assertTrue(all(variant['bytes'] <= thumbnails.CARD_MAX_BYTES for variant in cards))
+        self.assertEqual([v['width'] for v in manifest['variants']['full'] if v['format'] == 'webp'], [640, 1280, 1600])
+        storage = listing.image.storage
+        self.assertTrue(storage.exists('properties/loft.thumbs.json'))
+        self.assertTrue(all(storage.exists(variant['name']) for variant in cards))
+
+        self.client.force_login(self.landlord)
+        page = self.client.get(reverse('property_list')).content.decode()
+        self.assertIn('<source type="image/webp" srcset="/media/properties/loft.card-400w.webp 400w', page)
+        self.assertNotIn('/media/properties/loft.jpg', page)
+
+        # A new photo replaces the old variants; removing it drops them
+        old_names = [variant['name'] for variant in cards]
+        listing.image.save('garden.jpg', ContentFile(make_photo((900, 600), 'PNG')))
+        claimed = thumbnails.claim_jobs(10)
+        self.assertEqual([status for _, status in thumbnails.run_jobs(claimed)], ['succeeded'])
+        listing.refresh_from_db()
+        self.assertTrue(listing.image_variants['source'].startswith('properties/garden'))
+        self.assertFalse(any(storage.exists(name) for name in old_names))
+        self.assertEqual([v['width'] for v in listing.image_variants['variants']['full'] if v['format'] == 'jpg'],
+                         [640, 900])
+
+        listing.image = None
+        listing.save()
+        listing.refresh_from_db()
+        self.assertEqual(listing.image_variants, {})
+        self.assertFalse(ThumbnailJob.objects.filter(status='queued').exists())
+
+    def test_listing_cache_invalidated_once_per_batch(self):
+        from django.core.files.base import ContentFile
+
+        storage = Property._meta.get_field('image').storage
+        for title in ('one', 'two', 'three'):
+            listing = make_property(self.landlord, title=title)
+            name = storage.save(f'properties/{title}.png', ContentFile(make_photo((300, 200), 'PNG')))
+            Property.objects.filter(pk=listing.pk).update(image=name)
+
+        # Rows are read a page at a time, not all up front
+        candidates = thumbnails._backfill_candidates('property', False, 2)
+        with self.assertNumQueries(1):
+            self.assertEqual([next(candidates)[3], next(candidates)[3]], [{}, {}])
+        with self.assertNumQueries(1):
+            next(candidates)
+
+        invalidations = listing_cache.cache_stats()['invalidations']
+        results = list(thumbnails.backfill('property', batch_size=2))
+        self.assertTrue(all(manifest and error is None for _, manifest, error in results))
+        # Two chunks, one invalidation each
+        self.assertEqual(listing_cache.cache_stats()['invalidations'], invalidations + 2)
+
+    def test_backfill_command(self):
+        from django.core.files.base import ContentFile
+
+        tenant = User.objects.create_user('tenant', password='x', role='tenant')
+        name = tenant.profile_picture.storage.save('profiles/me.png', ContentFile(make_photo((300, 400), 'PNG')))
+        # Set without save(), like media uploaded before thumbnails existed
+        User.objects.filter(pk=tenant.pk).update(profile_picture=name)
+
+        stdout = io.StringIO()
+        call_command('backfill_thumbnails', kind=['profile'], workers=1, stdout=stdout)
+        self.assertIn('Rendered thumbnails for 1 images; 0 failed', stdout.getvalue())
+        tenant.refresh_from_db()
+        avatars = tenant.profile_picture_variants['variants']['avatar']
+        self.assertEqual({(v['width'], v['height']) for v in avatars}, {(64, 64), (128, 128), (256, 256)})
+
+        call_command('backfill_thumbnails', stdout=stdout)
+        self.assertIn('Rendered thumbnails for 0 images; 0 failed', stdout.getvalue())
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+
+class StaticAssetTests(TestCase):
+    def setUp(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        settings_override = override_settings(STATIC_ROOT=static_root, STATIC_SERVE_COLLECTED=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_collectstatic_fingerprints_and_precompresses(self):
+        import gzip
+        from django.contrib.staticfiles.storage import staticfiles_storage
+
+        css = staticfiles_storage.stored_name('css/styles.css')
+        hero = staticfiles_storage.stored_name('images/hero_bg.png')
+        self.assertRegex(css, r'^css/styles\.[0-9a-f]{12}\.css$')
+        with staticfiles_storage.open(css) as fp:
+            content = fp.read()
+        self.assertIn(f'../{hero}'.encode(), content)
+        with staticfiles_storage.open(css + '.gz') as fp:
+            self.assertEqual(gzip.decompress(fp.read()), content)
+        self.assertTrue(staticfiles_storage.exists(hero + '.webp'))
+        self.assertIn(f'href="/static/{css}"', self.client.get(reverse('home')).content.decode())
+
+        response = self.client.get(f'/static/{css}', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), content)
+
+        response = self.client.get(f'/static/{css}', HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), content)
+
+        response = self.client.get(f'/static/{hero}', HTTP_ACCEPT='image/webp,*/*')
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['Vary'], 'Accept')
+        self.assertEqual(self.client.get(f'/static/{hero}', HTTP_ACCEPT='*/*')['Content-Type'], 'image/png')
+
+        response = self.client.get('/static/css/styles.css')
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.STATIC_UNHASHED_MAX_AGE}')
+        self.assertEqual(
+            self.client.get('/static/css/styles.css', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code,
+            304,
+        )
+        self.assertEqual(self.client.get('/static/../config/settings.py').status_code, 404)
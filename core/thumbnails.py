@@ -0,0 +1,324 @@
+"""Resized WebP/JPEG variants of listing photos and profile pictures.
+
+Saving a Property image or a User profile picture queues a ThumbnailJob;
+``run_thumbnail_worker`` claims jobs and renders them on a process pool,
+since decoding, resizing and encoding are CPU-bound.
+``backfill_thumbnails`` does the same for media uploaded before the
+pipeline existed. Cached listing fragments are invalidated once per batch
+of stored listing photos, not once per photo.
+
+Variants are stored next to the original (``properties/loft.jpg`` gets
+``properties/loft.card-400w.webp``, ``properties/loft.card-400w.jpg``, ...)
+together with a ``properties/loft.thumbs.json`` manifest. A copy of the
+manifest is kept on the row (``Property.image_variants``,
+``User.profile_picture_variants``) so templates can build ``srcset``
+without touching storage; see ``core/templatetags/images.py``.
+
+Listing cards show a 200px high, cover-cropped image, so the ``card``
+variants are cropped to that shape and re-encoded at lower quality until
+they fit ``CARD_MAX_BYTES``; a larger size that still doesn't fit at
+``MIN_QUALITY`` is left out rather than served over budget.
+"""
+import io
+import json
+import logging
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from . import jobs, listing_cache
+from .models import Property, ThumbnailJob, User
+
+logger = logging.getLogger(__name__)
+
+CARD_MAX_BYTES = 50 * 1024
+MIN_QUALITY = 40
+MANIFEST_SUFFIX = '.thumbs.json'
+
+
+class VariantSet(NamedTuple):
+    widths: tuple
+    # width / height to crop to, or None to keep the original's shape
+    aspect: float = None
+    max_bytes: int = None
+
+
+VARIANT_SETS = {
+    'property': {
+        # .property-image is 200px high and about 400px wide on a desktop grid
+        'card': VariantSet((400, 800), aspect=2.0, max_bytes=CARD_MAX_BYTES),
+        'full': VariantSet((640, 1280, 1920)),
+    },
+    'profile': {
+        'avatar': VariantSet((64, 128, 256), aspect=1.0),
+    },
+}
+# Format: (Pillow format, extension, default quality, save options)
+FORMATS = (
+    ('WEBP', 'webp', 75, {'method': 4}),
+    ('JPEG', 'jpg', 80, {'progressive': True, 'optimize': True}),
+)
+# kind: (model, image field, variants field)
+TARGETS = {
+    'property': (Property, 'image', 'image_variants'),
+    'profile': (User, 'profile_picture', 'profile_picture_variants'),
+}
+
+
+def _encode(image, image_format, quality, options, max_bytes):
+    while True:
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, quality=quality, **options)
+        if max_bytes is None or buffer.tell() <= max_bytes or quality <= MIN_QUALITY:
+            return buffer.getvalue(), quality
+        quality = max(quality - 10, MIN_QUALITY)
+
+
+def render_variants(content, kind):
+    """Every variant of the image bytes ``content`` for ``kind``.
+
+    Returns ``(width, height, [(set name, width, height, extension, quality,
+    data)])``. Runs in pool processes, so it only takes and returns plain
+    values and never touches the database.
+    """
+    image = Image.open(io.BytesIO(content))
+    largest = max(width for variant_set in VARIANT_SETS[kind].values() for width in variant_set.widths)
+    # JPEGs can be decoded at 1/2, 1/4 or 1/8 scale, much faster than decoding then shrinking
+    image.draft('RGB', (largest, largest))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    source_width, source_height = image.size
+
+    rendered = []
+    for name, variant_set in VARIANT_SETS[kind].items():
+        for width in variant_set.widths:
+            # Never upscale; a small original yields fewer sizes
+            aspect = variant_set.aspect or source_width / source_height
+            width = min(width, source_width, round(source_height * aspect))
+            if any(r[0] == name and r[1] == width for r in rendered):
+                continue
+            height = round(width / aspect)
+            if variant_set.aspect:
+                resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+            else:
+                resized = image.resize((width, height), Image.LANCZOS)
+            for image_format, extension, quality, options in FORMATS:
+                data, used = _encode(resized, image_format, quality, options, variant_set.max_bytes)
+                over_budget = variant_set.max_bytes and len(data) > variant_set.max_bytes
+                if over_budget and any(r[0] == name and r[3] == extension for r in rendered):
+                    # Too detailed to fit even at MIN_QUALITY; browsers get the smaller size instead
+                    continue
+                rendered.append((name, width, height, extension, used, data))
+    return source_width, source_height, rendered
+
+
+def _storage(kind):
+    model, image_field, _ = TARGETS[kind]
+    return model._meta.get_field(image_field).storage
+
+
+def manifest_name(source):
+    return posixpath.splitext(source)[0] + MANIFEST_SUFFIX
+
+
+def _store(kind, source, rendered):
+    """Save rendered variants and their manifest next to ``source``; returns the manifest"""
+    storage = _storage(kind)
+    width, height, variants = rendered
+    root = posixpath.splitext(source)[0]
+    manifest = {'source': source, 'width': width, 'height': height, 'variants': {}}
+    for set_name, variant_width, variant_height, extension, quality, data in variants:
+        name = f'{root}.{set_name}-{variant_width}w.{extension}'
+        # Re-rendering replaces the old file instead of saving loft.card-400w_a1b2c3.webp
+        storage.delete(name)
+        name = storage.save(name, ContentFile(data))
+        manifest['variants'].setdefault(set_name, []).append({
+            'name': name, 'width': variant_width, 'height': variant_height,
+            'format': extension, 'quality': quality, 'bytes': len(data),
+        })
+    name = manifest_name(source)
+    storage.delete(name)
+    storage.save(name, ContentFile(json.dumps(manifest, indent=2).encode()))
+    return manifest
+
+
+def _delete_variants(kind, manifest):
+    storage = _storage(kind)
+    for variants in manifest.get('variants', {}).values():
+        for variant in variants:
+            storage.delete(variant['name'])
+    if manifest.get('source'):
+        storage.delete(manifest_name(manifest['source']))
+
+
+def _apply(kind, pk, source, old_manifest, rendered):
+    """Store ``rendered`` and point the row at it if its image is still ``source``"""
+    model, image_field, variants_field = TARGETS[kind]
+    manifest = _store(kind, source, rendered)
+    updated = model.objects.filter(pk=pk, **{image_field: source}).update(**{variants_field: manifest})
+    if updated and old_manifest.get('source') not in (None, source):
+        # The variants of the image this one replaced
+        _delete_variants(kind, old_manifest)
+    return manifest if updated else None
+
+
+def _read(kind, source):
+    with _storage(kind).open(source, 'rb') as fp:
+        return fp.read()
+
+
+def render(tasks, executor=None):
+    """Render and store thumbnails for ``tasks``, [(kind, pk, source, old manifest)].
+
+    Rendering runs on ``executor`` (a ProcessPoolExecutor) when given,
+    otherwise inline. Yields ``(task, manifest or None, exception or None)``
+    in order; the manifest is None when the row's image changed meanwhile.
+    Cached listings are invalidated once at the end if any listing photo
+    changed.
+    """
+    submitted = []
+    for task in tasks:
+        kind, _, source, _ = task
+        try:
+            content = _read(kind, source)
+        except OSError as exc:
+            submitted.append((task, None, exc))
+            continue
+        if executor is None:
+            try:
+                submitted.append((task, render_variants(content, kind), None))
+            except Exception as exc:
+                submitted.append((task, None, exc))
+        else:
+            submitted.append((task, executor.submit(render_variants, content, kind), None))
+
+    listings_changed = False
+    try:
+        for task, pending, error in submitted:
+            if error is None and executor is not None:
+                try:
+                    pending = pending.result()
+                except Exception as exc:
+                    pending, error = None, exc
+            if error is not None:
+                yield task, None, error
+                continue
+            kind, pk, source, old_manifest = task
+            try:
+                manifest = _apply(kind, pk, source, old_manifest, pending)
+            except OSError as exc:
+                yield task, None, exc
+                continue
+            listings_changed = listings_changed or (manifest is not None and kind == 'property')
+            yield task, manifest, None
+    finally:
+        # Also when the caller stops early, so rows already updated aren't served stale
+        if listings_changed:
+            listing_cache.invalidate()
+
+
+def process_pool(workers=None):
+    return ProcessPoolExecutor(max_workers=workers or settings.THUMBNAIL_WORKERS)
+
+
+def needs_render(image_name, manifest):
+    return bool(image_name) and manifest.get('source') != image_name
+
+
+def enqueue(kind, pk):
+    """Queue a thumbnail render for one row unless one is already pending"""
+    with transaction.atomic():
+        job = ThumbnailJob.objects.filter(kind=kind, object_id=pk, status__in=ThumbnailJob.ACTIVE_STATUSES).first()
+        if job is None:
+            job = ThumbnailJob.objects.create(kind=kind, object_id=pk)
+    return job
+
+
+def enqueue_many(kind, pks):
+    """Queue renders for freshly created rows, which can't have a pending job yet"""
+    ThumbnailJob.objects.bulk_create([ThumbnailJob(kind=kind, object_id=pk) for pk in pks], batch_size=500)
+
+
+def clear(kind, pk, manifest):
+    """Drop the variants of a row whose image was removed"""
+    model, _, variants_field = TARGETS[kind]
+    _delete_variants(kind, manifest)
+    model.objects.filter(pk=pk).update(**{variants_field: {}})
+
+
+def claim_jobs(limit, visibility_timeout=jobs.DEFAULT_VISIBILITY_TIMEOUT):
+    return list(jobs.claim(ThumbnailJob, limit, visibility_timeout))
+
+
+def _current(kind, pks):
+    model, image_field, variants_field = TARGETS[kind]
+    return {
+        pk: (name, manifest or {})
+        for pk, name, manifest in model.objects.filter(pk__in=pks).values_list('pk', image_field, variants_field)
+    }
+
+
+def run_jobs(claimed, executor=None):
+    """Render the images of claimed jobs; yields (job, status)"""
+    tasks, done = [], []
+    for kind in TARGETS:
+        kind_jobs = [job for job in claimed if job.kind == kind]
+        current = _current(kind, [job.object_id for job in kind_jobs])
+        for job in kind_jobs:
+            name, manifest = current.get(job.object_id, ('', {}))
+            if needs_render(name, manifest):
+                tasks.append(((kind, job.object_id, name, manifest), job))
+            else:
+                # Deleted, image removed, or rendered by an earlier job
+                done.append(job)
+
+    for job in done:
+        ThumbnailJob.objects.filter(pk=job.pk, lock_token=job.lock_token, status='running').update(
+            status='succeeded', locked_until=None, last_error='',
+        )
+        yield job, 'succeeded'
+
+    results = render([task for task, _ in tasks], executor)
+    for (_, job), (_, _, error) in zip(tasks, results):
+        owned = ThumbnailJob.objects.filter(pk=job.pk, lock_token=job.lock_token, status='running')
+        if error is not None:
+            logger.error('Thumbnail job %s failed (attempt %s): %r', job.pk, job.attempts, error)
+            yield job, jobs.record_failure(job, owned, error)
+            continue
+        owned.update(status='succeeded', locked_until=None, last_error='')
+        yield job, 'succeeded'
+
+
+def _backfill_candidates(kind, force, batch_size):
+    """Lazily yield render() tasks for ``kind`` rows that need thumbnails, one pk-ordered page at a time"""
+    model, image_field, variants_field = TARGETS[kind]
+    rows = model.objects.exclude(**{image_field: ''}).exclude(**{f'{image_field}__isnull': True}).order_by('pk')
+    last_pk = None
+    while True:
+        # A fresh keyset query per page rather than one open cursor, since
+        # SQLite doesn't isolate a cursor from the updates made while it's read
+        page = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+        page = list(page.values_list('pk', image_field, variants_field)[:batch_size])
+        if not page:
+            return
+        last_pk = page[-1][0]
+        for pk, name, manifest in page:
+            if force or needs_render(name, manifest or {}):
+                yield kind, pk, name, manifest or {}
+
+
+def backfill(kind, force=False, batch_size=100, executor=None):
+    """Render thumbnails for every ``kind`` row with an image and no current variants; yields render() results"""
+    candidates = _backfill_candidates(kind, force, batch_size)
+    while chunk := list(islice(candidates, batch_size)):
+        yield from render(chunk, executor)
@@ -17,22 +17,40 @@ urlpatterns = [
     
     # Tools
     path('rent-estimator/', views.rent_estimator, name='rent_estimator'),
+    path('rent-estimator/batch/', views.rent_estimator_batch, name='rent_estimator_batch'),
     path('lease-generator/', views.lease_generate, name='lease_generate'),
+    path('leases/<int:pk>/download/', views.lease_download, name='lease_download'),
+    path('leases/renew/', views.lease_renew_all, name='lease_renew_all'),
     
     # Properties
     path('properties/', views.property_list, name='property_list'),
     path('properties/<int:pk>/', views.property_detail, name='property_detail'),
     path('properties/create/', views.property_create, name='property_create'),
+    path('properties/import/', views.property_import, name='property_import'),
     
     # Applications
     path('applications/<int:property_pk>/apply/', views.application_create, name='application_create'),
     path('applications/<int:pk>/', views.application_detail, name='application_detail'),
     path('applications/<int:pk>/review/', views.application_review, name='application_review'),
     path('application/<int:pk>/screening/', views.run_screening, name='run_screening'),
+    path('application/<int:pk>/screening/status/', views.screening_status, name='screening_status'),
     path('screening/<int:pk>/', views.view_screening_report, name='view_screening_report'),
+    path('screening/batches/<int:pk>/', views.screening_batch_detail, name='screening_batch_detail'),
+    path('screening/batches/<int:pk>/status/', views.screening_batch_status, name='screening_batch_status'),
+    
+    # Messages
+    path('inbox/', views.inbox, name='inbox'),
+    path('inbox/<int:pk>/', views.conversation_detail, name='conversation_detail'),
+    path('inbox/unread/', views.inbox_unread, name='inbox_unread'),
+    path('properties/<int:pk>/contact/', views.contact_landlord, name='contact_landlord'),
+    path('notifications/stream/', views.notification_stream, name='notification_stream'),
     
     # Stripe Payments
     path('payment/screening/<int:pk>/', views.create_checkout_session, name='create_checkout_session'),
+    path('payment/screening/property/<int:pk>/', views.create_batch_checkout_session, name='create_batch_checkout_session'),
     path('payment/success/', views.payment_success, name='payment_success'),
     path('webhook/stripe/', views.stripe_webhook, name='stripe_webhook'),
+    
+    # Operations
+    path('ops/cache-stats/', views.cache_stats, name='cache_stats'),
 ]
@@ -0,0 +1,267 @@
+"""Latency and query counts for every page, measured against the data that's loaded.
+
+Meant to run against a database filled by ``manage.py seed_scale``.
+``view_cases()`` picks real rows to request (an application that has a
+screening report, its landlord and tenant, one of their conversations,
+...) and ``run()`` requests each page repeatedly through the test client,
+recording wall-clock time and queries per request. Every request runs in
+a transaction that is rolled back, so POSTs leave the data as it was and
+repeated runs stay comparable.
+
+Results are plain dicts, so ``manage.py benchmark_views --output`` can
+save them as JSON and ``compare()`` can diff two runs.
+"""
+import datetime
+import io
+import math
+import statistics
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from .models import (
+    ConversationMember, LeaseDocument, Message, Property, RentalApplication, ScreeningBatch, ScreeningReport, User,
+)
+from .query_budget import QueryRecorder
+
+# Routes that can't be benchmarked in-process, with the reason
+SKIPPED = {
+    'notification_stream': 'streams until the client disconnects',
+    'create_checkout_session': 'calls the Stripe API',
+    'create_batch_checkout_session': 'calls the Stripe API',
+    'stripe_webhook': 'needs a Stripe-signed event',
+}
+ADMIN_MODELS = ('user', 'property', 'rentalapplication', 'screeningreport', 'leasedocument', 'message')
+PERCENTILES = (50, 95, 99)
+
+
+class Case(NamedTuple):
+    label: str
+    user: object
+    method: str
+    url: str
+    # A dict, or a callable returning one for data that can't be reused (uploads)
+    data: object = None
+
+
+def _units_upload():
+    units = io.BytesIO(b'zip_code,bedrooms,bathrooms\n62701,2,1\n62701,3,2\n')
+    units.name = 'units.csv'
+    return {'units': units}
+
+
+def _listings_upload():
+    listings = io.BytesIO(
+        b'title,description,address,city,state,zip_code,bedrooms,bathrooms,square_feet,monthly_rent,'
+        b'security_deposit\nGarden Flat,Quiet street,3 Oak Ave,Springfield,IL,62701,2,1.5,850,1400,1400\n'
+    )
+    listings.name = 'listings.csv'
+    return {'properties': listings}
+
+
+def view_cases():
+    """([Case], {label: reason skipped}) for every route in core/urls.py and the main admin lists"""
+    skipped = dict(SKIPPED)
+    cases = [
+        Case('home', None, 'get', reverse('home')),
+        Case('register', None, 'get', reverse('register')),
+        Case('button_preview', None, 'get', reverse('button_preview')),
+        Case('login', None, 'get', reverse('login')),
+    ]
+
+    report = (
+        ScreeningReport.objects.select_related('application__property__landlord', 'application__tenant')
+        .order_by('pk').first()
+    )
+    application = report.application if report else (
+        RentalApplication.objects.select_related('property__landlord', 'tenant').order_by('pk').first()
+    )
+    if application is None:
+        for label in ('logout', 'rent_estimator', 'rent_estimator_batch', 'dashboard', 'lease_generate',
+                      'lease_renew_all', 'property_list', 'property_detail', 'property_create', 'property_import',
+                      'application_create', 'application_detail', 'application_review', 'run_screening',
+                      'screening_status', 'payment_success', 'contact_landlord'):
+            skipped[label] = 'no rental applications in the database'
+    else:
+        property_obj, landlord, tenant = application.property, application.property.landlord, application.tenant
+        cases += [
+            Case('logout', tenant, 'get', reverse('logout')),
+            Case('rent_estimator', tenant, 'post', reverse('rent_estimator'),
+                 {'zip_code': property_obj.zip_code, 'bedrooms': '2', 'bathrooms': '1'}),
+            Case('rent_estimator_batch', landlord, 'post', reverse('rent_estimator_batch'), _units_upload),
+            Case('dashboard (landlord)', landlord, 'get', reverse('dashboard')),
+            Case('dashboard (tenant)', tenant, 'get', reverse('dashboard')),
+            Case('lease_generate', landlord, 'get', reverse('lease_generate')),
+            Case('lease_renew_all', landlord, 'post', reverse('lease_renew_all'), {'rent_increase': '3'}),
+            Case('property_list', tenant, 'get', reverse('property_list')),
+            Case('property_list (search)', tenant, 'get', reverse('property_list'),
+                 {'search': 'loft', 'bedrooms': '2', 'max_price': '2500', 'sort': 'price_asc'}),
+            Case('property_list (near)', tenant, 'get', reverse('property_list'),
+                 {'near': property_obj.zip_code, 'radius': '25'}),
+            Case('property_detail', tenant, 'get', reverse('property_detail', args=[property_obj.pk])),
+            Case('property_create', landlord, 'get', reverse('property_create')),
+            Case('property_import', landlord, 'post', reverse('property_import'), _listings_upload),
+            Case('application_detail', landlord, 'get', reverse('application_detail', args=[application.pk])),
+            Case('application_review', landlord, 'post', reverse('application_review', args=[application.pk]),
+                 {'status': 'under_review'}),
+            Case('run_screening', landlord, 'post', reverse('run_screening', args=[application.pk])),
+            Case('screening_status', landlord, 'get', reverse('screening_status', args=[application.pk])),
+            Case('payment_success', landlord, 'get', reverse('payment_success'), {'session_id': 'cs_benchmark'}),
+            Case('contact_landlord', tenant, 'post', reverse('contact_landlord', args=[property_obj.pk]),
+                 {'body': 'Is it still available?'}),
+        ]
+        newcomer = (
+            User.objects.filter(role='tenant').exclude(applications__property=property_obj).order_by('pk').first()
+        )
+        if newcomer is None:
+            skipped['application_create'] = 'every tenant has applied to the sample listing'
+        else:
+            cases.append(Case('application_create', newcomer, 'get',
+                              reverse('application_create', args=[property_obj.pk])))
+
+    if report is None:
+        skipped['view_screening_report'] = 'no screening reports in the database'
+    else:
+        cases.append(Case('view_screening_report', report.application.property.landlord, 'get',
+                          reverse('view_screening_report', args=[report.pk])))
+
+    batch = ScreeningBatch.objects.select_related('requested_by').order_by('pk').first()
+    if batch is None:
+        for label in ('screening_batch_detail', 'screening_batch_status'):
+            skipped[label] = 'no screening batches in the database'
+    else:
+        cases += [
+            Case('screening_batch_detail', batch.requested_by, 'get',
+                 reverse('screening_batch_detail', args=[batch.pk])),
+            Case('screening_batch_status', batch.requested_by, 'get',
+                 reverse('screening_batch_status', args=[batch.pk])),
+        ]
+
+    lease = LeaseDocument.objects.exclude(document_file='').select_related('tenant').order_by('pk').first()
+    if lease is None:
+        skipped['lease_download'] = 'no rendered leases in the database'
+    else:
+        cases.append(Case('lease_download', lease.tenant, 'get', reverse('lease_download', args=[lease.pk])))
+
+    member = ConversationMember.objects.select_related('user').order_by('-conversation_id').first()
+    if member is None:
+        for label in ('inbox', 'inbox_unread', 'conversation_detail'):
+            skipped[label] = 'no conversations in the database'
+    else:
+        cases += [
+            Case('inbox', member.user, 'get', reverse('inbox')),
+            Case('inbox_unread', member.user, 'get', reverse('inbox_unread')),
+            Case('conversation_detail', member.user, 'get',
+                 reverse('conversation_detail', args=[member.conversation_id])),
+        ]
+
+    staff = User.objects.filter(is_staff=True, is_superuser=True).order_by('pk').first()
+    if staff is None:
+        skipped['cache_stats'] = skipped['admin'] = 'no superuser in the database'
+    else:
+        cases.append(Case('cache_stats', staff, 'get', reverse('cache_stats')))
+        cases += [Case(f'admin {model}', staff, 'get', reverse(f'admin:core_{model}_changelist'))
+                  for model in ADMIN_MODELS]
+    return cases, skipped
+
+
+def percentile(values, p):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+def _request(client, case):
+    data = case.data() if callable(case.data) else case.data
+    response = getattr(client, case.method)(case.url, data)
+    if response.streaming:
+        # Include the time to produce the body (lease PDFs are FileResponses)
+        b''.join(response.streaming_content)
+    response.close()
+    return response
+
+
+def measure(case, iterations, warmup=1, cold_cache=False):
+    """Request ``case`` ``warmup + iterations`` times; returns timing and query stats for the last ``iterations``"""
+    client = Client()
+    if case.user is not None:
+        client.force_login(case.user)
+    timings, queries, duplicates, db_seconds, statuses = [], [], [], [], set()
+    for i in range(warmup + iterations):
+        if cold_cache:
+            caches[settings.LISTING_CACHE_ALIAS].clear()
+        with transaction.atomic():
+            with QueryRecorder() as recorder:
+                started = time.perf_counter()
+                response = _request(client, case)
+                elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        if case.user is not None and '_auth_user_id' not in client.session:
+            # The page logged the user out
+            client.force_login(case.user)
+        if i < warmup:
+            continue
+        timings.append(elapsed)
+        queries.append(recorder.count)
+        duplicates.append(recorder.duplicates)
+        db_seconds.append(recorder.seconds)
+        statuses.add(response.status_code)
+
+    result = {'method': case.method.upper(), 'url': case.url, 'status': sorted(statuses)}
+    for p in PERCENTILES:
+        result[f'p{p}_ms'] = round(percentile(timings, p) * 1000, 2)
+    result.update({
+        'mean_ms': round(statistics.fmean(timings) * 1000, 2),
+        'db_ms': round(statistics.fmean(db_seconds) * 1000, 2),
+        'queries': statistics.median_low(queries),
+        'queries_max': max(queries),
+        'duplicates': max(duplicates),
+    })
+    return result
+
+
+def database_summary():
+    counts = {
+        model._meta.model_name: model.objects.count()
+        for model in (User, Property, RentalApplication, Message)
+    }
+    return {'vendor': connection.vendor, 'rows': counts}
+
+
+def run(iterations=20, warmup=1, cold_cache=False, only=None, progress=None):
+    """Benchmark every case in view_cases() (or just the labels in ``only``); returns a JSON-ready dict"""
+    cases, skipped = view_cases()
+    if only:
+        cases = [case for case in cases if case.label in only or case.label.split(' ')[0] in only]
+    results = {}
+    # The test client needs 'testserver' allowed; DEBUG would log every query
+    with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver'], QUERY_BUDGET_ENABLED=False):
+        for case in cases:
+            results[case.label] = measure(case, iterations, warmup=warmup, cold_cache=cold_cache)
+            if progress:
+                progress(case.label, results[case.label])
+    return {
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'iterations': iterations,
+        'warmup': warmup,
+        'cold_cache': cold_cache,
+        'database': database_summary(),
+        'views': results,
+        'skipped': skipped,
+    }
+
+
+def compare(previous, current, metric='p95_ms'):
+    """[(label, before, after, relative change or None)] for ``metric`` of the views in both runs"""
+    rows = []
+    for label, result in current['views'].items():
+        if label not in previous.get('views', {}):
+            continue
+        before, after = previous['views'][label][metric], result[metric]
+        rows.append((label, before, after, (after - before) / before if before else None))
+    return rows
@@ -0,0 +1,112 @@
+"""Buffered property view counting.
+
+``property_detail`` used to ``save()`` the whole row on every hit, which
+bumped ``updated_at``, lost increments between concurrent read-modify-write
+cycles and serialized every viewer of a hot listing on one SQLite row lock.
+Views are now counted in a per-process buffer and written out in batches:
+
+* increments for the same property are merged in memory;
+* a flush issues one ``UPDATE ... SET views = views + n`` per distinct ``n``,
+  covering every property with that delta, and adds the same counts to
+  today's activity rollups (core/rollups.py), inside a single transaction;
+* a flush happens on the first view after ``VIEW_COUNTER_FLUSH_INTERVAL``
+  seconds, as soon as ``VIEW_COUNTER_MAX_PENDING`` views are buffered, and at
+  interpreter shutdown.
+
+Loss bound: a process that dies without running its exit hooks (SIGKILL,
+OOM, power loss) loses at most ``VIEW_COUNTER_MAX_PENDING - 1`` views,
+because reaching that many forces a flush. A failed flush puts the counts
+back in the buffer rather than dropping them. Views of listings deleted
+before the flush are dropped.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from . import rollups
+from .models import Property
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    def __init__(self, flush_interval=None, max_pending=None):
+        self.flush_interval = (
+            settings.VIEW_COUNTER_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        )
+        self.max_pending = settings.VIEW_COUNTER_MAX_PENDING if max_pending is None else max_pending
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._pending_total = 0
+        self._last_flush = time.monotonic()
+
+    def record(self, property_pk, count=1):
+        with self._lock:
+            self._pending[property_pk] += count
+            self._pending_total += count
+            due = (
+                self._pending_total >= self.max_pending
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            try:
+                self.flush()
+            except Exception:
+                # The counts are back in the buffer; the next flush retries them
+                logger.exception('Could not flush %d buffered property views', self.pending())
+
+    def pending(self, property_pk=None):
+        with self._lock:
+            if property_pk is None:
+                return self._pending_total
+            return self._pending[property_pk]
+
+    def flush(self):
+        """Write buffered counts to the database; returns the number of views written"""
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+            self._pending_total = 0
+            self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+
+        try:
+            with transaction.atomic():
+                # Listings deleted since they were viewed would fail the rollups' foreign key
+                existing = set(
+                    Property.objects.select_for_update().filter(pk__in=batch).values_list('pk', flat=True)
+                )
+                counts = {pk: delta for pk, delta in batch.items() if pk in existing}
+                by_delta = defaultdict(list)
+                for pk, delta in counts.items():
+                    by_delta[delta].append(pk)
+                for delta, pks in by_delta.items():
+                    Property.objects.filter(pk__in=pks).update(views=F('views') + delta)
+                rollups.record_views(counts)
+        except Exception:
+            with self._lock:
+                self._pending.update(batch)
+                self._pending_total += sum(batch.values())
+            raise
+        return sum(counts.values())
+
+
+view_counter = ViewCounter()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        view_counter.flush()
+    except Exception:
+        logger.exception('Could not flush %d buffered property views at exit', view_counter.pending())
+
+
+def record_view(property_id):
+    view_counter.record(property_id)
@@ -1,24 +1,58 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
 from django.utils import timezone
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+import datetime
+import io
+import math
 import stripe
-from .models import User, Property, RentalApplication, ScreeningReport, LeaseDocument, Message, Transaction
+from decimal import Decimal
+from urllib.parse import urlencode
+from . import listing_cache, screening_cache
+from .models import (
+    User, Conversation, Property, RentalApplication, ScreeningReport, ScreeningBatch, LeaseDocument,
+    Transaction, normalize_zip,
+)
 from .forms import UserRegistrationForm, PropertyForm, RentalApplicationForm
+from .geo import filter_near, zip_centroid
+from .inbox import inbox_page, mark_read, send_message, start_conversation, thread_page
+from .jobs import enqueue_screening, latest_job
+from .leases import TERM_FIELDS as LEASE_TERM_FIELDS, enqueue_render, renew_portfolio
+from .notifications import event_stream, streaming_supported
+from .pagination import keyset_paginate
+from .property_import import import_properties, read_records, report_csv
+from .rent_estimator import AMENITY_PREMIUMS, estimate_csv, estimate_rent, parse_unit
+from .rollups import daily_series
+from .search import search_properties
+from .stats import landlord_dashboard_stats
+from .stripe_events import record_event
+from .view_counter import record_view
 
 
 def home(request):
     """Landing page"""
-    properties = Property.objects.filter(status='available')[:6]
-    context = {
-        'properties': properties,
-    }
-    return render(request, 'home.html', context)
+    featured_listings = listing_cache.render_cached(
+        'home', {}, 'properties/featured_listings.html',
+        lambda: {'properties': Property.objects.filter(status='available')[:6]},
+    )
+    return render(request, 'home.html', {'featured_listings': featured_listings})
+
+
+@staff_member_required
+def cache_stats(request):
+    """Per-process cache counters, for monitoring"""
+    return JsonResponse({
+        'listings': listing_cache.cache_stats(),
+        'screening': screening_cache.cache_stats(),
+    })
 
 
 def register(request):
@@ -48,42 +82,105 @@ def rent_estimator(request):
     """Market Rent Estimator View"""
     result = None
     if request.method == "POST":
-        # Get data
-        zip_code = request.POST.get('zip_code')
-        beds = int(request.POST.get('bedrooms', 1))
-        baths = float(request.POST.get('bathrooms', 1))
-        has_parking = request.POST.get('has_parking') == 'true'
-        has_pool = request.POST.get('has_pool') == 'true'
-        has_gym = request.POST.get('has_gym') == 'true'
-
-        # MVP Algorithm
-        base_rent = 1000  # Base for studio
-        
-        # Adjust for Beds/Baths
-        base_rent += (beds * 400)
-        base_rent += (baths * 200)
-
-        # Adjust for Amenities
-        if has_parking: base_rent += 150
-        if has_pool: base_rent += 100
-        if has_gym: base_rent += 100
-
-        # Location Multiplier (Simulated)
-        if zip_code and zip_code.startswith('9'): # West Coast Premium
-            base_rent *= 1.2
-        elif zip_code and zip_code.startswith('1'): # East Coast Premium
-            base_rent *= 1.15
-
-        optimal = int(base_rent)
+        # Same parsing and validation as a row of the batch CSV
+        try:
+            zip_code, beds, baths, square_feet, _ = parse_unit({'bedrooms': '1', 'bathrooms': '1', **request.POST.dict()})
+        except ValueError as e:
+            messages.error(request, str(e))
+            return render(request, 'rent_estimator.html', {'result': None})
+        amenities = [name for name in AMENITY_PREMIUMS if request.POST.get(name) == 'true']
+
+        # Regression over comparable listings plus a zip/bedroom offset
+        estimate = estimate_rent(
+            zip_code, beds, baths,
+            square_feet=None if math.isnan(square_feet) else square_feet,
+            amenities=amenities,
+        )
         result = {
-            'optimal_price': f"{optimal:,}",
-            'low_range': f"{int(optimal * 0.9):,}",
-            'high_range': f"{int(optimal * 1.1):,}",
+            'optimal_price': f"{estimate.rent:,}",
+            'low_range': f"{estimate.low:,}",
+            'high_range': f"{estimate.high:,}",
+            'comparables': estimate.comparables,
         }
 
     return render(request, 'rent_estimator.html', {'result': result})
 
 
+@login_required
+def rent_estimator_batch(request):
+    """Estimate rents for an uploaded CSV of units, streamed back as CSV"""
+    if request.user.role != 'landlord':
+        messages.error(request, "Only Landlords can price units in bulk.")
+        return redirect('rent_estimator')
+
+    upload = request.FILES.get('units')
+    if request.method != 'POST' or upload is None:
+        messages.error(request, "Please upload a CSV of units.")
+        return redirect('rent_estimator')
+
+    units = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    response = StreamingHttpResponse(estimate_csv(units), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="rent-estimates.csv"'
+    return response
+
+
+@login_required
+def inbox(request):
+    """Conversations, most recently active first"""
+    page = inbox_page(request.user, cursor=request.GET.get('cursor'))
+    context = {
+        'memberships': page.items,
+        'next_cursor': page.next_cursor,
+        'is_first_page': 'cursor' not in request.GET,
+    }
+    return render(request, 'messages/inbox.html', context)
+
+
+@login_required
+def conversation_detail(request, pk):
+    """A conversation thread; POST sends a reply"""
+    conversation = get_object_or_404(
+        Conversation.objects.select_related('property'), pk=pk, members__user=request.user,
+    )
+
+    if request.method == 'POST':
+        body = request.POST.get('body', '').strip()
+        if body:
+            send_message(conversation, request.user, body)
+        return redirect('conversation_detail', pk=pk)
+
+    mark_read(conversation, request.user)
+    page = thread_page(conversation, cursor=request.GET.get('cursor'))
+    context = {
+        'conversation': conversation,
+        # Fetched newest first; shown oldest first like a chat
+        'thread': list(reversed(page.items)),
+        'older_cursor': page.next_cursor,
+    }
+    return render(request, 'messages/conversation.html', context)
+
+
+@login_required
+def inbox_unread(request):
+    """The unread message count, polled by pages when there is no notification stream"""
+    return JsonResponse({'unread': request.user.unread_messages})
+
+
+async def notification_stream(request):
+    """Server-Sent Events feed of the user's new messages and applications"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    if not streaming_supported(request):
+        # A WSGI server would buffer the endless stream and hold a thread for it
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(event_stream(user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx and similar proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def lease_generate(request):
     """Generate Lease Agreement View"""
@@ -91,6 +188,9 @@ def lease_generate(request):
         messages.error(request, "Only Landlords can generate leases.")
         return redirect('dashboard')
 
+    properties = request.user.properties.all()
+    tenants = User.objects.filter(applications__property__landlord=request.user).distinct()
+
     if request.method == 'POST':
         # Collect data from form
         data = {
@@ -107,9 +207,66 @@ def lease_generate(request):
             'utilities': request.POST.getlist('utilities'),
             'special_conditions': request.POST.get('special_conditions'),
         }
-        return render(request, 'leases/lease_preview.html', {'data': data})
 
-    return render(request, 'leases/lease_form.html')
+        # Linked to a property and applicant: save it and render the PDF in the background
+        lease = None
+        if request.POST.get('property') and request.POST.get('tenant'):
+            property_obj = get_object_or_404(properties, pk=request.POST['property'])
+            tenant = get_object_or_404(tenants, pk=request.POST['tenant'])
+            try:
+                lease = LeaseDocument.objects.create(
+                    property=property_obj,
+                    tenant=tenant,
+                    lease_start_date=datetime.date.fromisoformat(data['start_date']),
+                    lease_end_date=datetime.date.fromisoformat(data['end_date']),
+                    monthly_rent=Decimal(data['rent_amount']),
+                    security_deposit=Decimal(data['deposit_amount']),
+                    special_terms=data['special_conditions'] or '',
+                    terms={field: data[field] for field in LEASE_TERM_FIELDS},
+                )
+            except (TypeError, ValueError, ArithmeticError):
+                messages.error(request, "Please check the lease dates and amounts.")
+                return render(request, 'leases/lease_form.html', {'properties': properties, 'tenants': tenants})
+            enqueue_render(lease)
+        return render(request, 'leases/lease_preview.html', {'data': data, 'lease': lease})
+
+    return render(request, 'leases/lease_form.html', {'properties': properties, 'tenants': tenants})
+
+
+@login_required
+def lease_download(request, pk):
+    """Download a lease's rendered PDF"""
+    lease = get_object_or_404(LeaseDocument.objects.select_related('property'), pk=pk)
+    if request.user.pk not in (lease.tenant_id, lease.property.landlord_id):
+        messages.error(request, "Access denied.")
+        return redirect('dashboard')
+
+    if not lease.document_file:
+        messages.info(request, "The lease PDF is still being prepared. Please check back in a moment.")
+        return redirect('dashboard')
+
+    return FileResponse(
+        lease.document_file.open('rb'), as_attachment=True, filename=f'lease-{lease.pk}.pdf',
+        content_type='application/pdf',
+    )
+
+
+@login_required
+def lease_renew_all(request):
+    """Draft renewals for every executed lease in the landlord's portfolio"""
+    if request.user.role != 'landlord' or request.method != 'POST':
+        return redirect('dashboard')
+
+    try:
+        increase = Decimal(request.POST.get('rent_increase') or 0)
+    except ArithmeticError:
+        increase = Decimal(0)
+    renewals = renew_portfolio(request.user, rent_increase_percent=increase)
+    if renewals:
+        messages.success(request, f"Drafted {len(renewals)} lease renewal(s). The PDFs will be ready shortly.")
+    else:
+        messages.info(request, "There are no executed leases left to renew.")
+    return redirect('dashboard')
 
 
 def login_view(request):
@@ -147,111 +304,222 @@ def dashboard(request):
     
     if user.role == 'landlord':
         # Landlord Dashboard
-        properties = Property.objects.filter(landlord=user)
-        applications = RentalApplication.objects.filter(property__landlord=user).select_related('property', 'tenant')
-        recent_messages = Message.objects.filter(recipient=user)[:5]
-        
-        # Analytics
-        total_views = sum(p.views for p in properties)
-        
-        # Trust Score Distribution
-        apps = applications.select_related('tenant')
-        gold = sum(1 for a in apps if a.tenant.trust_badge == 'gold')
-        silver = sum(1 for a in apps if a.tenant.trust_badge == 'silver')
-        bronze = sum(1 for a in apps if a.tenant.trust_badge == 'bronze')
-        unranked = sum(1 for a in apps if a.tenant.trust_badge == 'unranked')
+        stats = landlord_dashboard_stats(user)
+        recent_applications = (
+            RentalApplication.objects.filter(property__landlord=user)
+            .select_related('property', 'tenant')[:10]
+        )
+        recent_conversations = inbox_page(user, page_size=5).items
+        activity = daily_series(user, days=7)
 
         context = {
-            'properties': properties,
-            'applications': applications,
-            'recent_messages': recent_messages,
-            'total_properties': properties.count(),
-            'pending_applications': applications.filter(status='pending').count(),
-            'total_views': total_views,
-            'applications_gold': gold,
-            'applications_silver': silver,
-            'applications_bronze': bronze,
-            'applications_unranked': unranked,
+            'properties': stats['properties'],
+            'applications': recent_applications,
+            'recent_conversations': recent_conversations,
+            'total_properties': stats['total_properties'],
+            'total_applications': stats['total_applications'],
+            'pending_applications': stats['status_counts']['pending'],
+            'total_views': stats['total_views'],
+            'applications_gold': stats['badge_counts']['gold'],
+            'applications_silver': stats['badge_counts']['silver'],
+            'applications_bronze': stats['badge_counts']['bronze'],
+            'applications_unranked': stats['badge_counts']['unranked'],
+            'activity_labels': [day.strftime('%a') for day, _, _ in activity],
+            'activity_views': [views for _, views, _ in activity],
+            'activity_applications': [applications for _, _, applications in activity],
         }
         return render(request, 'dashboard/landlord_dashboard.html', context)
     else:
         # Tenant Dashboard
         applications = RentalApplication.objects.filter(tenant=user).select_related('property')
         leases = LeaseDocument.objects.filter(tenant=user).select_related('property')
-        recent_messages = Message.objects.filter(recipient=user)[:5]
+        recent_conversations = inbox_page(user, page_size=5).items
         
         context = {
             'applications': applications,
             'leases': leases,
-            'recent_messages': recent_messages,
-            'trust_score': user.calculate_trust_score(),
+            'recent_conversations': recent_conversations,
+            'trust_score': user.trust_score,
             'trust_badge': user.trust_badge,
         }
         return render(request, 'dashboard/tenant_dashboard.html', context)
 
 
+# Listing sort modes: label and keyset ordering (always ending in a unique column).
+PROPERTY_SORTS = {
+    'newest': ('Newest', ('-created_at', '-id')),
+    'price_asc': ('Price: Low to High', ('monthly_rent', 'id')),
+    'price_desc': ('Price: High to Low', ('-monthly_rent', '-id')),
+    'bedrooms': ('Most Bedrooms', ('-bedrooms', '-id')),
+    'sqft': ('Largest', ('-square_feet', '-id')),
+}
+PROPERTY_PAGE_SIZE = 24
+PROPERTY_RADIUS_CHOICES = [5, 10, 25, 50, 100]
+
+
 @login_required
 def property_list(request):
     """List all available properties"""
+    # Search and filter
+    search_query = request.GET.get('search', '').strip()
+    city = request.GET.get('city', '').strip()
+    min_price = request.GET.get('min_price', '').strip()
+    max_price = request.GET.get('max_price', '').strip()
+    bedrooms = request.GET.get('bedrooms', '').strip()
+    sort = request.GET.get('sort', '')
+    near_input = request.GET.get('near', '').strip()
+    near = normalize_zip(near_input)
+    radius = request.GET.get('radius', '')
+    radius = int(radius) if radius.isascii() and radius.isdigit() else PROPERTY_RADIUS_CHOICES[1]
+    radius = min(radius, PROPERTY_RADIUS_CHOICES[-1])
+    
+    if near and zip_centroid(near) is None:
+        messages.warning(request, f"We couldn't locate zip code {near_input}; showing all areas.")
+        near = ''
+    
+    if sort not in PROPERTY_SORTS:
+        sort = 'relevance' if search_query else 'newest'
+    
+    # Everything the results depend on, normalized so equivalent searches
+    # share a cache entry
+    params = {
+        'search': search_query,
+        'city': city,
+        'min_price': min_price,
+        'max_price': max_price,
+        'bedrooms': bedrooms,
+        'sort': sort,
+        'near': near,
+        'radius': radius if near else '',
+        'cursor': request.GET.get('cursor', ''),
+    }
+    listing_results = listing_cache.render_cached(
+        'property_list', params, 'properties/listing_results.html', lambda: _listing_results(params),
+    )
+    
+    context = {
+        'listing_results': listing_results,
+        'search_query': search_query,
+        'city': city,
+        'min_price': min_price,
+        'near': near_input,
+        'radius': radius,
+        'radius_choices': PROPERTY_RADIUS_CHOICES,
+        'sort': sort,
+        'sort_options': [(key, label) for key, (label, _) in PROPERTY_SORTS.items()],
+    }
+    return render(request, 'properties/property_list.html', context)
+
+
+def _listing_results(params):
+    """Context for one page of property_list results"""
     properties = Property.objects.filter(status='available').select_related('landlord')
     
-    # Search and filter
-    search_query = request.GET.get('search', '')
-    city = request.GET.get('city', '')
-    min_price = request.GET.get('min_price', '')
-    max_price = request.GET.get('max_price', '')
-    bedrooms = request.GET.get('bedrooms', '')
-    
-    if search_query:
-        properties = properties.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(address__icontains=search_query)
-        )
+    if params['search']:
+        properties = search_properties(properties, params['search'])
     
-    if city:
-        properties = properties.filter(city__icontains=city)
+    if params['city']:
+        properties = properties.filter(city__icontains=params['city'])
     
-    if min_price:
-        properties = properties.filter(monthly_rent__gte=min_price)
+    if params['min_price']:
+        properties = properties.filter(monthly_rent__gte=params['min_price'])
     
-    if max_price:
-        properties = properties.filter(monthly_rent__lte=max_price)
+    if params['max_price']:
+        properties = properties.filter(monthly_rent__lte=params['max_price'])
     
-    if bedrooms:
-        properties = properties.filter(bedrooms=bedrooms)
+    if params['bedrooms']:
+        properties = properties.filter(bedrooms=params['bedrooms'])
     
-    context = {
-        'properties': properties,
-        'search_query': search_query,
+    distances = None
+    if params['near']:
+        properties, distances = filter_near(properties, params['near'], params['radius'])
+    
+    sort = params['sort']
+    ordering = ('search_rank', 'id') if sort == 'relevance' else PROPERTY_SORTS[sort][1]
+    page = keyset_paginate(
+        properties, ordering, key=sort,
+        cursor=params['cursor'] or None, page_size=PROPERTY_PAGE_SIZE,
+    )
+    
+    if distances is not None:
+        for property_obj in page.items:
+            property_obj.distance = distances.get(property_obj.pk)
+    
+    query = {key: value for key, value in params.items() if value not in ('', None) and key != 'cursor'}
+    next_query = None
+    if page.has_next:
+        next_query = urlencode({**query, 'cursor': page.next_cursor})
+    first_query = urlencode(query) if params['cursor'] else None
+    
+    return {
+        'properties': page.items,
+        'next_query': next_query,
+        'first_query': first_query,
     }
-    return render(request, 'properties/property_list.html', context)
 
 
 @login_required
 def property_detail(request, pk):
     """Property detail page"""
-    property_obj = get_object_or_404(Property, pk=pk)
+    listing = listing_cache.get_or_compute('property_detail', {'pk': pk}, lambda: _property_summary(pk))
+    # The landlord is read per request: their name and email can change
+    # without touching the listing, and the cache shouldn't hold user rows.
+    property_obj = {
+        **listing['property'],
+        'landlord': User.objects.only('username', 'first_name', 'last_name', 'email').get(
+            pk=listing['property']['landlord_id'],
+        ),
+    }
     
-    # Increment views
-    property_obj.views += 1
-    property_obj.save()
+    # Buffered; flushed to the views column in batches
+    record_view(pk)
     
     # Check if user already applied
     has_applied = False
     if request.user.role == 'tenant':
         has_applied = RentalApplication.objects.filter(
-            property=property_obj,
+            property_id=pk,
             tenant=request.user
         ).exists()
     
     context = {
         'property': property_obj,
+        'property_summary': mark_safe(listing['html']),
         'has_applied': has_applied,
     }
     return render(request, 'properties/property_detail.html', context)
 
 
+def _property_summary(pk):
+    """The rendered summary plus the few listing fields property_detail needs, as cached for it"""
+    property_obj = get_object_or_404(Property, pk=pk)
+    html = render_to_string('properties/property_summary.html', {'property': property_obj})
+    fields = {
+        'pk': property_obj.pk,
+        'title': property_obj.title,
+        'status': property_obj.status,
+        'get_status_display': property_obj.get_status_display(),
+        'landlord_id': property_obj.landlord_id,
+    }
+    return {'property': fields, 'html': html}
+
+
+@login_required
+def contact_landlord(request, pk):
+    """Start (or continue) a conversation with a property's landlord"""
+    property_obj = get_object_or_404(Property.objects.select_related('landlord'), pk=pk)
+    body = request.POST.get('body', '').strip()
+    if request.method != 'POST' or not body or request.user == property_obj.landlord:
+        return redirect('property_detail', pk=pk)
+
+    conversation = start_conversation(
+        request.user, property_obj.landlord, subject=property_obj.title, property_obj=property_obj,
+    )
+    send_message(conversation, request.user, body)
+    messages.success(request, 'Message sent!')
+    return redirect('conversation_detail', pk=conversation.pk)
+
+
 @login_required
 def property_create(request):
     """Create new property (Landlord only)"""
@@ -273,6 +541,25 @@ def property_create(request):
     return render(request, 'properties/property_form.html', {'form': form})
 
 
+@login_required
+def property_import(request):
+    """Create listings from an uploaded CSV or JSON Lines file, streaming back a per-row report"""
+    if request.user.role != 'landlord':
+        messages.error(request, 'Only landlords can create property listings.')
+        return redirect('dashboard')
+
+    upload = request.FILES.get('properties')
+    if request.method != 'POST' or upload is None:
+        messages.error(request, 'Please upload a CSV or JSON Lines file of properties.')
+        return redirect('property_create')
+
+    file_format = 'jsonl' if upload.name.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+    records = read_records(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''), file_format)
+    response = StreamingHttpResponse(report_csv(import_properties(records, request.user)), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="property-import.csv"'
+    return response
+
+
 @login_required
 def application_create(request, property_pk):
     """Create rental application (Tenant only)"""
@@ -309,10 +596,12 @@ def application_create(request, property_pk):
 @login_required
 def application_detail(request, pk):
     """View application details"""
-    application = get_object_or_404(RentalApplication, pk=pk)
+    application = get_object_or_404(
+        RentalApplication.objects.select_related('property', 'tenant'), pk=pk,
+    )
     
     # Check permissions
-    if request.user != application.tenant and request.user != application.property.landlord:
+    if request.user.pk not in (application.tenant_id, application.property.landlord_id):
         messages.error(request, 'You do not have permission to view this application.')
         return redirect('dashboard')
     
@@ -326,6 +615,7 @@ def application_detail(request, pk):
     context = {
         'application': application,
         'screening': screening,
+        'screening_job': latest_job(application) if screening is None else None,
     }
     return render(request, 'applications/application_detail.html', context)
 
@@ -333,9 +623,9 @@ def application_detail(request, pk):
 @login_required
 def application_review(request, pk):
     """Review and update application status (Landlord only)"""
-    application = get_object_or_404(RentalApplication, pk=pk)
+    application = get_object_or_404(RentalApplication.objects.select_related('property'), pk=pk)
     
-    if request.user != application.property.landlord:
+    if request.user.pk != application.property.landlord_id:
         messages.error(request, 'You do not have permission to review this application.')
         return redirect('dashboard')
     
@@ -355,9 +645,9 @@ def application_review(request, pk):
 @login_required
 def run_screening(request, pk):
     """Mock Screening Process (Payment + API Call)"""
-    application = get_object_or_404(RentalApplication, pk=pk)
+    application = get_object_or_404(RentalApplication.objects.select_related('property'), pk=pk)
     
-    if request.user != application.property.landlord:
+    if request.user.pk != application.property.landlord_id:
         messages.error(request, 'Unauthorized.')
         return redirect('dashboard')
         
@@ -366,53 +656,57 @@ def run_screening(request, pk):
         # In real app: stripe.Charge.create(...)
         pass 
 
-        # 2. Simulate API Call (TransUnion/Checkr)
-        import random
-        # Deterministic mock 
-        score_val = random.randint(700, 820)
-        if score_val >= 750: score_range = 'excellent'
-        elif score_val >= 700: score_range = 'good'
-        elif score_val >= 650: score_range = 'fair'
-        else: score_range = 'poor'
-
-        # Create Report
-        ScreeningReport.objects.create(
-            application=application,
-            credit_score_range=score_range,
-            criminal_record_clear=True, 
-            eviction_history_clear=True,
-            employment_verified=True,
-            income_verified=True,
-            recommendation="Accept" if score_val > 650 else "Conditional",
-            risk_level='low' if score_val > 700 else 'medium'
-        )
+        # 2. Queue the provider call; run_screening_worker generates the report
+        enqueue_screening(application)
         
-        messages.success(request, 'Screening Report Generated Successfully! ($30 charged)')
+        messages.success(request, 'Screening started! The report will appear here shortly. ($30 charged)')
         return redirect('application_detail', pk=pk)
     
     return redirect('dashboard')
 
 
+@login_required
+def screening_status(request, pk):
+    """Polled by application_detail while a screening job is running"""
+    application = get_object_or_404(RentalApplication.objects.select_related('property'), pk=pk)
+    
+    if request.user.pk != application.property.landlord_id:
+        return JsonResponse({'error': 'Unauthorized.'}, status=403)
+    
+    job = latest_job(application)
+    report = ScreeningReport.objects.filter(application=application).only('pk').first()
+    return JsonResponse({
+        'status': job.status if job else None,
+        'attempts': job.attempts if job else 0,
+        'report_url': reverse('view_screening_report', args=[report.pk]) if report else None,
+    })
+
+
 @login_required
 def view_screening_report(request, pk):
     """View detailed screening report"""
-    screening = get_object_or_404(ScreeningReport, pk=pk)
+    screening = get_object_or_404(
+        ScreeningReport.objects.select_related('application__property', 'application__tenant'), pk=pk,
+    )
     
     # Permissions
-    if request.user != screening.application.property.landlord:
+    if request.user.pk != screening.application.property.landlord_id:
         messages.error(request, 'Unauthorized.')
         return redirect('dashboard')
         
     return render(request, 'applications/screening_report.html', {'screening': screening})
 
 
+SCREENING_PRICE_CENTS = 4500
+
+
 @login_required
 def create_checkout_session(request, pk):
     """Start Stripe Checkout for Screening Report"""
-    application = get_object_or_404(RentalApplication, pk=pk)
+    application = get_object_or_404(RentalApplication.objects.select_related('property', 'tenant'), pk=pk)
     
     # Permissions
-    if request.user != application.property.landlord:
+    if request.user.pk != application.property.landlord_id:
         messages.error(request, 'Unauthorized.')
         return redirect('dashboard')
     
@@ -428,7 +722,7 @@ def create_checkout_session(request, pk):
                         'name': f'Screening Report - {application.tenant.get_full_name()}',
                         'description': f'Verified Credit, Criminal, and Eviction check for {application.property.title}',
                     },
-                    'unit_amount': 4500, # $45.00
+                    'unit_amount': SCREENING_PRICE_CENTS, # $45.00
                 },
                 'quantity': 1,
             }],
@@ -457,6 +751,105 @@ def create_checkout_session(request, pk):
         messages.error(request, f"Error starting payment: {str(e)}")
         return redirect('application_detail', pk=application.pk)
 
+@login_required
+def create_batch_checkout_session(request, pk):
+    """Start one Stripe Checkout covering screening for many applicants of a property"""
+    property_obj = get_object_or_404(Property, pk=pk)
+    
+    if request.user.pk != property_obj.landlord_id:
+        messages.error(request, 'Unauthorized.')
+        return redirect('dashboard')
+    
+    if request.method != 'POST':
+        return redirect('dashboard')
+    
+    applications = property_obj.applications.filter(screening__isnull=True)
+    selected = request.POST.getlist('application_ids')
+    if selected:
+        # Anything but an id selects nothing rather than failing the request
+        applications = applications.filter(pk__in=[value for value in selected if value.isascii() and value.isdigit()])
+    application_ids = list(applications.values_list('pk', flat=True))
+    if not application_ids:
+        messages.info(request, 'Every applicant for this property has already been screened.')
+        return redirect('dashboard')
+    
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    
+    batch = ScreeningBatch.objects.create(
+        property=property_obj, requested_by=request.user, total=len(application_ids)
+    )
+    batch.applications.set(application_ids)
+    
+    try:
+        checkout_session = stripe.checkout.Session.create(
+            payment_method_types=['card'],
+            line_items=[{
+                'price_data': {
+                    'currency': 'usd',
+                    'product_data': {
+                        'name': f'Screening Reports - {property_obj.title}',
+                        'description': f'Verified Credit, Criminal, and Eviction checks for {len(application_ids)} applicants',
+                    },
+                    'unit_amount': SCREENING_PRICE_CENTS,
+                },
+                'quantity': len(application_ids),
+            }],
+            mode='payment',
+            success_url=request.build_absolute_uri(reverse('screening_batch_detail', args=[batch.pk])),
+            cancel_url=request.build_absolute_uri(reverse('dashboard')),
+            metadata={
+                'screening_batch_id': batch.id,
+                'purpose': 'screening',
+                'user_id': request.user.id
+            }
+        )
+        
+        # One pending transaction covers the whole batch
+        Transaction.objects.create(
+            user=request.user,
+            amount=Decimal(SCREENING_PRICE_CENTS * len(application_ids)) / 100,
+            purpose='screening',
+            status='pending',
+            stripe_session_id=checkout_session.id,
+            screening_batch=batch
+        )
+        
+        return redirect(checkout_session.url, code=303)
+    except Exception as e:
+        batch.delete()
+        messages.error(request, f"Error starting payment: {str(e)}")
+        return redirect('dashboard')
+
+
+@login_required
+def screening_batch_detail(request, pk):
+    """Progress page for a batch screening"""
+    batch = get_object_or_404(ScreeningBatch.objects.select_related('property'), pk=pk)
+    
+    if request.user.pk != batch.requested_by_id:
+        messages.error(request, 'Unauthorized.')
+        return redirect('dashboard')
+    
+    applications = batch.applications.select_related('tenant', 'screening')
+    return render(request, 'applications/screening_batch.html', {'batch': batch, 'applications': applications})
+
+
+@login_required
+def screening_batch_status(request, pk):
+    """Polled by the batch progress page"""
+    batch = get_object_or_404(ScreeningBatch, pk=pk)
+    
+    if request.user.pk != batch.requested_by_id:
+        return JsonResponse({'error': 'Unauthorized.'}, status=403)
+    
+    return JsonResponse({
+        'status': batch.status,
+        'total': batch.total,
+        'completed': batch.completed,
+        'failed': batch.failed,
+    })
+
+
 @login_required
 def payment_success(request):
     session_id = request.GET.get('session_id')
@@ -464,45 +857,18 @@ def payment_success(request):
 
 @csrf_exempt
 def stripe_webhook(request):
+    """Verify and store the event, then ack; process_stripe_events does the work"""
     payload = request.body
     sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
     endpoint_secret = settings.STRIPE_WEBHOOK_SECRET
 
     try:
-        event = stripe.Webhook.construct_event(
+        stripe.Webhook.construct_event(
             payload, sig_header, endpoint_secret
         )
     except Exception as e:
         return HttpResponse(status=400)
 
-    # Handle the checkout.session.completed event
-    if event['type'] == 'checkout.session.completed':
-        session = event['data']['object']
-        
-        # Update transaction
-        transaction = Transaction.objects.get(stripe_session_id=session.id)
-        transaction.status = 'completed'
-        transaction.save()
-        
-        # Trigger the screening logic (from run_screening)
-        if transaction.purpose == 'screening' and transaction.application:
-            app = transaction.application
-            # Mock screening logic (we already have this in run_screening)
-            import random
-            score_val = random.randint(700, 820)
-            score_range = 'excellent' if score_val >= 750 else 'good' if score_val >= 700 else 'fair'
-            
-            ScreeningReport.objects.get_or_create(
-                application=app,
-                defaults={
-                    'credit_score_range': score_range,
-                    'criminal_record_clear': True,
-                    'eviction_history_clear': True,
-                    'employment_verified': True,
-                    'income_verified': True,
-                    'risk_level': 'low' if score_val > 700 else 'medium',
-                    'recommendation': 'Accept' if score_val > 650 else 'Conditional'
-                }
-            )
-
+    # Duplicate deliveries are acknowledged without being stored twice
+    record_event(payload)
     return HttpResponse(status=200)